@@ -0,0 +1,146 @@
+"""Index size, query latency and recall of reduced-dimension and quantized embeddings.
+
+Reads the full-width embeddings stored by the configured vector store and, for
+every combination of output dimension and NumPy store quantization, loads
+them into a scratch NumPy store and queries it with held-out vectors. Recall@k
+is measured against exact neighbours of the full-width vectors, so the report
+shows what shortening and quantizing cost on this deployment's own data.
+
+Shortened vectors are the leading dimensions of the stored ones, re-normalised.
+That is what OpenAI's `dimensions` parameter returns, and how Voyage's
+Matryoshka-trained models are meant to be shortened, so no documents need to be
+re-embedded for the report. Run from the repository root:
+
+    python -m benchmarks.compact_embeddings --dims 2048,1024,512,256 --quantization none,int8,float16
+
+Results are written as JSON (see --output).
+"""
+import argparse
+import json
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+import numpy as np
+from dotenv import load_dotenv
+
+from .hnsw_sweep import directory_bytes, exact_neighbours, int_list, read_vectors
+from .run import Recorder, git_commit
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Reduced-dimension and quantized embedding report")
+    parser.add_argument("--dims", type=int_list, default=[2048, 1024, 512, 256],
+                        help="Comma-separated output dimensions; values wider than the stored vectors are skipped")
+    parser.add_argument("--quantization", default="none,int8,float16",
+                        help="Comma-separated NumPy store quantizations: none, int8, float16")
+    parser.add_argument("--rescore-factor", type=int, default=4,
+                        help="Candidates re-scored per result when quantized")
+    parser.add_argument("--holdout", type=int, default=200, help="Stored documents held out as queries")
+    parser.add_argument("--category", default=None, help="Only use this category")
+    parser.add_argument("--sample", type=int, default=None, help="Read at most this many stored documents")
+    parser.add_argument("--top-k", type=int, default=10, help="Neighbours per query")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None,
+                        help="Result file (default: benchmarks/results/compact_embeddings-<commit>.json)")
+    return parser.parse_args()
+
+
+def shorten(vectors: np.ndarray, dim: int) -> np.ndarray:
+    """Keep the leading `dim` dimensions and re-normalise to unit length."""
+    shortened = vectors[:, :dim]
+    return shortened / np.maximum(np.linalg.norm(shortened, axis=1, keepdims=True), 1e-12)
+
+
+def bench_store(store, vectors: np.ndarray, queries: np.ndarray, truth: List[set], top_k: int) -> Dict[str, Any]:
+    """Load `vectors` into `store`, then time every query and score recall."""
+    for first in range(0, len(vectors), 5000):
+        block = vectors[first:first + 5000]
+        store.upsert_batch(
+            ids=[str(row) for row in range(first, first + len(block))],
+            embeds=block.tolist(),
+            contents=[""] * len(block),
+            category="report",
+        )
+
+    recorder = Recorder()
+    hits = 0
+    for query, expected in zip(queries.tolist(), truth):
+        start = time.perf_counter()
+        found = store.query(query, top_k)
+        recorder.add("query", time.perf_counter() - start)
+        hits += len({int(doc["id"]) for doc in found} & expected)
+    summary = recorder.summary("query")
+    return {
+        "recall": hits / (top_k * len(truth)) if truth else 0.0,
+        "p50_ms": summary["p50_ms"],
+        "p99_ms": summary["p99_ms"],
+    }
+
+
+def main():
+    load_dotenv()
+    args = parse_args()
+
+    # Imported after the environment is loaded, since Config reads it.
+    from src.config import Config
+    from src.vdb.numpy_store import NumpyVectorStore
+    from src.vdb.vector_store import get_vector_store
+
+    rng = np.random.default_rng(args.seed)
+    vectors = read_vectors(get_vector_store(Config()), args.category, args.sample)
+    held_out = rng.choice(len(vectors), size=min(args.holdout, len(vectors) // 2), replace=False)
+    queries = vectors[held_out]
+    vectors = np.delete(vectors, held_out, axis=0)
+    full_dim = vectors.shape[1]
+    truth = exact_neighbours(vectors, queries, args.top_k, "l2")
+    print(f"Comparing against {len(vectors)} full-width vectors of dimension {full_dim} with {len(queries)} queries")
+
+    dims = [full_dim] + [dim for dim in args.dims if dim < full_dim]
+    results = []
+    print(f"\n{'dim':>5} {'quant':<8} {'scan MB':>8} {'disk MB':>8} {'recall':>7} {'p50 ms':>8} {'p99 ms':>8}")
+    for dim in dict.fromkeys(dims):
+        shortened_vectors, shortened_queries = shorten(vectors, dim), shorten(queries, dim)
+        for quantization in args.quantization.split(","):
+            root = Path(tempfile.mkdtemp(prefix="rag-compact-embeddings-"))
+            try:
+                config = Config()
+                config.chroma_db_dir = str(root)
+                config.numpy_store_quantization = quantization
+                config.numpy_rescore_factor = args.rescore_factor
+                store = NumpyVectorStore(config)
+                result = {
+                    "dim": dim,
+                    "quantization": quantization,
+                    **bench_store(store, shortened_vectors, shortened_queries, truth, args.top_k),
+                }
+                # Bytes a full scan reads: the first-pass vectors plus norms (and int8 scales).
+                first_pass = np.dtype("float32" if quantization == "none" else quantization).itemsize
+                result["scan_bytes"] = len(vectors) * (dim * first_pass + 4 + (4 if quantization == "int8" else 0))
+                result["disk_bytes"] = directory_bytes(store.directory)
+                results.append(result)
+                print(f"{dim:>5} {quantization:<8} {result['scan_bytes'] / 2 ** 20:>8.1f} "
+                      f"{result['disk_bytes'] / 2 ** 20:>8.1f} {result['recall']:>7.3f} "
+                      f"{result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f}")
+                del store
+            finally:
+                shutil.rmtree(root, ignore_errors=True)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "params": {**vars(args), "rows": len(vectors), "full_dim": full_dim, "queries": len(queries)},
+        "results": results,
+    }
+    output = (
+        Path(args.output) if args.output
+        else Path("benchmarks/results") / f"compact_embeddings-{report['commit']}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Compare two benchmark result files:
+
+    python -m benchmarks.compare benchmarks/results/OLD.json benchmarks/results/NEW.json
+"""
+import argparse
+import json
+from typing import Dict, Iterator, Tuple
+
+
+def metrics(report: Dict) -> Iterator[Tuple[str, float]]:
+    """Yield (name, value) pairs for every comparable number in a report."""
+    for category, result in report.get("load", {}).items():
+        yield f"load.{category}.docs_per_sec", result["docs_per_sec"]
+    for endpoint, result in report.get("endpoints", {}).items():
+        yield f"{endpoint}.throughput_rps", result["throughput_rps"]
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            if key in result["latency"]:
+                yield f"{endpoint}.{key}", result["latency"][key]
+    for node, latency in report.get("nodes", {}).items():
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            if key in latency:
+                yield f"node.{node}.{key}", latency[key]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    args = parser.parse_args()
+
+    with open(args.old, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+
+    old_metrics = dict(metrics(old))
+    print(f"{'metric':<40} {old.get('commit', 'old'):>12} {new.get('commit', 'new'):>12} {'change':>9}")
+    for name, value in metrics(new):
+        if name not in old_metrics:
+            continue
+        before = old_metrics[name]
+        change = (value - before) / before * 100 if before else 0.0
+        print(f"{name:<40} {before:>12.2f} {value:>12.2f} {change:>8.1f}%")
+
+
+if __name__ == "__main__":
+    main()
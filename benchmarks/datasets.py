@@ -0,0 +1,74 @@
+"""Synthetic datasets shaped like the example listings, generated row by row."""
+import csv
+import random
+from pathlib import Path
+from typing import List
+
+EXAMPLE_DATASETS = [
+    ("example/real_estate_listings.csv", "property"),
+    ("example/faq.csv", "faq"),
+    ("example/market_data.csv", "market"),
+    ("example/agencies.jsonl", "agency"),
+]
+
+CITIES = ["New York", "Los Angeles", "Chicago", "Houston", "Phoenix", "Madison", "Denver", "Seattle", "Austin", "Boston"]
+STREETS = ["Pine Rd", "Cedar Ln", "Oak St", "Maple Ave", "Elm Dr", "Lakeview Dr", "Sunset Blvd", "Main St"]
+ADJECTIVES = ["Bright", "Classic", "Modern", "Cozy", "Spacious", "Charming", "Elegant", "Rustic"]
+TYPES = ["house", "apartment", "condo", "townhouse", "loft"]
+FEATURES = ["garage", "hardwood floors", "pool access", "near subway", "solar panels", "rooftop terrace",
+            "air conditioning", "EV charger", "deck", "energy-efficient appliances", "fireplace", "garden"]
+
+QUERY_TEMPLATES = [
+    "{adjective} {type} in {city}",
+    "{type} with {feature} in {city}",
+    "{bedrooms} bedroom {type} near {street}",
+    "houses with {feature} and {feature2}",
+    "how do I buy a property in {city}",
+]
+
+
+def write_synthetic_listings(path: Path, rows: int, seed: int = 0) -> Path:
+    """Write a listings CSV with `rows` rows without holding them in memory."""
+    rng = random.Random(seed)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "description", "price", "num_bedrooms", "num_bathrooms",
+                         "sq_m", "address", "city", "property_type", "features"])
+        for i in range(1, rows + 1):
+            city = rng.choice(CITIES)
+            kind = rng.choice(TYPES)
+            bedrooms = rng.randint(1, 6)
+            features = rng.sample(FEATURES, 4)
+            writer.writerow([
+                f"S{i}",
+                f"{rng.choice(ADJECTIVES)} {kind.title()} in {city}",
+                f"This {bedrooms}-bedroom {kind} in {city} features {', '.join(features[:2])}.",
+                round(rng.uniform(150_000, 2_500_000), 2),
+                bedrooms,
+                rng.randint(1, 4),
+                rng.randint(40, 400),
+                f"{rng.randint(1, 9999)} {rng.choice(STREETS)}",
+                city,
+                kind,
+                ", ".join(features),
+            ])
+    return path
+
+
+def make_queries(count: int, seed: int = 1) -> List[str]:
+    """Return `count` listing-style search queries."""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        feature, feature2 = rng.sample(FEATURES, 2)
+        queries.append(rng.choice(QUERY_TEMPLATES).format(
+            adjective=rng.choice(ADJECTIVES).lower(),
+            type=rng.choice(TYPES),
+            city=rng.choice(CITIES),
+            street=rng.choice(STREETS),
+            bedrooms=rng.randint(1, 6),
+            feature=feature,
+            feature2=feature2,
+        ))
+    return queries
@@ -0,0 +1,219 @@
+"""Recall and latency of Chroma HNSW settings on this deployment's own vectors.
+
+Reads the stored embeddings from the configured vector store, builds a
+throwaway Chroma index for every combination of the given settings and runs
+a held-out query set against each, scoring recall@k against an exact
+brute-force search. Queries are either a file of questions, embedded with the
+configured provider, or stored documents held out of the indexes. Run from
+the repository root:
+
+    python -m benchmarks.hnsw_sweep --m 8,16,32 --construction-ef 100,200 --search-ef 10,50,100,200
+    python -m benchmarks.hnsw_sweep --queries questions.txt --category property
+
+`ef_search` is changed in place on each index and applied by reopening it;
+the other settings need a rebuild. Results are written as JSON (see --output).
+"""
+import argparse
+import itertools
+import json
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import chromadb
+import numpy as np
+from chromadb.api.client import SharedSystemClient
+from chromadb.config import Settings
+from dotenv import load_dotenv
+
+from .run import Recorder, git_commit
+
+
+def int_list(value: str) -> List[int]:
+    return [int(part) for part in value.split(",") if part]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="HNSW parameter sweep")
+    parser.add_argument("--queries", default=None,
+                        help="File of held-out questions, one per line (default: hold out stored documents)")
+    parser.add_argument("--holdout", type=int, default=200,
+                        help="Stored documents held out as queries when --queries is not given")
+    parser.add_argument("--category", default=None, help="Only index and query this category")
+    parser.add_argument("--sample", type=int, default=None, help="Read at most this many stored documents")
+    parser.add_argument("--top-k", type=int, default=10, help="Neighbours per query")
+    parser.add_argument("--space", default=None,
+                        help="Comma-separated distance spaces: l2, cosine, ip (default: HNSW_SPACE)")
+    parser.add_argument("--m", type=int_list, default=None, help="Comma-separated M values (default: HNSW_M)")
+    parser.add_argument("--construction-ef", type=int_list, default=None,
+                        help="Comma-separated construction_ef values (default: HNSW_CONSTRUCTION_EF)")
+    parser.add_argument("--search-ef", type=int_list, default=[10, 20, 50, 100, 200],
+                        help="Comma-separated search_ef values")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None,
+                        help="Result file (default: benchmarks/results/hnsw_sweep-<commit>.json)")
+    return parser.parse_args()
+
+
+def read_vectors(store, category: Optional[str], sample: Optional[int], page_size: int = 5000) -> np.ndarray:
+    """Page through the store's embeddings, keeping those of `category` if given."""
+    vectors: List[np.ndarray] = []
+    offset = kept = 0
+    while sample is None or kept < sample:
+        page = store.get_documents(limit=page_size, offset=offset, include=["embeddings", "metadatas"])
+        if not page["ids"]:
+            break
+        offset += len(page["ids"])
+        rows = [
+            i for i, metadata in enumerate(page["metadatas"])
+            if category is None or (metadata or {}).get("category") == category
+        ]
+        if rows:
+            vectors.append(np.asarray(page["embeddings"], dtype=np.float32)[rows])
+            kept += len(rows)
+    if not vectors:
+        raise SystemExit("No stored embeddings to sweep over; load some documents first.")
+    stacked = np.concatenate(vectors)
+    return stacked if sample is None else stacked[:sample]
+
+
+def exact_neighbours(vectors: np.ndarray, queries: np.ndarray, k: int, space: str) -> List[set]:
+    """Ground-truth neighbours in the given Chroma distance space."""
+    if space == "cosine":
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+    scores = queries @ vectors.T
+    if space == "l2":
+        scores = scores - (vectors ** 2).sum(axis=1) / 2
+    nearest = np.argsort(-scores, axis=1)[:, :k]
+    return [set(row.tolist()) for row in nearest]
+
+
+def directory_bytes(path: Path) -> int:
+    return sum(file.stat().st_size for file in path.rglob("*") if file.is_file())
+
+
+def build_index(
+    root: Path, vectors: np.ndarray, space: str, m: int, construction_ef: int
+) -> Tuple[Any, Any, float, int]:
+    """Index `vectors` in a fresh Chroma store; returns the client, collection,
+    build time and the size of the vector index on disk."""
+    client = chromadb.PersistentClient(path=str(root), settings=Settings(anonymized_telemetry=False))
+    collection = client.create_collection(
+        name="sweep",
+        configuration={"hnsw": {"space": space, "ef_construction": construction_ef, "max_neighbors": m}},
+    )
+    start = time.perf_counter()
+    for first in range(0, len(vectors), 5000):
+        block = vectors[first:first + 5000]
+        collection.add(ids=[str(row) for row in range(first, first + len(block))], embeddings=block)
+    build_seconds = time.perf_counter() - start
+    # The SQLite file holds ids and a copy of the vectors; the segment directories hold the index.
+    index_bytes = sum(directory_bytes(path) for path in root.iterdir() if path.is_dir())
+    return client, collection, build_seconds, index_bytes
+
+
+def reopen_with_search_ef(root: Path, collection, search_ef: int):
+    """Set `search_ef` on the index and reopen it, returning the reopened collection.
+
+    Chroma applies a changed `ef_search` when the index is next loaded, so the
+    client's cached system is dropped to make the next query load it again.
+    """
+    collection.modify(configuration={"hnsw": {"ef_search": search_ef}})
+    SharedSystemClient.clear_system_cache()
+    client = chromadb.PersistentClient(path=str(root), settings=Settings(anonymized_telemetry=False))
+    return client.get_collection("sweep")
+
+
+def sweep_search_ef(collection, queries: np.ndarray, truth: List[set], top_k: int, search_ef: int) -> Dict[str, Any]:
+    """Time every query against an index searching with `search_ef` and score recall."""
+    recorder = Recorder()
+    hits = 0
+    for query, expected in zip(queries.tolist(), truth):
+        start = time.perf_counter()
+        found = collection.query(query_embeddings=[query], n_results=top_k, include=[])["ids"][0]
+        recorder.add("query", time.perf_counter() - start)
+        hits += len({int(doc_id) for doc_id in found} & expected)
+    summary = recorder.summary("query")
+    return {
+        "search_ef": search_ef,
+        "recall": hits / (top_k * len(truth)) if truth else 0.0,
+        "p50_ms": summary["p50_ms"],
+        "p99_ms": summary["p99_ms"],
+    }
+
+
+def main():
+    load_dotenv()
+    args = parse_args()
+
+    # Imported after the environment is loaded, since Config reads it.
+    from src.config import Config
+    from src.vdb.vector_store import get_vector_store
+
+    config = Config()
+    rng = np.random.default_rng(args.seed)
+    vectors = read_vectors(get_vector_store(config), args.category, args.sample)
+
+    if args.queries:
+        from src.ai.embeddings.embedding_service import EmbeddingService
+
+        lines = Path(args.queries).read_text(encoding="utf-8").splitlines()
+        questions = [line.strip() for line in lines if line.strip()]
+        queries = np.asarray(EmbeddingService(config).embed_queries(questions), dtype=np.float32)
+    else:
+        held_out = rng.choice(len(vectors), size=min(args.holdout, len(vectors) // 2), replace=False)
+        queries = vectors[held_out]
+        vectors = np.delete(vectors, held_out, axis=0)
+    print(f"Sweeping over {len(vectors)} vectors of dimension {vectors.shape[1]} with {len(queries)} queries")
+
+    spaces = args.space.split(",") if args.space else [config.hnsw_space]
+    ms = args.m or [config.hnsw_m]
+    construction_efs = args.construction_ef or [config.hnsw_construction_ef]
+
+    results = []
+    print(f"\n{'space':<7} {'M':>4} {'c_ef':>5} {'s_ef':>5} {'recall':>7} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'index MB':>9} {'build s':>8}")
+    for space in spaces:
+        truth = exact_neighbours(vectors, queries, args.top_k, space)
+        for m, construction_ef in itertools.product(ms, construction_efs):
+            root = Path(tempfile.mkdtemp(prefix="rag-hnsw-sweep-"))
+            try:
+                client, collection, build_seconds, index_bytes = build_index(root, vectors, space, m, construction_ef)
+                for search_ef in args.search_ef:
+                    collection = reopen_with_search_ef(root, collection, search_ef)
+                    result = {
+                        "space": space,
+                        "m": m,
+                        "construction_ef": construction_ef,
+                        **sweep_search_ef(collection, queries, truth, args.top_k, search_ef),
+                        "index_bytes": index_bytes,
+                        "build_seconds": build_seconds,
+                    }
+                    results.append(result)
+                    print(f"{space:<7} {m:>4} {construction_ef:>5} {search_ef:>5} {result['recall']:>7.3f} "
+                          f"{result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f} "
+                          f"{index_bytes / 2 ** 20:>9.1f} {build_seconds:>8.1f}")
+                del collection, client
+                SharedSystemClient.clear_system_cache()
+            finally:
+                shutil.rmtree(root, ignore_errors=True)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "params": {**vars(args), "rows": len(vectors), "dim": int(vectors.shape[1]), "queries": len(queries)},
+        "results": results,
+    }
+    output = (
+        Path(args.output) if args.output
+        else Path("benchmarks/results") / f"hnsw_sweep-{report['commit']}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
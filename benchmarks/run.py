@@ -0,0 +1,267 @@
+"""Offline load test and latency benchmark.
+
+Runs the loader and the HTTP API against deterministic local stand-ins for
+the embedding and chat providers, so the numbers measure this service's own
+overhead. Run from the repository root:
+
+    python -m benchmarks.run --rows 100000 --requests 500 --concurrency 16
+
+Results are written as JSON (see --output) and can be diffed between commits
+with `python -m benchmarks.compare OLD.json NEW.json`.
+"""
+import argparse
+import functools
+import inspect
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+import numpy as np
+
+from .datasets import EXAMPLE_DATASETS, make_queries, write_synthetic_listings
+from .stubs import EchoChatModel, HashEmbeddings
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline RAG benchmark")
+    parser.add_argument("--rows", type=int, default=10000,
+                        help="Rows in the synthetic listings dataset (0 to skip it)")
+    parser.add_argument("--dim", type=int, default=256, help="Pseudo-embedding dimension")
+    parser.add_argument("--embed-latency", type=float, default=0.0,
+                        help="Simulated seconds per embedding provider call")
+    parser.add_argument("--llm-latency", type=float, default=0.05,
+                        help="Simulated seconds per chat model call")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients per endpoint")
+    parser.add_argument("--turns", type=int, default=3,
+                        help="Questions per conversation before a client starts a new session")
+    parser.add_argument("--batch-size", type=int, default=None, help="Loader batch size")
+    parser.add_argument("--load-concurrency", type=int, default=None, help="Loader concurrency")
+    parser.add_argument("--server", choices=["flask", "async"], default="flask",
+                        help="Which API implementation to drive")
+    parser.add_argument("--data-dir", default=None,
+                        help="Directory for the vector store and datasets (default: a temp dir)")
+    parser.add_argument("--output", default=None,
+                        help="Result file (default: benchmarks/results/<commit>.json)")
+    return parser.parse_args()
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def configure_env(data_dir: Path) -> None:
+    """Point the service at a private store and satisfy Config without real credentials."""
+    os.environ["CHROMA_DB_DIR"] = str(data_dir / "chromadb")
+    os.environ.setdefault("LLM_MODEL", "gpt-4o")
+    os.environ.setdefault("EMBEDDINGS_MODEL", "text-embedding-3-small")
+    for key in ("OPENAI_API_KEY", "ANTHROPIC_API_KEY", "VOYAGE_AI_API_KEY"):
+        os.environ.setdefault(key, "offline")
+
+
+class Recorder:
+    """Thread-safe collection of latency samples by name."""
+
+    def __init__(self):
+        self._samples: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(name, []).append(seconds)
+
+    def summary(self, name: str) -> Dict[str, float]:
+        samples = np.array(self._samples.get(name, []))
+        if samples.size == 0:
+            return {"count": 0}
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99]) * 1000
+        return {
+            "count": int(samples.size),
+            "mean_ms": float(samples.mean() * 1000),
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+        }
+
+
+def timed(recorder: Recorder, name: str, func: Callable) -> Callable:
+    """Wrap a sync or async callable so each call's latency is recorded under `name`."""
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                recorder.add(name, time.perf_counter() - start)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            recorder.add(name, time.perf_counter() - start)
+    return wrapper
+
+
+def instrument_nodes(recorder: Recorder, embedding_service, db_service, llm_service) -> None:
+    """Time the service call behind each graph node (embed, retrieve, generate)."""
+    embedding_service.embed = timed(recorder, "embed", embedding_service.embed)
+    embedding_service.aembed = timed(recorder, "embed", embedding_service.aembed)
+    db_service.query = timed(recorder, "retrieve", db_service.query)
+    llm_service.rag_response = timed(recorder, "generate", llm_service.rag_response)
+    llm_service.arag_response = timed(recorder, "generate", llm_service.arag_response)
+
+
+def bench_load(loader, datasets, args) -> Dict[str, Any]:
+    """Load each dataset from scratch and report docs/sec."""
+    results = {}
+    for path, category in datasets:
+        start = time.perf_counter()
+        summary = loader.load_documents(
+            str(path),
+            category,
+            batch_size=args.batch_size,
+            concurrency=args.load_concurrency,
+            full=True,
+        )
+        elapsed = time.perf_counter() - start
+        docs = summary["added"] + summary["updated"]
+        results[category] = {
+            "file": str(path),
+            "docs": docs,
+            "seconds": elapsed,
+            "docs_per_sec": docs / elapsed if elapsed > 0 else 0.0,
+        }
+    return results
+
+
+def bench_endpoint(
+    make_client: Callable[[], Any],
+    paths: List[str],
+    recorder: Recorder,
+    name: str,
+    concurrency: int,
+    turns: int,
+) -> Dict[str, Any]:
+    """Issue GET requests from `concurrency` clients and report throughput and latency."""
+    local = threading.local()
+    errors = []
+
+    def request(i: int, path: str) -> None:
+        if getattr(local, "client", None) is None or local.sent >= turns:
+            local.client, local.sent = make_client(), 0
+        start = time.perf_counter()
+        response = local.client.get(path)
+        recorder.add(name, time.perf_counter() - start)
+        local.sent += 1
+        if response.status_code != 200:
+            errors.append(response.status_code)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(request, range(len(paths)), paths))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "requests": len(paths),
+        "errors": len(errors),
+        "seconds": elapsed,
+        "throughput_rps": len(paths) / elapsed if elapsed > 0 else 0.0,
+        "latency": recorder.summary(name),
+    }
+
+
+def main():
+    args = parse_args()
+    data_dir = Path(args.data_dir) if args.data_dir else Path(tempfile.mkdtemp(prefix="rag-bench-"))
+    configure_env(data_dir)
+
+    # Imported after the environment is prepared, since Config reads it.
+    from urllib.parse import quote
+    from main import init_services
+    from src.config import Config
+    from src.utils.document_loader import DocumentLoader
+
+    config = Config()
+    embedding_service, rag_graph, db_service, session_manager = init_services(config)
+    embedding_service.client = HashEmbeddings(dim=args.dim, latency=args.embed_latency)
+    rag_graph.llm_service.model = EchoChatModel(latency=args.llm_latency)
+
+    datasets = list(EXAMPLE_DATASETS)
+    if args.rows:
+        synthetic = write_synthetic_listings(data_dir / f"synthetic_{args.rows}.csv", args.rows)
+        datasets.append((synthetic, "synthetic"))
+
+    loader = DocumentLoader(embedding_service, db_service)
+    load_results = bench_load(loader, datasets, args)
+
+    recorder = Recorder()
+    instrument_nodes(recorder, embedding_service, db_service, rag_graph.llm_service)
+
+    if args.server == "async":
+        from starlette.testclient import TestClient
+        from src.api.async_app import AsyncRAGAPI
+        app = AsyncRAGAPI(rag_graph, session_manager).app
+        make_client = lambda: TestClient(app)
+    else:
+        from src.api.app import RAGAPI
+        app = RAGAPI(rag_graph, session_manager).app
+        make_client = app.test_client
+
+    queries = make_queries(args.requests)
+    endpoints = {
+        "/api/v1/search": bench_endpoint(
+            make_client,
+            [f"/api/v1/search?q={quote(q)}" for q in queries],
+            recorder, "/api/v1/search", args.concurrency, args.turns,
+        ),
+        "/api/v1/query": bench_endpoint(
+            make_client,
+            [f"/api/v1/query?q={quote(q)}" for q in queries],
+            recorder, "/api/v1/query", args.concurrency, args.turns,
+        ),
+    }
+    nodes = {name: recorder.summary(name) for name in ("embed", "retrieve", "generate")}
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "params": vars(args),
+        "load": load_results,
+        "endpoints": endpoints,
+        "nodes": nodes,
+    }
+
+    output = Path(args.output) if args.output else Path("benchmarks/results") / f"{report['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+
+    print("\nLoad throughput:")
+    for category, result in load_results.items():
+        print(f"  {category:<12} {result['docs']:>9} docs  {result['docs_per_sec']:>10.1f} docs/sec")
+    print("\nEndpoints:")
+    for name, result in endpoints.items():
+        latency = result["latency"]
+        print(f"  {name:<16} {result['throughput_rps']:>8.1f} req/s  p50 {latency['p50_ms']:.1f}ms  "
+              f"p95 {latency['p95_ms']:.1f}ms  p99 {latency['p99_ms']:.1f}ms  errors {result['errors']}")
+    print("\nNodes:")
+    for name, latency in nodes.items():
+        if latency["count"]:
+            print(f"  {name:<16} p50 {latency['p50_ms']:.2f}ms  p95 {latency['p95_ms']:.2f}ms  "
+                  f"p99 {latency['p99_ms']:.2f}ms")
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
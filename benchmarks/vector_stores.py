@@ -0,0 +1,174 @@
+"""Recall and latency of the vector store engines on the same synthetic vectors.
+
+Loads clustered random unit vectors into each engine, then measures single
+and batched query latency and recall@k against an exact search done here
+with NumPy. Run from the repository root:
+
+    python -m benchmarks.vector_stores --rows 200000 --dim 256 --categories 4
+
+Results are written as JSON (see --output).
+"""
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+from .run import Recorder, configure_env, git_commit
+
+# Benchmark engine name -> (VECTOR_STORE, CHROMA_LAYOUT)
+ENGINES = {
+    "chroma": ("chroma", "single"),
+    "chroma-per-category": ("chroma", "per_category"),
+    "numpy": ("numpy", "single"),
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Vector store engine benchmark")
+    parser.add_argument("--rows", type=int, default=100000, help="Vectors to load")
+    parser.add_argument("--dim", type=int, default=256, help="Vector dimension")
+    parser.add_argument("--categories", type=int, default=4, help="Categories the vectors are spread over")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per engine")
+    parser.add_argument("--top-k", type=int, default=10, help="Results per query")
+    parser.add_argument("--batch-size", type=int, default=32, help="Queries per batched call")
+    parser.add_argument("--engines", default="chroma,chroma-per-category,numpy",
+                        help=f"Comma-separated engines to compare ({', '.join(ENGINES)})")
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32",
+                        help="Storage dtype of the NumPy engine")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=None,
+                        help="Directory for the stores (default: a temp dir)")
+    parser.add_argument("--output", default=None,
+                        help="Result file (default: benchmarks/results/vector_stores-<commit>.json)")
+    return parser.parse_args()
+
+
+def make_vectors(rows: int, dim: int, clusters: int, rng: np.random.Generator) -> np.ndarray:
+    """Unit vectors scattered around random cluster centres, like real embeddings."""
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centres[rng.integers(0, clusters, rows)] + 0.5 * rng.standard_normal((rows, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int, mask: Optional[np.ndarray] = None) -> List[set]:
+    """Ground-truth neighbours by L2 distance."""
+    candidates = np.arange(len(vectors)) if mask is None else np.flatnonzero(mask)
+    distances = (
+        (queries ** 2).sum(axis=1, keepdims=True)
+        - 2 * queries @ vectors[candidates].T
+        + (vectors[candidates] ** 2).sum(axis=1)
+    )
+    nearest = np.argsort(distances, axis=1)[:, :k]
+    return [set(candidates[row].tolist()) for row in nearest]
+
+
+def recall(results: List[List[Dict[str, Any]]], truth: List[set], k: int) -> float:
+    hits = sum(len({int(doc["id"]) for doc in found[:k]} & expected) for found, expected in zip(results, truth))
+    return hits / (k * len(truth)) if truth else 0.0
+
+
+def bench_engine(store, vectors, categories, queries, query_categories, truth, truth_by_category, args) -> Dict[str, Any]:
+    """Load `vectors` into `store`, then time single and batched queries and score recall."""
+    recorder = Recorder()
+    names = [f"category_{code}" for code in range(args.categories)]
+
+    start = time.perf_counter()
+    for first in range(0, len(vectors), 1000):
+        block = slice(first, first + 1000)
+        for code in np.unique(categories[block]):
+            rows = first + np.flatnonzero(categories[block] == code)
+            store.upsert_batch(
+                ids=[str(row) for row in rows],
+                embeds=vectors[rows].tolist(),
+                contents=[f"document {row}" for row in rows],
+                category=names[code],
+            )
+    load_seconds = time.perf_counter() - start
+
+    unfiltered, filtered = [], []
+    for query, code in zip(queries.tolist(), query_categories):
+        start = time.perf_counter()
+        unfiltered.append(store.query(query, args.top_k))
+        recorder.add("query", time.perf_counter() - start)
+        start = time.perf_counter()
+        filtered.append(store.query(query, args.top_k, names[code]))
+        recorder.add("query_category", time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for first in range(0, len(queries), args.batch_size):
+        batch = queries[first:first + args.batch_size].tolist()
+        store.query_batch(batch, [args.top_k] * len(batch))
+    batch_seconds = time.perf_counter() - start
+
+    return {
+        "load_seconds": load_seconds,
+        "load_docs_per_sec": len(vectors) / load_seconds if load_seconds > 0 else 0.0,
+        "recall": recall(unfiltered, truth, args.top_k),
+        "recall_category": recall(filtered, truth_by_category, args.top_k),
+        "query": recorder.summary("query"),
+        "query_category": recorder.summary("query_category"),
+        "batch_queries_per_sec": len(queries) / batch_seconds if batch_seconds > 0 else 0.0,
+    }
+
+
+def main():
+    args = parse_args()
+    data_dir = Path(args.data_dir) if args.data_dir else Path(tempfile.mkdtemp(prefix="rag-vector-bench-"))
+    configure_env(data_dir)
+
+    # Imported after the environment is prepared, since Config reads it.
+    from src.config import Config
+    from src.vdb.vector_store import get_vector_store
+
+    rng = np.random.default_rng(args.seed)
+    vectors = make_vectors(args.rows, args.dim, clusters=max(8, args.categories * 4), rng=rng)
+    categories = rng.integers(0, args.categories, args.rows)
+    queries = make_vectors(args.queries, args.dim, clusters=8, rng=rng)
+    query_categories = rng.integers(0, args.categories, args.queries).tolist()
+
+    truth = exact_top_k(vectors, queries, args.top_k)
+    truth_by_category = [
+        exact_top_k(vectors, queries[i:i + 1], args.top_k, categories == code)[0]
+        for i, code in enumerate(query_categories)
+    ]
+
+    engines = {}
+    for engine in args.engines.split(","):
+        config = Config()
+        config.vector_store, config.chroma_layout = ENGINES[engine]
+        config.numpy_store_dtype = args.dtype
+        config.chroma_db_dir = str(data_dir / engine)
+        store = get_vector_store(config)
+        print(f"Benchmarking {engine} with {args.rows} vectors of dimension {args.dim}...")
+        engines[engine] = bench_engine(
+            store, vectors, categories, queries, query_categories, truth, truth_by_category, args
+        )
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "params": vars(args),
+        "engines": engines,
+    }
+    output = (
+        Path(args.output) if args.output
+        else Path("benchmarks/results") / f"vector_stores-{report['commit']}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+
+    print(f"\n{'engine':<20} {'load/s':>10} {'recall':>7} {'recall/cat':>10} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'cat p50':>8} {'batch q/s':>10}")
+    for engine, result in engines.items():
+        print(f"{engine:<20} {result['load_docs_per_sec']:>10.0f} {result['recall']:>7.3f} "
+              f"{result['recall_category']:>10.3f} {result['query']['p50_ms']:>8.2f} "
+              f"{result['query']['p95_ms']:>8.2f} {result['query_category']['p50_ms']:>8.2f} "
+              f"{result['batch_queries_per_sec']:>10.1f}")
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,14 @@
 
+from pathlib import Path
 from dotenv import load_dotenv
 from src.api.session import SessionManager
 from src.rag.graph import RAGGraph
 from src.config import Config
 from src.ai.embeddings.embedding_service import EmbeddingService
 from src.ai.llm.llm_service import LLMService
-from src.vdb.chromadb_service import ChromaDBService
+from src.vdb.vector_store import get_vector_store
 from src.api.app import RAGAPI
+from src.api.async_app import AsyncRAGAPI
 from src.cli import parse_args, handle_cli
 
 load_dotenv()
@@ -15,9 +17,14 @@ load_dotenv()
 def init_services(config: Config):
     embedding_service = EmbeddingService(config)
     llm_service = LLMService(config)
-    db_service = ChromaDBService(config)
-    session_manager = SessionManager()
+    db_service = get_vector_store(config)
     rag_service = RAGGraph(llm_service, embedding_service, db_service, config)
+    session_manager = SessionManager(
+        ttl_seconds=config.session_ttl_seconds,
+        max_sessions=config.max_sessions,
+        db_path=Path(config.chroma_db_dir) / "sessions.sqlite3" if config.session_store == "sqlite" else None,
+        on_expire=rag_service.forget,
+    )
     
     return embedding_service, rag_service, db_service, session_manager
 
@@ -27,5 +34,8 @@ if __name__ == "__main__":
     config = Config()
     embedding_service, rag_graph, db_service, session_manager = init_services(config)
     if not handle_cli(args, embedding_service, db_service):
-        api = RAGAPI(rag_graph, session_manager)
+        if args.server == "async":
+            api = AsyncRAGAPI(rag_graph, session_manager)
+        else:
+            api = RAGAPI(rag_graph, session_manager)
         api.run(host=args.host, port=args.port, debug=args.debug)
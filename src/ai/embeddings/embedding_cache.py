@@ -0,0 +1,171 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+# Most keys bound in one statement, well under SQLite's variable limit.
+MAX_VARIABLES = 500
+
+
+class EmbeddingCache:
+    """Two-tier embedding cache keyed by (embeddings model, input type, text hash).
+
+    Recently used vectors live in a size-bounded in-memory LRU; vectors are
+    also persisted to a local SQLite file so they survive restarts and are
+    shared between the API server and the CLI loader. The file keeps at most
+    `max_disk_entries` vectors, dropping the oldest written ones beyond that.
+    Query and document vectors are kept apart because some providers embed
+    them differently.
+
+    The lock only guards the memory tier; each thread reads and writes the
+    file through its own connection, so query lookups do not wait on ingest.
+    """
+
+    def __init__(self, db_path: Path, model: str, max_entries: int = 10000, max_disk_entries: int = 1000000):
+        """Open (or create) the SQLite store and an empty memory tier."""
+        self.db_path = Path(db_path)
+        self.model = model
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, "
+            "added_at REAL NOT NULL DEFAULT 0, "
+            "PRIMARY KEY (model, text_hash)) WITHOUT ROWID"
+        )
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(embeddings)")]
+        if "added_at" not in columns:
+            # Files written before the disk tier was capped count as the oldest.
+            conn.execute("ALTER TABLE embeddings ADD COLUMN added_at REAL NOT NULL DEFAULT 0")
+        conn.execute("CREATE INDEX IF NOT EXISTS embeddings_added_at ON embeddings (added_at)")
+        conn.commit()
+        # Upper bound on the stored rows; only recounted once it passes the cap.
+        self._disk_entries = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection to the cache file."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        """Return the cache key for a text."""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _namespace(self, input_type: str) -> str:
+        """Return the stored model key; document vectors use the bare model name."""
+        return self.model if input_type == "document" else f"{self.model}:{input_type}"
+
+    def get_many(self, texts: List[str], input_type: str = "document") -> List[Optional[List[float]]]:
+        """Return cached vectors in input order, with None for misses."""
+        namespace = self._namespace(input_type)
+        keys = [(namespace, self._hash(text)) for text in texts]
+        found: Dict[Tuple[str, str], List[float]] = {}
+
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+
+        from_disk: Dict[Tuple[str, str], List[float]] = {}
+        conn = self._connection()
+        for i in range(0, len(missing), MAX_VARIABLES):
+            chunk = missing[i:i + MAX_VARIABLES]
+            rows = conn.execute(
+                f"SELECT text_hash, vector FROM embeddings "
+                f"WHERE model = ? AND text_hash IN ({','.join('?' * len(chunk))})",
+                [namespace, *(text_hash for _, text_hash in chunk)],
+            ).fetchall()
+            for text_hash, blob in rows:
+                from_disk[(namespace, text_hash)] = array("f", blob).tolist()
+        found.update(from_disk)
+
+        results = []
+        with self._lock:
+            for key, vector in from_disk.items():
+                self._remember(key, vector)
+            for key in keys:
+                vector = found.get(key)
+                if vector is None:
+                    self.misses += 1
+                elif key in from_disk:
+                    self.disk_hits += 1
+                else:
+                    self.memory_hits += 1
+                results.append(vector)
+
+        return results
+
+    def put_many(self, texts: List[str], vectors: List[List[float]], input_type: str = "document") -> None:
+        """Store vectors in both tiers, then trim the disk tier if it grew past its cap."""
+        namespace = self._namespace(input_type)
+        rows = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = (namespace, self._hash(text))
+                self._remember(key, vector)
+                rows.append((namespace, key[1], array("f", vector).tobytes(), time.time()))
+
+        conn = self._connection()
+        conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, added_at) VALUES (?, ?, ?, ?)",
+            rows,
+        )
+        conn.commit()
+        with self._lock:
+            self._disk_entries += len(rows)
+            over_cap = self._disk_entries > self.max_disk_entries
+        if over_cap:
+            self._trim_disk(conn)
+
+    def _trim_disk(self, conn: sqlite3.Connection) -> None:
+        """Delete the oldest written vectors down to 90% of `max_disk_entries`, so
+        trimming runs once per many writes rather than on each one."""
+        stored = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        excess = stored - int(self.max_disk_entries * 0.9)
+        if stored > self.max_disk_entries and excess > 0:
+            conn.execute(
+                "DELETE FROM embeddings WHERE (model, text_hash) IN ("
+                "SELECT model, text_hash FROM embeddings ORDER BY added_at LIMIT ?)",
+                (excess,),
+            )
+            conn.commit()
+            stored -= excess
+        with self._lock:
+            self._disk_entries = stored
+
+    def _remember(self, key: Tuple[str, str], vector: List[float]) -> None:
+        """Insert into the memory tier, evicting the least recently used entries."""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the memory tier size."""
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "memory_entries": len(self._memory),
+        }
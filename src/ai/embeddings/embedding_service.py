@@ -1,35 +1,205 @@
+import asyncio
+from pathlib import Path
+from typing import Callable, Optional
+import voyageai
 from langchain_core.embeddings.embeddings import Embeddings
 from langchain_openai import OpenAIEmbeddings
 from langchain_voyageai import VoyageAIEmbeddings
+from .embedding_cache import EmbeddingCache
+from .query_batcher import QueryBatcher
 from ..providers import ModelProvider
 from ...config import Config
+from ...utils import metrics
+
+# Most texts the Voyage API embeds in one request.
+VOYAGE_MAX_BATCH = 1000
 
 
 class EmbeddingService:
     """Simple wrapper around embedding providers.
 
     Chooses an embeddings client based on configuration and exposes a
-    convenience method to embed text into a vector.
+    convenience method to embed text into a vector. Vectors are served from
+    an embedding cache when one is enabled, so a text is only sent to the
+    provider once per embeddings model. Query embeddings from concurrent
+    requests are coalesced into batched provider calls when batching is on.
     """
     def __init__(self, config: Config):
         """Initialize the service with configuration and prepare the client."""
         self.config: Config = config
         self.client = self._get_embeddings_client()
+        self._voyage_client: Optional[voyageai.Client] = None
+        self.cache: Optional[EmbeddingCache] = self._get_cache()
+        self.batcher: Optional[QueryBatcher] = self._get_batcher()
 
     def embed(self, content: str) -> list[float]:
         """Return the embedding vector for the provided text content."""
 
-        return self.client.embed_query(content)
+        def fetch(texts: list[str]) -> list[list[float]]:
+            if self.batcher is not None:
+                return [self.batcher.submit(texts[0]).result()]
+            with metrics.provider_call("embedding", "query"):
+                return [self.client.embed_query(texts[0])]
+
+        return self._cached([content], "query", fetch)[0]
+
+    async def aembed(self, content: str) -> list[float]:
+        """Asynchronously return the embedding vector for the provided text content."""
+
+        # Cache lookups and writes may hit its SQLite file, so they run in a worker thread.
+        cached = (await asyncio.to_thread(self._from_cache, [content], "query"))[0]
+        if cached is not None:
+            return cached
+
+        if self.batcher is not None:
+            embedding = await self.batcher.asubmit(content)
+        else:
+            with metrics.provider_call("embedding", "query"):
+                embedding = await self.client.aembed_query(content)
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.put_many, [content], [embedding], "query")
+        return embedding
+
+    def embed_batch(self, contents: list[str]) -> list[list[float]]:
+        """Return embedding vectors for many texts using a single provider call."""
+
+        def fetch(texts: list[str]) -> list[list[float]]:
+            with metrics.provider_call("embedding", "document"):
+                return self.client.embed_documents(texts)
+
+        return self._cached(contents, "document", fetch)
+
+    def embed_queries(self, contents: list[str]) -> list[list[float]]:
+        """Return query embedding vectors for many search queries using a single provider call."""
+
+        return self._cached(contents, "query", self._embed_queries_uncached)
+
+    def _embed_queries_uncached(self, contents: list[str]) -> list[list[float]]:
+        """Embed search queries with one provider call.
+
+        Voyage embeds queries and documents differently (`input_type`), and its
+        LangChain client only batches documents, so query batches go through
+        the Voyage SDK directly. OpenAI makes no distinction.
+        """
+
+        with metrics.provider_call("embedding", "query_batch"):
+            if isinstance(self.client, VoyageAIEmbeddings):
+                return self._embed_voyage_queries(contents)
+            return self.client.embed_documents(contents)
+
+    def _embed_voyage_queries(self, contents: list[str]) -> list[list[float]]:
+        """Embed queries with the Voyage SDK, using the LangChain client's settings."""
+
+        if self._voyage_client is None:
+            self._voyage_client = voyageai.Client(
+                api_key=self.client.voyage_api_key.get_secret_value(), base_url=self.client.base_url
+            )
+        embeddings: list[list[float]] = []
+        for first in range(0, len(contents), VOYAGE_MAX_BATCH):
+            batch = contents[first:first + VOYAGE_MAX_BATCH]
+            if "context" in self.client.model:
+                # Each query is embedded as a document of its own.
+                results = self._voyage_client.contextualized_embed(
+                    inputs=[[text] for text in batch],
+                    model=self.client.model,
+                    input_type="query",
+                    output_dimension=self.client.output_dimension,
+                ).results
+                embeddings.extend(result.embeddings[0] for result in results)
+            else:
+                embeddings.extend(self._voyage_client.embed(
+                    batch,
+                    model=self.client.model,
+                    input_type="query",
+                    truncation=self.client.truncation,
+                    output_dimension=self.client.output_dimension,
+                ).embeddings)
+        return embeddings
+
+    def _from_cache(self, contents: list[str], input_type: str) -> list[Optional[list[float]]]:
+        """Return cached vectors in input order, with None for misses or when caching is off."""
+
+        if self.cache is None:
+            return [None] * len(contents)
+        return self.cache.get_many(contents, input_type)
+
+    def _cached(
+        self,
+        contents: list[str],
+        input_type: str,
+        fetch: Callable[[list[str]], list[list[float]]],
+    ) -> list[list[float]]:
+        """Serve vectors from the cache and embed the distinct misses with one `fetch` call."""
+
+        if not contents:
+            return []
+
+        embeddings = self._from_cache(contents, input_type)
+        missing = list(dict.fromkeys(
+            content for content, embedding in zip(contents, embeddings) if embedding is None
+        ))
+        if missing:
+            fetched = dict(zip(missing, fetch(missing)))
+            if self.cache is not None:
+                self.cache.put_many(missing, list(fetched.values()), input_type)
+            embeddings = [
+                embedding if embedding is not None else fetched[content]
+                for content, embedding in zip(contents, embeddings)
+            ]
+
+        return embeddings
+
+    def cache_stats(self) -> Optional[dict[str, int]]:
+        """Return embedding cache counters, or None when the cache is disabled."""
+
+        if self.cache is None:
+            return None
+        return self.cache.stats()
+
+    def _get_cache(self) -> Optional[EmbeddingCache]:
+        """Create the embedding cache under the Chroma directory when enabled."""
+
+        if not self.config.embedding_cache_enabled:
+            return None
+        return EmbeddingCache(
+            db_path=Path(self.config.chroma_db_dir) / "embedding_cache.sqlite3",
+            model=self._cache_model_key(),
+            max_entries=self.config.embedding_cache_size,
+            max_disk_entries=self.config.embedding_cache_disk_size,
+        )
     
+    def _cache_model_key(self) -> str:
+        """Identify the model in the cache, so vectors of other output dimensions are not reused."""
+
+        if self.config.embedding_dimensions is None:
+            return self.config.embeddings_model
+        return f"{self.config.embeddings_model}@{self.config.embedding_dimensions}"
+
+    def _get_batcher(self) -> Optional[QueryBatcher]:
+        """Create the query micro-batcher when `EMBED_BATCH_WINDOW_MS` is set above 0."""
+
+        if self.config.embed_batch_window_ms <= 0:
+            return None
+        return QueryBatcher(
+            fetch=self._embed_queries_uncached,
+            window_seconds=self.config.embed_batch_window_ms / 1000,
+            max_batch_size=self.config.embed_batch_max_size,
+            max_pending=self.config.embed_batch_max_pending,
+        )
+
     def _get_embeddings_client(self) -> Embeddings:
-        """Create and return a configured embeddings client instance."""
+        """Create and return a configured embeddings client instance, requesting
+        `EMBEDDING_DIMENSIONS`-wide vectors when set."""
 
         client_factory = {
             ModelProvider.VOYAGE_AI: lambda: VoyageAIEmbeddings(
-                voyage_api_key=self.config.embeddings_api_key, model=self.config.embeddings_model
+                voyage_api_key=self.config.embeddings_api_key,
+                model=self.config.embeddings_model,
+                output_dimension=self.config.embedding_dimensions,
             ),
             ModelProvider.OPEN_AI: lambda: OpenAIEmbeddings(
-                model=self.config.embeddings_model
+                model=self.config.embeddings_model,
+                dimensions=self.config.embedding_dimensions,
             )
         }.get(self.config.embeddings_provider)
 
@@ -0,0 +1,113 @@
+import asyncio
+import contextvars
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+from ...utils import metrics
+
+# (text, future for its vector, enqueue time, the caller's context)
+PendingQuery = Tuple[str, Future, float, contextvars.Context]
+
+
+class QueryBatcher:
+    """Coalesces query embeddings from concurrent requests into batched provider calls.
+
+    A dispatcher thread takes the first waiting query, collects whatever else
+    arrives within `window_seconds` (up to `max_batch_size` queries) and embeds
+    the distinct texts with one `fetch` call, handing each caller its vector.
+    Batches are sent by a small pool so a slow provider call does not hold up
+    the next window. At most `max_pending` queries wait at once; further
+    callers block until there is room. The provider call's timings are added
+    to every caller's request breakdown.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[List[str]], List[List[float]]],
+        window_seconds: float,
+        max_batch_size: int,
+        max_pending: int,
+        max_concurrent_batches: int = 4,
+    ):
+        self.fetch = fetch
+        self.window_seconds = window_seconds
+        self.max_batch_size = max_batch_size
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._batch_slots = threading.BoundedSemaphore(max_concurrent_batches)
+        self._queue: "queue.SimpleQueue[PendingQuery]" = queue.SimpleQueue()
+        self._senders = ThreadPoolExecutor(max_workers=max_concurrent_batches, thread_name_prefix="embed-batch")
+        self._dispatcher: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, text: str) -> Future:
+        """Queue a query, blocking while the queue is full; the future resolves to its vector."""
+        self._slots.acquire()
+        return self._enqueue(text)
+
+    async def asubmit(self, text: str) -> List[float]:
+        """Queue a query without blocking the event loop and wait for its vector."""
+        # Polled rather than awaited in a thread, so a cancelled caller never holds a slot.
+        while not self._slots.acquire(blocking=False):
+            await asyncio.sleep(max(self.window_seconds, 0.001))
+        return await asyncio.wrap_future(self._enqueue(text))
+
+    def _enqueue(self, text: str) -> Future:
+        self._ensure_dispatcher()
+        future: Future = Future()
+        self._queue.put((text, future, time.perf_counter(), contextvars.copy_context()))
+        return future
+
+    def _ensure_dispatcher(self) -> None:
+        if self._dispatcher is not None:
+            return
+        with self._start_lock:
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch, name="embed-dispatcher", daemon=True)
+                self._dispatcher.start()
+
+    def _dispatch(self) -> None:
+        """Form batches by time window and size, and hand them to the sender pool."""
+        while True:
+            first = self._queue.get()
+            # While every sender is busy, queries pile up and go out together.
+            self._batch_slots.acquire()
+            batch = [first]
+            deadline = first[2] + self.window_seconds
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    if remaining > 0:
+                        batch.append(self._queue.get(timeout=remaining))
+                    else:
+                        batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._senders.submit(self._send, batch)
+
+    def _send(self, batch: List[PendingQuery]) -> None:
+        """Embed one batch and resolve its callers' futures."""
+        sent_at = time.perf_counter()
+        metrics.EMBEDDING_BATCH_SIZE.observe(len(batch))
+        for _, _, enqueued_at, _ in batch:
+            metrics.EMBEDDING_QUEUE_SECONDS.observe(sent_at - enqueued_at)
+
+        # Callers that gave up (e.g. a cancelled task) are dropped from the batch.
+        waiting = [
+            (text, future, context) for text, future, _, context in batch if future.set_running_or_notify_cancel()
+        ]
+        try:
+            texts = list(dict.fromkeys(text for text, _, _ in waiting))
+            with metrics.timings_for(context for _, _, context in waiting):
+                vectors = dict(zip(texts, self.fetch(texts))) if texts else {}
+        except Exception as e:
+            for _, future, _ in waiting:
+                future.set_exception(e)
+        else:
+            for text, future, _ in waiting:
+                future.set_result(vectors[text])
+        finally:
+            self._batch_slots.release()
+            for _ in batch:
+                self._slots.release()
@@ -1,10 +1,10 @@
-from typing import List
-from langchain_core.messages import BaseMessage, AIMessage
-from langchain_core.prompts import ChatPromptTemplate
+from typing import List, Union
+from langchain_core.messages import BaseMessage, AIMessage, HumanMessage, SystemMessage
 from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_openai import ChatOpenAI
 from langchain_anthropic import ChatAnthropic
 from ...config import Config
+from ...utils import metrics
 from ..providers import ModelProvider
 
 class PromptConfig:
@@ -13,6 +13,11 @@ class PromptConfig:
     DEFAULT_ASSISTANT = "./prompts/rag_response.txt"
 
 
+# Anthropic prompt-cache breakpoint: the request prefix up to and including the
+# marked block is cached and re-read on the next call that shares it.
+CACHE_BREAKPOINT = {"type": "ephemeral"}
+
+
 class LLMService:
     def __init__(self, config: Config):
         """Initialize the LLM service with configuration and client selection."""
@@ -50,28 +55,58 @@ class LLMService:
         """Generate an AI response using RAG-style prompt templates and retrieved context."""
 
         formatted_messages = self.build_rag_templates(messages, retrieved)
-        response = self.model.invoke(formatted_messages)
+        with metrics.provider_call("llm", "chat"):
+            response = self.model.invoke(formatted_messages)
+        metrics.record_llm_usage(response.usage_metadata)
+        return response
+
+    async def arag_response(self, messages: List[BaseMessage], retrieved: List[str]) -> AIMessage:
+        """Asynchronously generate an AI response using RAG-style prompt templates."""
+
+        formatted_messages = self.build_rag_templates(messages, retrieved)
+        with metrics.provider_call("llm", "chat"):
+            response = await self.model.ainvoke(formatted_messages)
+        metrics.record_llm_usage(response.usage_metadata)
         return response
 
-    def build_rag_templates(self, messages: List[BaseMessage], retrieved: List[str]):
-        """Build chat messages by combining the conversation with retrieved context templates."""
+    def build_rag_templates(self, messages: List[BaseMessage], retrieved: List[str]) -> List[BaseMessage]:
+        """Build chat messages from the most stable part to the least: the system prompt,
+        the earlier turns, then the retrieved documents (one per line) and the latest question.
+
+        Keeping the per-turn content last lets providers reuse the cached prefix. OpenAI
+        caches prefixes automatically; for Anthropic the end of the system prompt and of
+        the history are marked as cache breakpoints.
+        """
 
         prompt_path = PromptConfig.DEFAULT_ASSISTANT
 
         if self.config.system_prompt:
             prompt_path = self.config.system_prompt
 
-        rag_prompt = self._load_prompt(prompt_path)
-        prompt_w_templates = rag_prompt + "\n" "{messages}" + "\n" + "{retrieved}"
-        prompt_template = ChatPromptTemplate.from_messages([
-            ("human",prompt_w_templates),
+        with metrics.stage("prompt_load"):
+            rag_prompt = self._load_prompt(prompt_path)
+
+        history, question = messages[:-1], messages[-1]
+        cache_prefix = self.config.llm_provider == ModelProvider.ANTHROPIC
+
+        system = SystemMessage(content=self._cacheable(rag_prompt, cache_prefix))
+        if history and cache_prefix:
+            last = history[-1]
+            history = history[:-1] + [last.model_copy(update={"content": self._cacheable(last.text, True)})]
+        latest = HumanMessage(content=[
+            {"type": "text", "text": "# Retrieved documents\n" + "\n".join(retrieved)},
+            {"type": "text", "text": question.text},
         ])
-        
-        retrieved_formatted = prompt_template.format_messages(
-            messages=messages,
-            retrieved=retrieved
-        )    
 
-        formatted = messages + retrieved_formatted
+        formatted = [system, *history, latest]
+        metrics.PROMPT_CHARACTERS.observe(sum(len(message.text) for message in formatted))
 
         return formatted
+
+    @staticmethod
+    def _cacheable(text: str, cache_breakpoint: bool) -> Union[str, List[dict]]:
+        """Return `text` as message content, as a block marked as a cache breakpoint if requested."""
+
+        if not cache_breakpoint:
+            return text
+        return [{"type": "text", "text": text, "cache_control": CACHE_BREAKPOINT}]
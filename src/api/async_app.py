@@ -0,0 +1,20 @@
+import uvicorn
+from starlette.applications import Starlette
+
+from .session import SessionManager
+from .async_routes import router
+from ..rag.graph import RAGGraph
+
+class AsyncRAGAPI:
+    """Starlette (ASGI) application wrapper that wires the RAG graph and session manager."""
+
+    def __init__(self, rag_graph: RAGGraph, session_manager: SessionManager):
+        """Create the Starlette app, attach state and register routes."""
+        self.app = Starlette(debug=False, routes=[router])
+        self.app.state.rag_graph = rag_graph
+        self.app.state.session_manager = session_manager
+
+    def run(self, host: str = "0.0.0.0", port: int = 8000, debug: bool = False) -> None:
+        """Serve the app with uvicorn; requests are handled on a single event loop."""
+        self.app.debug = debug
+        uvicorn.run(self.app, host=host, port=port, log_level="debug" if debug else "info")
@@ -0,0 +1,171 @@
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from typing import AsyncIterator
+import asyncio
+import json
+
+from .session import SessionManager
+from .validation import RETRIEVAL_MODES, parse_batch_queries, timings_requested
+from ..rag.graph import RAGGraph
+from ..utils import metrics
+
+"""Async HTTP handlers for the RAG API endpoints, served over ASGI."""
+
+
+async def handle_query(request: Request) -> Response:
+    """Handle a user query: run RAG, manage session cookies, and return the reply."""
+    rag_graph: RAGGraph = request.app.state.rag_graph
+    session_manager: SessionManager = request.app.state.session_manager
+
+    query = request.query_params.get("q")
+    if not query:
+        return JSONResponse({"error": "Missing required parameter 'q'"}, status_code=400)
+
+    cookie_session_id = request.cookies.get("session-id")
+    # With the SQLite session store, resolving reads and writes the database (and may expire threads).
+    session_id = await asyncio.to_thread(session_manager.resolve, cookie_session_id)
+
+    with metrics.collect_timings() as timings:
+        response = await rag_graph.arun(
+            convo_id=session_id,
+            query=query,
+        )
+
+    body = {
+        "response": response,
+    }
+    if timings_requested(request.headers):
+        body["timings"] = timings
+    resp = JSONResponse(body)
+
+    if session_id != cookie_session_id:
+        resp.set_cookie("session-id", session_id, httponly=True, samesite="lax")
+    return resp
+
+
+async def handle_query_stream(request: Request) -> Response:
+    """Handle a user query, streaming the reply tokens as server-sent events."""
+    rag_graph: RAGGraph = request.app.state.rag_graph
+    session_manager: SessionManager = request.app.state.session_manager
+
+    query = request.query_params.get("q")
+    if not query:
+        return JSONResponse({"error": "Missing required parameter 'q'"}, status_code=400)
+
+    cookie_session_id = request.cookies.get("session-id")
+    session_id = await asyncio.to_thread(session_manager.resolve, cookie_session_id)
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            async for token in rag_graph.astream(convo_id=session_id, query=query):
+                yield f"data: {json.dumps({'token': token})}\n\n"
+        except Exception as e:
+            print(f"Error in handle_query_stream: {str(e)}")
+            yield f"event: error\ndata: {json.dumps({'error': 'Failed to generate response'})}\n\n"
+            return
+        yield "event: end\ndata: {}\n\n"
+
+    resp = StreamingResponse(events(), media_type="text/event-stream")
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Accel-Buffering"] = "no"
+
+    if session_id != cookie_session_id:
+        resp.set_cookie("session-id", session_id, httponly=True, samesite="lax")
+    return resp
+
+
+async def handle_search(request: Request) -> Response:
+    """Search documents using the RAG retriever and return found results."""
+    rag_graph: RAGGraph = request.app.state.rag_graph
+
+    query = request.query_params.get("q")
+    if not query:
+        return JSONResponse({"error": "Missing required parameter 'q'"}, status_code=400)
+
+    try:
+        top_k = request.query_params.get("n_results")
+        top_k = int(top_k) if top_k is not None else None
+    except ValueError:
+        top_k = None
+    category = request.query_params.get("category")
+    mode = request.query_params.get("mode")
+    if mode is not None and mode not in RETRIEVAL_MODES:
+        return JSONResponse({"error": f"'mode' must be one of: {', '.join(RETRIEVAL_MODES)}"}, status_code=400)
+
+    try:
+        with metrics.collect_timings() as timings:
+            results = await rag_graph.aretrieve(query, top_k, category, mode)
+
+        body = {
+            "results": results,
+        }
+        if timings_requested(request.headers):
+            body["timings"] = timings
+        return JSONResponse(body)
+
+    except Exception as e:
+        print(f"Error in handle_search: {str(e)}")
+        return JSONResponse({
+            "error": "Failed to search documents",
+            "details": str(e)
+        }, status_code=500)
+
+
+async def handle_search_batch(request: Request) -> Response:
+    """Search documents for a list of queries in one request, returning results in request order."""
+    rag_graph: RAGGraph = request.app.state.rag_graph
+
+    try:
+        body = await request.json()
+    except ValueError:
+        body = None
+
+    queries, error = parse_batch_queries(body, rag_graph.config.max_search_batch)
+    if error:
+        return JSONResponse({"error": error}, status_code=400)
+
+    try:
+        with metrics.collect_timings() as timings:
+            results = await asyncio.to_thread(rag_graph.retrieve_batch, queries)
+
+        body = {
+            "results": results,
+        }
+        if timings_requested(request.headers):
+            body["timings"] = timings
+        return JSONResponse(body)
+
+    except Exception as e:
+        print(f"Error in handle_search_batch: {str(e)}")
+        return JSONResponse({
+            "error": "Failed to search documents",
+            "details": str(e)
+        }, status_code=500)
+
+
+async def handle_stats(request: Request) -> Response:
+    """Return conversation checkpoint and embedding cache statistics."""
+    rag_graph: RAGGraph = request.app.state.rag_graph
+
+    # Checkpoint statistics may query the SQLite checkpointer, so they are read in a worker thread.
+    stats = await asyncio.to_thread(lambda: {
+        "checkpoints": rag_graph.checkpoint_stats(),
+        "embedding_cache": rag_graph.embedding_service.cache_stats(),
+        "semantic_cache": rag_graph.semantic_cache_stats(),
+    })
+    return JSONResponse(stats)
+
+
+async def handle_categories(request: Request) -> Response:
+    """Return document counts, sizes and last update times per category."""
+    rag_graph: RAGGraph = request.app.state.rag_graph
+
+    categories = await asyncio.to_thread(rag_graph.db_service.stats.all)
+    return JSONResponse({"categories": categories})
+
+
+async def handle_metrics(request: Request) -> Response:
+    """Expose pipeline latency histograms and counters in the Prometheus text format."""
+    payload, content_type = metrics.render()
+
+    return Response(payload, headers={"Content-Type": content_type})
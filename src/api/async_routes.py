@@ -0,0 +1,20 @@
+from starlette.routing import Mount, Route
+from .async_handlers import (
+    handle_categories,
+    handle_metrics,
+    handle_query,
+    handle_query_stream,
+    handle_search,
+    handle_search_batch,
+    handle_stats,
+)
+
+router = Mount("/api/v1", routes=[
+    Route("/query", handle_query, methods=["GET"]),
+    Route("/query/stream", handle_query_stream, methods=["GET"]),
+    Route("/search", handle_search, methods=["GET"]),
+    Route("/search/batch", handle_search_batch, methods=["POST"]),
+    Route("/stats", handle_stats, methods=["GET"]),
+    Route("/categories", handle_categories, methods=["GET"]),
+    Route("/metrics", handle_metrics, methods=["GET"]),
+])
@@ -1,8 +1,11 @@
-from flask import request, jsonify, current_app
-from typing import Tuple, Dict, Any
+from flask import Response, request, jsonify, current_app, stream_with_context
+from typing import Tuple, Dict, Any, Iterator
+import json
 
 from .session import SessionManager
+from .validation import RETRIEVAL_MODES, parse_batch_queries, timings_requested
 from ..rag.graph import RAGGraph
+from ..utils import metrics
 
 """HTTP handlers for the RAG API endpoints."""
 
@@ -22,20 +25,55 @@ def handle_query() -> JsonResponse:
     cookie_session_id = request.cookies.get("session-id")
     session_id = session_manager.resolve(cookie_session_id)
     
-    response = rag_graph.run(
-        convo_id=session_id,
-        query=query,
-    )
+    with metrics.collect_timings() as timings:
+        response = rag_graph.run(
+            convo_id=session_id,
+            query=query,
+        )
 
-    resp = jsonify({
+    body = {
         "response": response,
-    })
+    }
+    if timings_requested(request.headers):
+        body["timings"] = timings
+    resp = jsonify(body)
 
-    if cookie_session_id is None:
+    if session_id != cookie_session_id:
         resp.set_cookie("session-id", session_id, httponly=True, samesite="Lax")
     return resp, 200
         
 
+def handle_query_stream() -> Response:
+    """Handle a user query, streaming the reply tokens as server-sent events."""
+    rag_graph: RAGGraph = current_app.config["rag_graph"]
+    session_manager: SessionManager = current_app.config["session_manager"]
+
+    query = request.args.get("q")
+    if not query:
+        return jsonify({"error": "Missing required parameter 'q'"}), 400
+
+    cookie_session_id = request.cookies.get("session-id")
+    session_id = session_manager.resolve(cookie_session_id)
+
+    def events() -> Iterator[str]:
+        try:
+            for token in rag_graph.stream(convo_id=session_id, query=query):
+                yield f"data: {json.dumps({'token': token})}\n\n"
+        except Exception as e:
+            print(f"Error in handle_query_stream: {str(e)}")
+            yield f"event: error\ndata: {json.dumps({'error': 'Failed to generate response'})}\n\n"
+            return
+        yield "event: end\ndata: {}\n\n"
+
+    resp = Response(stream_with_context(events()), mimetype="text/event-stream")
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Accel-Buffering"] = "no"
+
+    if session_id != cookie_session_id:
+        resp.set_cookie("session-id", session_id, httponly=True, samesite="Lax")
+    return resp
+
+
 def handle_search() -> JsonResponse:
     """Search documents using the RAG retriever and return found results."""
     rag_graph: RAGGraph = current_app.config["rag_graph"]
@@ -46,13 +84,20 @@ def handle_search() -> JsonResponse:
         
     top_k = request.args.get("n_results", type=int)
     category = request.args.get("category")
+    mode = request.args.get("mode")
+    if mode is not None and mode not in RETRIEVAL_MODES:
+        return jsonify({"error": f"'mode' must be one of: {', '.join(RETRIEVAL_MODES)}"}), 400
     
     try:
-        results = rag_graph.retrieve(query, top_k, category)
-        
-        return jsonify({
+        with metrics.collect_timings() as timings:
+            results = rag_graph.retrieve(query, top_k, category, mode)
+
+        body = {
             "results": results,
-        }), 200
+        }
+        if timings_requested(request.headers):
+            body["timings"] = timings
+        return jsonify(body), 200
         
     except Exception as e:
         print(f"Error in handle_search: {str(e)}")
@@ -60,3 +105,55 @@ def handle_search() -> JsonResponse:
             "error": "Failed to search documents",
             "details": str(e)
         }), 500
+
+
+def handle_search_batch() -> JsonResponse:
+    """Search documents for a list of queries in one request, returning results in request order."""
+    rag_graph: RAGGraph = current_app.config["rag_graph"]
+
+    queries, error = parse_batch_queries(request.get_json(silent=True), rag_graph.config.max_search_batch)
+    if error:
+        return jsonify({"error": error}), 400
+
+    try:
+        with metrics.collect_timings() as timings:
+            results = rag_graph.retrieve_batch(queries)
+
+        body = {
+            "results": results,
+        }
+        if timings_requested(request.headers):
+            body["timings"] = timings
+        return jsonify(body), 200
+
+    except Exception as e:
+        print(f"Error in handle_search_batch: {str(e)}")
+        return jsonify({
+            "error": "Failed to search documents",
+            "details": str(e)
+        }), 500
+
+
+def handle_stats() -> JsonResponse:
+    """Return conversation checkpoint and embedding cache statistics."""
+    rag_graph: RAGGraph = current_app.config["rag_graph"]
+
+    return jsonify({
+        "checkpoints": rag_graph.checkpoint_stats(),
+        "embedding_cache": rag_graph.embedding_service.cache_stats(),
+        "semantic_cache": rag_graph.semantic_cache_stats(),
+    }), 200
+
+
+def handle_categories() -> JsonResponse:
+    """Return document counts, sizes and last update times per category."""
+    rag_graph: RAGGraph = current_app.config["rag_graph"]
+
+    return jsonify({"categories": rag_graph.db_service.stats.all()}), 200
+
+
+def handle_metrics() -> Response:
+    """Expose pipeline latency histograms and counters in the Prometheus text format."""
+    payload, content_type = metrics.render()
+
+    return Response(payload, content_type=content_type)
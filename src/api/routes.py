@@ -1,7 +1,20 @@
 from flask import Blueprint
-from .handlers import handle_query, handle_search
+from .handlers import (
+    handle_categories,
+    handle_metrics,
+    handle_query,
+    handle_query_stream,
+    handle_search,
+    handle_search_batch,
+    handle_stats,
+)
 
 router = Blueprint("api", __name__, url_prefix="/api/v1")
 
 router.route("/query", methods=["GET"])(handle_query)
+router.route("/query/stream", methods=["GET"])(handle_query_stream)
 router.route("/search", methods=["GET"])(handle_search)
+router.route("/search/batch", methods=["POST"])(handle_search_batch)
+router.route("/stats", methods=["GET"])(handle_stats)
+router.route("/categories", methods=["GET"])(handle_categories)
+router.route("/metrics", methods=["GET"])(handle_metrics)
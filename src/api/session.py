@@ -1,21 +1,127 @@
-from typing import Optional
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, List, Optional
+import sqlite3
+import threading
+import time
 import uuid
 
 
 class SessionManager:
-    """Manage short-lived session ids stored in memory."""
+    """Manage session ids with idle expiry and a cap on live sessions.
 
-    def __init__(self):
-        self.sessions = []
+    Sessions live in memory by default. When `db_path` is given they are
+    stored in SQLite instead, so they survive restarts and are shared by
+    every worker process on the host. `on_expire` is called with the id of
+    each session that expires or is evicted.
+    """
 
-    def resolve(self, session_id: Optional[str]) -> Optional[str]:
-        """Return an existing session id or create a new one when none provided."""
-        if session_id is None:
-            new_id = uuid.uuid4().hex
-            self.sessions.append(new_id)
-            return new_id
+    def __init__(
+        self,
+        ttl_seconds: Optional[float] = None,
+        max_sessions: Optional[int] = None,
+        db_path: Optional[Path] = None,
+        on_expire: Optional[Callable[[str], None]] = None,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.on_expire = on_expire
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, float]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
 
-        if session_id in self.sessions:
-            return session_id
+        if db_path is not None:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, last_seen REAL NOT NULL) WITHOUT ROWID"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_last_seen ON sessions (last_seen)")
+            self._conn.commit()
 
-        return None
\ No newline at end of file
+    def resolve(self, session_id: Optional[str]) -> str:
+        """Return the given session id if it is live, otherwise create a new one."""
+        now = time.time()
+        with self._lock:
+            expired = self._expire(now)
+
+            if session_id is None or not self._refresh(session_id, now):
+                session_id = uuid.uuid4().hex
+                self._insert(session_id, now)
+                expired += self._evict_excess()
+
+        for expired_id in expired:
+            if self.on_expire is not None:
+                self.on_expire(expired_id)
+
+        return session_id
+
+    def __len__(self) -> int:
+        """Return the number of live sessions."""
+        with self._lock:
+            if self._conn is None:
+                return len(self._sessions)
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def _refresh(self, session_id: str, now: float) -> bool:
+        """Update the last-seen time of a live session. Returns False if it is unknown."""
+        if self._conn is None:
+            if session_id not in self._sessions:
+                return False
+            self._sessions[session_id] = now
+            self._sessions.move_to_end(session_id)
+            return True
+
+        cursor = self._conn.execute("UPDATE sessions SET last_seen = ? WHERE id = ?", (now, session_id))
+        self._conn.commit()
+        return cursor.rowcount > 0
+
+    def _insert(self, session_id: str, now: float) -> None:
+        if self._conn is None:
+            self._sessions[session_id] = now
+            return
+
+        self._conn.execute("INSERT OR REPLACE INTO sessions (id, last_seen) VALUES (?, ?)", (session_id, now))
+        self._conn.commit()
+
+    def _expire(self, now: float) -> List[str]:
+        """Remove sessions idle for longer than the TTL."""
+        if self.ttl_seconds is None:
+            return []
+        cutoff = now - self.ttl_seconds
+
+        if self._conn is None:
+            expired = []
+            # Ordered by last use, so stop at the first live session.
+            while self._sessions:
+                session_id, last_seen = next(iter(self._sessions.items()))
+                if last_seen >= cutoff:
+                    break
+                self._sessions.popitem(last=False)
+                expired.append(session_id)
+            return expired
+
+        rows = self._conn.execute("DELETE FROM sessions WHERE last_seen < ? RETURNING id", (cutoff,)).fetchall()
+        self._conn.commit()
+        return [row[0] for row in rows]
+
+    def _evict_excess(self) -> List[str]:
+        """Remove the least recently used sessions beyond the session cap."""
+        if self.max_sessions is None:
+            return []
+
+        if self._conn is None:
+            evicted = []
+            while len(self._sessions) > self.max_sessions:
+                session_id, _ = self._sessions.popitem(last=False)
+                evicted.append(session_id)
+            return evicted
+
+        rows = self._conn.execute(
+            "DELETE FROM sessions WHERE id IN ("
+            "SELECT id FROM sessions ORDER BY last_seen DESC LIMIT -1 OFFSET ?) RETURNING id",
+            (self.max_sessions,),
+        ).fetchall()
+        self._conn.commit()
+        return [row[0] for row in rows]
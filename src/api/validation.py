@@ -0,0 +1,40 @@
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+"""Request validation shared by the Flask and ASGI handlers."""
+
+DEBUG_TIMING_HEADER = "X-Debug-Timing"
+RETRIEVAL_MODES = ("vector", "hybrid")
+
+
+def timings_requested(headers: Mapping[str, str]) -> bool:
+    """Whether the client asked for a per-request timing breakdown in the response."""
+    return headers.get(DEBUG_TIMING_HEADER, "").lower() in ("1", "true", "yes")
+
+
+def parse_batch_queries(body: Any, max_queries: int) -> Tuple[Optional[List[Dict[str, Any]]], Optional[str]]:
+    """Validate a batch search body. Returns (queries, None) or (None, error message)."""
+    if not isinstance(body, dict) or not isinstance(body.get("queries"), list):
+        return None, "Body must be a JSON object with a 'queries' list"
+
+    raw_queries = body["queries"]
+    if not raw_queries:
+        return None, "'queries' must not be empty"
+    if len(raw_queries) > max_queries:
+        return None, f"At most {max_queries} queries are allowed per request"
+
+    queries = []
+    for i, raw in enumerate(raw_queries):
+        if not isinstance(raw, dict) or not isinstance(raw.get("q"), str) or not raw["q"]:
+            return None, f"Query {i} must be an object with a non-empty 'q'"
+
+        n_results = raw.get("n_results")
+        if n_results is not None and (not isinstance(n_results, int) or isinstance(n_results, bool) or n_results < 1):
+            return None, f"Query {i}: 'n_results' must be a positive integer"
+
+        category = raw.get("category")
+        if category is not None and not isinstance(category, str):
+            return None, f"Query {i}: 'category' must be a string"
+
+        queries.append({"q": raw["q"], "n_results": n_results, "category": category})
+
+    return queries, None
@@ -1,21 +1,51 @@
 import argparse
 from src.utils.document_loader import DocumentLoader
+from src.utils.parallel_loader import ParallelLoader
 
 def parse_args():
     parser = argparse.ArgumentParser(description="RAG Chatbot CLI")
     parser.add_argument("--load", nargs=2, 
                        metavar=('CSV_FILE', 'CATEGORY'),
                        help="Load documents from CSV_FILE into CATEGORY")
+    parser.add_argument("--load-dir", metavar="DIRECTORY",
+                       help="Load every CSV/JSONL file in DIRECTORY, each into a category named after the file")
+    parser.add_argument("--load-manifest", metavar="MANIFEST",
+                       help="Load the files matched by a JSON file mapping glob patterns to categories")
+    parser.add_argument("--workers", type=int, default=None,
+                       help="Number of parser processes for --load-dir and --load-manifest")
+    parser.add_argument("--batch-size", type=int, default=None,
+                       help="Number of documents embedded and upserted per batch when loading, "
+                            "or read and written per page by --export and --import")
+    parser.add_argument("--concurrency", type=int, default=None,
+                       help="Number of batches processed in parallel when loading")
+    parser.add_argument("--prune", action="store_true",
+                       help="When loading, delete documents that are no longer in the file")
+    parser.add_argument("--full", action="store_true",
+                       help="When loading, re-embed every row even if it is unchanged")
+    parser.add_argument("--resume", action="store_true",
+                       help="When loading, continue an interrupted load of the same file")
     parser.add_argument("--delete", 
                        help="Delete all documents in the specified category")
     parser.add_argument("--reset", action="store_true",
                        help="Reset the entire document storage")
+    parser.add_argument("--reindex", action="store_true",
+                       help="Rebuild the lexical (BM25) index from the stored documents")
+    parser.add_argument("--rebuild-stats", action="store_true",
+                       help="Recount category statistics with a metadata-only scan")
+    parser.add_argument("--migrate-layout", action="store_true",
+                       help="Move stored documents into the Chroma collection layout set by CHROMA_LAYOUT")
+    parser.add_argument("--export", metavar="SNAPSHOT",
+                       help="Write the stored documents and embeddings to the SNAPSHOT directory")
+    parser.add_argument("--import", dest="import_snapshot", metavar="SNAPSHOT",
+                       help="Load the documents and embeddings of a SNAPSHOT written by --export")
     parser.add_argument("--list", action="store_true",
                        help="List all categories and their document counts")
     parser.add_argument("--host", default="0.0.0.0", 
                        help="API host")
     parser.add_argument("--port", type=int, default=8000, 
                        help="API port")
+    parser.add_argument("--server", choices=["flask", "async"], default="flask",
+                       help="API server: Flask (WSGI, threaded) or async (ASGI, uvicorn)")
     parser.add_argument("--debug", action="store_true", 
                        help="Run in debug mode")
     return parser.parse_args()
@@ -23,7 +53,8 @@ def parse_args():
 
 def handle_cli(args, embedding_service, db_service):
     """Handle CLI document management commands."""
-    if args.load or args.delete or args.reset or args.list:
+    if args.load or args.load_dir or args.load_manifest or args.delete or args.reset or args.list or args.reindex \
+            or args.rebuild_stats or args.migrate_layout or args.export or args.import_snapshot:
         try:
             document_loader = DocumentLoader(embedding_service, db_service)
             if args.reset:
@@ -31,10 +62,43 @@ def handle_cli(args, embedding_service, db_service):
             elif args.load:
                 csv_file, category = args.load
                 print(f"Loading documents from {csv_file} into category '{category}'...")
-                document_loader.load_documents(csv_file, category)
+                document_loader.load_documents(
+                    csv_file,
+                    category,
+                    batch_size=args.batch_size,
+                    concurrency=args.concurrency,
+                    prune=args.prune,
+                    full=args.full,
+                    resume=args.resume,
+                )
+            elif args.load_dir or args.load_manifest:
+                if args.resume:
+                    raise ValueError("--resume is only supported with --load")
+                if args.load_dir:
+                    plan = ParallelLoader.plan_directory(args.load_dir)
+                else:
+                    plan = ParallelLoader.plan_manifest(args.load_manifest)
+                ParallelLoader(document_loader).load_files(
+                    plan,
+                    batch_size=args.batch_size,
+                    concurrency=args.concurrency,
+                    workers=args.workers,
+                    prune=args.prune,
+                    full=args.full,
+                )
             elif args.delete:
                 print(f"Deleting all documents in category '{args.delete}'...")
                 document_loader.clear_documents(args.delete)
+            elif args.reindex:
+                document_loader.rebuild_lexical_index()
+            elif args.rebuild_stats:
+                document_loader.rebuild_category_stats()
+            elif args.migrate_layout:
+                document_loader.migrate_layout()
+            elif args.export:
+                document_loader.export_snapshot(args.export, page_size=args.batch_size)
+            elif args.import_snapshot:
+                document_loader.import_snapshot(args.import_snapshot, page_size=args.batch_size)
             elif args.list:
                 document_loader.list_categories()
         except Exception as e:
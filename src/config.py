@@ -11,11 +11,66 @@ class Config:
         self.embed_api_key = None
         self.llm_model = self._determine_env_var("LLM_MODEL")
         self.embeddings_model = self._determine_env_var("EMBEDDINGS_MODEL")
+        embedding_dimensions = os.getenv("EMBEDDING_DIMENSIONS")
+        self.embedding_dimensions = int(embedding_dimensions) if embedding_dimensions else None
         self.chroma_db_dir = self._determine_env_var("CHROMA_DB_DIR")
         self.system_prompt = os.getenv("SYSTEM_PROMPT", None)
+        self.embedding_cache_enabled = os.getenv("EMBEDDING_CACHE", "true").lower() != "false"
+        self.embedding_cache_size = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+        self.embedding_cache_disk_size = int(os.getenv("EMBEDDING_CACHE_DISK_SIZE", "1000000"))
+        self.embed_batch_window_ms = float(os.getenv("EMBED_BATCH_WINDOW_MS", "0"))
+        self.embed_batch_max_size = int(os.getenv("EMBED_BATCH_MAX_SIZE", "64"))
+        self.embed_batch_max_pending = int(os.getenv("EMBED_BATCH_MAX_PENDING", "1024"))
         self._set_llm_provider()
         self._set_embeddings_provider()
         self.top_k = 5
+        self.max_search_batch = 256
+        self.ingest_batch_size = 64
+        self.ingest_concurrency = 4
+        self.ingest_chunk_rows = 10000
+        self.ingest_parse_workers = min(4, os.cpu_count() or 1)
+        self.max_turns_per_thread = int(os.getenv("MAX_TURNS_PER_THREAD", "20"))
+        self.max_retrieved_per_thread = int(os.getenv("MAX_RETRIEVED_PER_THREAD", "50"))
+        self.context_token_budget = int(os.getenv("CONTEXT_TOKEN_BUDGET", "6000"))
+        self.thread_ttl_seconds = float(os.getenv("THREAD_TTL_SECONDS", "3600"))
+        self.max_threads = int(os.getenv("MAX_THREADS", "1000"))
+        self.session_ttl_seconds = float(os.getenv("SESSION_TTL_SECONDS", "86400"))
+        self.max_sessions = int(os.getenv("MAX_SESSIONS", "10000"))
+        self.semantic_cache_enabled = os.getenv("SEMANTIC_CACHE", "false").lower() == "true"
+        self.semantic_cache_threshold = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+        self.semantic_cache_size = int(os.getenv("SEMANTIC_CACHE_SIZE", "1000"))
+        self.semantic_cache_ttl_seconds = float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "3600"))
+        self.checkpointer = os.getenv("CHECKPOINTER", "memory")
+        if self.checkpointer not in ("memory", "sqlite"):
+            raise ValueError(f"Unknown CHECKPOINTER: {self.checkpointer}")
+        self.vector_store = os.getenv("VECTOR_STORE", "chroma")
+        if self.vector_store not in ("chroma", "numpy"):
+            raise ValueError(f"Unknown VECTOR_STORE: {self.vector_store}")
+        self.chroma_layout = os.getenv("CHROMA_LAYOUT", "single")
+        if self.chroma_layout not in ("single", "per_category"):
+            raise ValueError(f"Unknown CHROMA_LAYOUT: {self.chroma_layout}")
+        self.hnsw_space = os.getenv("HNSW_SPACE", "l2")
+        if self.hnsw_space not in ("l2", "cosine", "ip"):
+            raise ValueError(f"Unknown HNSW_SPACE: {self.hnsw_space}")
+        self.hnsw_construction_ef = int(os.getenv("HNSW_CONSTRUCTION_EF", "100"))
+        self.hnsw_search_ef = int(os.getenv("HNSW_SEARCH_EF", "100"))
+        self.hnsw_m = int(os.getenv("HNSW_M", "16"))
+        self.numpy_store_dtype = os.getenv("NUMPY_STORE_DTYPE", "float32")
+        if self.numpy_store_dtype not in ("float32", "float16"):
+            raise ValueError(f"Unknown NUMPY_STORE_DTYPE: {self.numpy_store_dtype}")
+        self.numpy_store_quantization = os.getenv("NUMPY_STORE_QUANTIZATION", "none")
+        if self.numpy_store_quantization not in ("none", "int8", "float16"):
+            raise ValueError(f"Unknown NUMPY_STORE_QUANTIZATION: {self.numpy_store_quantization}")
+        self.numpy_rescore_factor = int(os.getenv("NUMPY_RESCORE_FACTOR", "4"))
+        self.retrieval_mode = os.getenv("RETRIEVAL_MODE", "vector")
+        if self.retrieval_mode not in ("vector", "hybrid"):
+            raise ValueError(f"Unknown RETRIEVAL_MODE: {self.retrieval_mode}")
+        self.always_retrieve = os.getenv("ALWAYS_RETRIEVE", "false").lower() == "true"
+        self.router_similarity_threshold = float(os.getenv("ROUTER_SIMILARITY_THRESHOLD", "0.9"))
+        self.lexical_confidence_margin = float(os.getenv("LEXICAL_CONFIDENCE_MARGIN", "1.5"))
+        self.session_store = os.getenv("SESSION_STORE", "memory")
+        if self.session_store not in ("memory", "sqlite"):
+            raise ValueError(f"Unknown SESSION_STORE: {self.session_store}")
 
     def _set_llm_provider(self):
         llm_model = self.llm_model
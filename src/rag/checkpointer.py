@@ -0,0 +1,338 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Set, Tuple
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import ChannelVersions, Checkpoint, CheckpointMetadata, CheckpointTuple
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.types import Overwrite
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """In-memory checkpointer with bounded history and idle-thread eviction.
+
+    LangGraph keeps every intermediate checkpoint of every thread. After each
+    turn, `prune_history` drops all but the latest checkpoint of a thread;
+    `touch` evicts threads idle for longer than `ttl_seconds` and the least
+    recently used threads beyond `max_threads`.
+
+    Every read and write of the stores takes one lock, since Flask serves
+    conversations from several threads, and the blob and write keys of each
+    thread are indexed so pruning and eviction only visit that thread's keys.
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = None, max_threads: Optional[int] = None):
+        super().__init__()
+        self.ttl_seconds = ttl_seconds
+        self.max_threads = max_threads
+        self._last_seen: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._blob_keys: Dict[str, Set[Tuple[str, str, str, Any]]] = {}
+        self._write_keys: Dict[str, Set[Tuple[str, str, str]]] = {}
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Read a checkpoint while no other thread is writing."""
+        with self._lock:
+            return super().get_tuple(config)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Save a checkpoint and index its blobs under the thread."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        with self._lock:
+            saved = super().put(config, checkpoint, metadata, new_versions)
+            self._blob_keys.setdefault(thread_id, set()).update(
+                (thread_id, checkpoint_ns, channel, version) for channel, version in new_versions.items()
+            )
+            return saved
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Store pending writes and index them under the thread."""
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        with self._lock:
+            super().put_writes(config, writes, task_id, task_path)
+            self._write_keys.setdefault(thread_id, set()).add(
+                (thread_id, configurable.get("checkpoint_ns", ""), configurable["checkpoint_id"])
+            )
+
+    def touch(self, thread_id: str) -> List[str]:
+        """Mark a thread as active and evict idle or excess threads. Returns evicted ids."""
+        now = time.monotonic()
+        evicted = []
+        with self._lock:
+            self._last_seen[thread_id] = now
+            self._last_seen.move_to_end(thread_id)
+
+            if self.ttl_seconds is not None:
+                for other_id, last_seen in list(self._last_seen.items()):
+                    if now - last_seen <= self.ttl_seconds:
+                        # Entries are ordered by last use, so the rest are fresher.
+                        break
+                    evicted.append(other_id)
+                    self._forget(other_id)
+
+            if self.max_threads is not None:
+                while len(self._last_seen) > self.max_threads:
+                    other_id = next(iter(self._last_seen))
+                    evicted.append(other_id)
+                    self._forget(other_id)
+
+        return evicted
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Delete all checkpoints of a thread and stop tracking it."""
+        with self._lock:
+            self._forget(thread_id)
+
+    def _forget(self, thread_id: str) -> None:
+        self._last_seen.pop(thread_id, None)
+        self.storage.pop(thread_id, None)
+        for key in self._write_keys.pop(thread_id, ()):
+            self.writes.pop(key, None)
+        for key in self._blob_keys.pop(thread_id, ()):
+            self.blobs.pop(key, None)
+
+    def prune_history(self, thread_id: str) -> None:
+        """Keep only the latest checkpoint (and the blobs it references) of a thread."""
+        with self._lock:
+            for checkpoint_ns, checkpoints in self.storage.get(thread_id, {}).items():
+                if len(checkpoints) <= 1:
+                    continue
+
+                latest_id = max(checkpoints)
+                latest = self.serde.loads_typed(checkpoints[latest_id][0])
+                live_versions = latest.get("channel_versions", {})
+
+                write_keys = self._write_keys.get(thread_id, set())
+                for checkpoint_id in [cid for cid in checkpoints if cid != latest_id]:
+                    del checkpoints[checkpoint_id]
+                    self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+                    write_keys.discard((thread_id, checkpoint_ns, checkpoint_id))
+
+                blob_keys = self._blob_keys.get(thread_id, set())
+                stale_blobs = [
+                    key for key in blob_keys
+                    if key[1] == checkpoint_ns and live_versions.get(key[2]) != key[3]
+                ]
+                for key in stale_blobs:
+                    self.blobs.pop(key, None)
+                    blob_keys.discard(key)
+
+    # Pruning and eviction only touch the keys of the threads involved, so the
+    # async variants run them inline.
+
+    async def atouch(self, thread_id: str) -> List[str]:
+        return self.touch(thread_id)
+
+    async def aprune_history(self, thread_id: str) -> None:
+        self.prune_history(thread_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the number of tracked threads and the serialized checkpoint footprint in bytes."""
+        with self._lock:
+            size = 0
+            for namespaces in self.storage.values():
+                for checkpoints in namespaces.values():
+                    for checkpoint, metadata, _ in checkpoints.values():
+                        size += len(checkpoint[1]) + len(metadata[1])
+            for writes in self.writes.values():
+                for _, _, value, _ in writes.values():
+                    size += len(value[1])
+            for _, value in self.blobs.values():
+                size += len(value)
+
+            return {
+                "threads": len(self.storage),
+                "checkpoints": sum(
+                    len(checkpoints)
+                    for namespaces in self.storage.values()
+                    for checkpoints in namespaces.values()
+                ),
+                "bytes": size,
+            }
+
+
+def _strip_documents(value: Any) -> Any:
+    """Drop document bodies from retrieved results, keeping ids and categories."""
+    if isinstance(value, Overwrite):
+        return Overwrite(_strip_documents(value.value))
+    if not isinstance(value, list):
+        return value
+    return [
+        {key: item[key] for key in item if key != "document"} if isinstance(item, dict) else item
+        for item in value
+    ]
+
+
+class SqliteCheckpointer(SqliteSaver):
+    """Durable checkpointer backed by a local SQLite file in WAL mode.
+
+    Several worker processes on the same host can share the file, so any of
+    them can continue a conversation. Only messages and the ids of retrieved
+    documents are stored; the retrieve node re-reads document bodies from the
+    vector store. Thread activity is tracked in the same file so idle-thread
+    eviction and `max_threads` apply across processes.
+    """
+
+    def __init__(self, db_path: Path, ttl_seconds: Optional[float] = None, max_threads: Optional[int] = None):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30)
+        super().__init__(conn)
+        self.ttl_seconds = ttl_seconds
+        self.max_threads = max_threads
+        with self.cursor() as cur:
+            cur.execute(
+                "CREATE TABLE IF NOT EXISTS thread_activity "
+                "(thread_id TEXT PRIMARY KEY, last_seen REAL NOT NULL) WITHOUT ROWID"
+            )
+            cur.execute("CREATE INDEX IF NOT EXISTS thread_activity_last_seen ON thread_activity (last_seen)")
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Save a checkpoint without the bodies of retrieved documents."""
+        if "retrieved" in checkpoint.get("channel_values", {}):
+            channel_values = dict(checkpoint["channel_values"])
+            channel_values["retrieved"] = _strip_documents(channel_values["retrieved"])
+            checkpoint = {**checkpoint, "channel_values": channel_values}
+        return super().put(config, checkpoint, metadata, new_versions)
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Store pending writes without the bodies of retrieved documents."""
+        writes = [
+            (channel, _strip_documents(value) if channel == "retrieved" else value)
+            for channel, value in writes
+        ]
+        super().put_writes(config, writes, task_id, task_path)
+
+    def touch(self, thread_id: str) -> List[str]:
+        """Mark a thread as active and evict idle or excess threads. Returns evicted ids."""
+        now = time.time()
+        evicted = []
+        with self.cursor() as cur:
+            cur.execute(
+                "INSERT OR REPLACE INTO thread_activity (thread_id, last_seen) VALUES (?, ?)",
+                (thread_id, now),
+            )
+            if self.ttl_seconds is not None:
+                rows = cur.execute(
+                    "DELETE FROM thread_activity WHERE last_seen < ? RETURNING thread_id",
+                    (now - self.ttl_seconds,),
+                ).fetchall()
+                evicted += [row[0] for row in rows]
+            if self.max_threads is not None:
+                rows = cur.execute(
+                    "DELETE FROM thread_activity WHERE thread_id IN ("
+                    "SELECT thread_id FROM thread_activity ORDER BY last_seen DESC LIMIT -1 OFFSET ?) "
+                    "RETURNING thread_id",
+                    (self.max_threads,),
+                ).fetchall()
+                evicted += [row[0] for row in rows]
+            for other_id in evicted:
+                cur.execute("DELETE FROM checkpoints WHERE thread_id = ?", (other_id,))
+                cur.execute("DELETE FROM writes WHERE thread_id = ?", (other_id,))
+        return evicted
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Delete all checkpoints of a thread and stop tracking it."""
+        super().delete_thread(thread_id)
+        with self.cursor() as cur:
+            cur.execute("DELETE FROM thread_activity WHERE thread_id = ?", (str(thread_id),))
+
+    def prune_history(self, thread_id: str) -> None:
+        """Keep only the latest checkpoint (and its pending writes) of a thread."""
+        with self.cursor() as cur:
+            latest = cur.execute(
+                "SELECT checkpoint_ns, MAX(checkpoint_id) FROM checkpoints WHERE thread_id = ? GROUP BY checkpoint_ns",
+                (thread_id,),
+            ).fetchall()
+            for checkpoint_ns, latest_id in latest:
+                for table in ("checkpoints", "writes"):
+                    cur.execute(
+                        f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id != ?",
+                        (thread_id, checkpoint_ns, latest_id),
+                    )
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the number of stored threads and checkpoints and the database size in bytes."""
+        with self.cursor(transaction=False) as cur:
+            threads, checkpoints = cur.execute(
+                "SELECT COUNT(DISTINCT thread_id), COUNT(*) FROM checkpoints"
+            ).fetchone()
+            page_count = cur.execute("PRAGMA page_count").fetchone()[0]
+            page_size = cur.execute("PRAGMA page_size").fetchone()[0]
+        return {"threads": threads, "checkpoints": checkpoints, "bytes": page_count * page_size}
+
+    # SqliteSaver is synchronous only; the async API runs it in a worker thread
+    # so the ASGI server can share the same store.
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    async def atouch(self, thread_id: str) -> List[str]:
+        return await asyncio.to_thread(self.touch, thread_id)
+
+    async def aprune_history(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.prune_history, thread_id)
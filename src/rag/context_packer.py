@@ -0,0 +1,151 @@
+import json
+from typing import Any, Dict, List, NamedTuple
+from langchain_core.messages import AnyMessage, HumanMessage
+
+"""Fits retrieved documents and conversation history into a token budget before generation."""
+
+# Rough per-message overhead (role and separators) added by chat APIs.
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate a text's token count at four characters per token.
+
+    Provider tokenizers differ and some need a network call, so packing uses
+    this cheap estimate; budgets should leave some headroom.
+    """
+
+    return (len(text) + 3) // 4
+
+
+def _message_tokens(message: AnyMessage) -> int:
+    """Estimated tokens of one chat message."""
+
+    return estimate_tokens(message.text) + MESSAGE_OVERHEAD_TOKENS
+
+
+def _render_value(value: Any) -> str:
+    """Render a field value without JSON quoting for plain strings."""
+
+    if isinstance(value, str):
+        return " ".join(value.split())
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def compact_content(content: str) -> str:
+    """Rewrite a stored document as "key: value; key: value".
+
+    Handles the "{column: value}, {column: value}" form produced for CSV rows
+    and JSON objects from JSONL files, dropping empty fields and collapsing
+    whitespace. Anything else is returned with whitespace collapsed.
+    """
+
+    fields = None
+    if content.startswith("{") and content.endswith("}"):
+        try:
+            record = json.loads(content)
+        except ValueError:
+            parts = content[1:-1].split("}, {")
+            if all(": " in part for part in parts):
+                fields = [part.split(": ", 1) for part in parts]
+        else:
+            if isinstance(record, dict):
+                fields = list(record.items())
+
+    if fields is None:
+        return " ".join(content.split())
+    return "; ".join(
+        f"{key}: {_render_value(value)}" for key, value in fields if value not in ("", None)
+    )
+
+
+def render_document(doc: Dict[str, Any]) -> str:
+    """One retrieved document as a single prompt line."""
+
+    return f"[{doc['id']}] ({doc['category']}) {compact_content(doc['document'])}"
+
+
+class PackedContext(NamedTuple):
+    """Conversation and documents chosen for one generation, with token estimates."""
+
+    messages: List[AnyMessage]
+    documents: List[str]
+    unpacked_tokens: int
+    tokens: int
+
+
+class ContextPacker:
+    """
+    Chooses what goes into the prompt within a token budget:
+
+    - the current question is always kept;
+    - documents are deduplicated by ID, keeping the most recent retrieval;
+    - documents retrieved this turn come first, in rank order;
+    - earlier conversation turns are added newest first, so the oldest are
+      the first to be left out;
+    - documents from earlier turns fill whatever budget remains.
+    """
+
+    def __init__(self, token_budget: int):
+        self.token_budget = token_budget
+
+    def pack(self, messages: List[AnyMessage], retrieved: List[Dict[str, Any]]) -> PackedContext:
+        """Select and render the history and documents for the next generation."""
+
+        unpacked_tokens = sum(_message_tokens(message) for message in messages) + sum(
+            estimate_tokens(str(doc)) for doc in retrieved
+        )
+
+        turns = self._split_turns(messages)
+        current = turns.pop() if turns else []
+        used = sum(_message_tokens(message) for message in current)
+
+        newest: Dict[str, Dict[str, Any]] = {}
+        for doc in retrieved:
+            # A later retrieval of the same document replaces the earlier one.
+            newest.pop(doc["id"], None)
+            newest[doc["id"]] = doc
+        current_turn = max((doc.get("turn", 0) for doc in newest.values()), default=0)
+        fresh = [doc for doc in newest.values() if doc.get("turn", 0) == current_turn]
+        # Earlier turns newest first, each in its original rank order.
+        older = sorted(
+            (doc for doc in newest.values() if doc.get("turn", 0) != current_turn),
+            key=lambda doc: -doc.get("turn", 0),
+        )
+
+        documents: List[str] = []
+        used = self._fill(fresh, documents, used)
+
+        history: List[AnyMessage] = []
+        for turn in reversed(turns):
+            cost = sum(_message_tokens(message) for message in turn)
+            if used + cost > self.token_budget:
+                break
+            history = turn + history
+            used += cost
+
+        used = self._fill(older, documents, used)
+
+        return PackedContext(history + current, documents, unpacked_tokens, used)
+
+    def _fill(self, docs: List[Dict[str, Any]], documents: List[str], used: int) -> int:
+        """Append rendered documents that still fit in the budget; return the tokens used."""
+
+        for doc in docs:
+            line = render_document(doc)
+            cost = estimate_tokens(line) + 1
+            if used + cost <= self.token_budget:
+                documents.append(line)
+                used += cost
+        return used
+
+    @staticmethod
+    def _split_turns(messages: List[AnyMessage]) -> List[List[AnyMessage]]:
+        """Group messages into turns, each starting at a user message."""
+
+        turns: List[List[AnyMessage]] = []
+        for message in messages:
+            if isinstance(message, HumanMessage) or not turns:
+                turns.append([])
+            turns[-1].append(message)
+        return turns
@@ -1,12 +1,25 @@
-from langgraph.graph import START, StateGraph
-from langgraph.checkpoint.memory import MemorySaver
-from langchain_core.messages import HumanMessage
-from .nodes import build_embed_query_func, build_generate_res_func, build_retrieve_func
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from langgraph.graph import END, START, StateGraph
+from langchain_core.messages import AIMessage, HumanMessage
+from pathlib import Path
+from .checkpointer import BoundedMemorySaver, SqliteCheckpointer
+from .nodes import (
+    build_cache_lookup_func,
+    build_cache_store_func,
+    build_embed_query_func,
+    build_generate_res_func,
+    build_lexical_func,
+    build_retrieve_func,
+    build_reuse_context_func,
+)
+from .retrieval_router import RetrievalRouter
+from .semantic_cache import SemanticCache
 from .state import RAGState
 from ..ai.embeddings.embedding_service import EmbeddingService
-from ..vdb.chromadb_service import ChromaDBService
+from ..vdb.vector_store import VectorStore
 from ..ai.llm.llm_service import LLMService
 from ..config import Config
+from ..utils import metrics
 
 
 class RAGGraph():
@@ -16,42 +29,193 @@ class RAGGraph():
         self,
         llm_service: LLMService,
         embedding_service: EmbeddingService,
-        db_service: ChromaDBService,
+        db_service: VectorStore,
         config: Config
     ):
         self.config: Config = config
         self.embedding_service: EmbeddingService = embedding_service
         self.llm_service: LLMService = llm_service
-        self.db_service: ChromaDBService = db_service
-        self.checkpointer = MemorySaver()
+        self.db_service: VectorStore = db_service
+        self.checkpointer = self._get_checkpointer()
+        self.semantic_cache = self._get_semantic_cache()
+        self.router = RetrievalRouter(self.config.router_similarity_threshold)
+
+    def _get_checkpointer(self):
+        """Create the configured conversation checkpointer."""
+
+        checkpointer_factory = {
+            "memory": lambda: BoundedMemorySaver(
+                ttl_seconds=self.config.thread_ttl_seconds,
+                max_threads=self.config.max_threads,
+            ),
+            "sqlite": lambda: SqliteCheckpointer(
+                db_path=Path(self.config.chroma_db_dir) / "checkpoints.sqlite3",
+                ttl_seconds=self.config.thread_ttl_seconds,
+                max_threads=self.config.max_threads,
+            ),
+        }.get(self.config.checkpointer)
+
+        return checkpointer_factory()
+
+    def _get_semantic_cache(self) -> Optional[SemanticCache]:
+        """Create the semantic answer cache when enabled."""
+
+        if not self.config.semantic_cache_enabled:
+            return None
+        return SemanticCache(
+            versions=self.db_service.versions,
+            threshold=self.config.semantic_cache_threshold,
+            max_entries=self.config.semantic_cache_size,
+            ttl_seconds=self.config.semantic_cache_ttl_seconds,
+        )
 
     def _build_rag_graph(self):
-        """Compile graph that returns a conversational response"""
+        """Compile graph that returns a conversational response.
+
+        Unless `ALWAYS_RETRIEVE` is set, turns that only follow up on the previous
+        answer, or ask about the same thing again, skip retrieval and are answered
+        from the documents already retrieved for the conversation.
+        """
         workflow = StateGraph(state_schema=RAGState)
-        workflow.add_edge(START, "embed")
+        if self.config.always_retrieve:
+            workflow.add_edge(START, "embed")
+        else:
+            workflow.add_conditional_edges(START, self._route_turn, ["embed", "reuse_context"])
         workflow.add_node("embed", build_embed_query_func(self.embedding_service))
-        workflow.add_edge("embed", "retrieve")
-        workflow.add_node("retrieve", build_retrieve_func(self.db_service))
+        if self.semantic_cache is not None:
+            workflow.add_edge("embed", "cache_lookup")
+            workflow.add_node("cache_lookup", build_cache_lookup_func(self.semantic_cache))
+            workflow.add_conditional_edges(
+                "cache_lookup", self._route_after_cache_lookup, ["retrieve", "reuse_context", END]
+            )
+        else:
+            workflow.add_conditional_edges("embed", self._route_after_embed, ["retrieve", "reuse_context"])
+        workflow.add_node("reuse_context", build_reuse_context_func(self.db_service))
+        workflow.add_edge("reuse_context", "generate")
+        workflow.add_node("retrieve", build_retrieve_func(self.db_service, self.config.max_retrieved_per_thread))
         workflow.add_edge("retrieve", "generate")
-        workflow.add_node("generate", build_generate_res_func(self.llm_service))
+        workflow.add_node("generate", build_generate_res_func(
+            self.llm_service, self.config.max_turns_per_thread, self.config.context_token_budget
+        ))
+        if self.semantic_cache is not None:
+            workflow.add_edge("generate", "cache_store")
+            workflow.add_node("cache_store", build_cache_store_func(self.semantic_cache))
+
+        with metrics.stage("graph_compile"):
+            return workflow.compile(checkpointer=self.checkpointer)
+
+    def _route_turn(self, state: RAGState) -> str:
+        """Reuse the conversation's documents, without embedding the question, when
+        the question only follows up on the previous answer."""
 
-        return workflow.compile(checkpointer=self.checkpointer)
-    
-    def _build_retriever_graph(self):
-        """Compile graph that returns retrieved documents."""
+        if state.get("retrieved") and self.router.is_follow_up(state["messages"][-1].text):
+            metrics.record_retrieval_route("skip", "follow_up")
+            return "reuse_context"
+        return "embed"
+
+    def _route_after_embed(self, state: RAGState) -> str:
+        """Reuse the conversation's documents when the question is about the same thing
+        as the one they were retrieved for."""
+
+        if self.config.always_retrieve:
+            metrics.record_retrieval_route("retrieve", "forced")
+            return "retrieve"
+        if not state.get("retrieved") or "retrieval_embed" not in state:
+            metrics.record_retrieval_route("retrieve", "no_context")
+            return "retrieve"
+        if self.router.is_same_topic(state["query_embed"], state["retrieval_embed"]):
+            metrics.record_retrieval_route("skip", "same_topic")
+            return "reuse_context"
+        metrics.record_retrieval_route("retrieve", "new_topic")
+        return "retrieve"
+
+    def _route_after_cache_lookup(self, state: RAGState) -> str:
+        """Finish the turn when the cache lookup already produced the answer."""
+
+        if isinstance(state["messages"][-1], AIMessage):
+            return END
+        return self._route_after_embed(state)
+
+    def _build_retriever_graph(self, mode: str = "vector"):
+        """Compile graph that returns retrieved documents.
+
+        In "hybrid" mode a BM25 lookup runs first; a confident lexical match is
+        returned without embedding the query, otherwise the lexical results are
+        fused with the vector results.
+        """
 
         workflow = StateGraph(state_schema=RAGState)
-        workflow.add_edge(START, "embed")
+        if mode == "hybrid":
+            workflow.add_edge(START, "lexical")
+            workflow.add_node("lexical", build_lexical_func(self.db_service))
+            workflow.add_conditional_edges("lexical", self._route_after_lexical, ["embed", END])
+        else:
+            workflow.add_edge(START, "embed")
         workflow.add_node("embed", build_embed_query_func(self.embedding_service))
         workflow.add_edge("embed", "retrieve")
         workflow.add_node("retrieve", build_retrieve_func(self.db_service))
 
-        return workflow.compile()
+        with metrics.stage("graph_compile"):
+            return workflow.compile()
+
+    @staticmethod
+    def _route_after_lexical(state: RAGState) -> str:
+        """Skip embedding and vector search when the lexical lookup was confident."""
+
+        return END if state["retrieved"] else "embed"
+
+    def _start_turn(self, convo_id: str, query: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Register activity on the thread (evicting stale ones) and build the run inputs."""
+
+        self.checkpointer.touch(convo_id)
+        return self._turn_inputs(convo_id, query)
+
+    async def _astart_turn(self, convo_id: str, query: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Async counterpart of `_start_turn`; checkpointer bookkeeping stays off the event loop."""
+
+        await self.checkpointer.atouch(convo_id)
+        return self._turn_inputs(convo_id, query)
+
+    def _turn_inputs(self, convo_id: str, query: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        config = {"configurable": {"thread_id": convo_id}}
+        initial_state = {
+            "messages": [HumanMessage(query)],
+            "top_k": self.config.top_k,
+            "category": None
+        }
+        return config, initial_state
+
+    def _end_turn(self, convo_id: str) -> None:
+        """Drop the checkpoints superseded by the one written at the end of the turn."""
+
+        self.checkpointer.prune_history(convo_id)
+
+    async def _aend_turn(self, convo_id: str) -> None:
+        """Async counterpart of `_end_turn`."""
+
+        await self.checkpointer.aprune_history(convo_id)
+
+    def forget(self, convo_id: str) -> None:
+        """Release all stored state of a conversation."""
+
+        self.checkpointer.delete_thread(convo_id)
+
+    def checkpoint_stats(self) -> Dict[str, Any]:
+        """Return the number of stored threads and their checkpoint memory footprint."""
+
+        return self.checkpointer.stats()
+
+    def semantic_cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Return semantic cache hit-rate metrics, or None when the cache is disabled."""
 
-    def retrieve(self, query: str, top_k=None, category=None) -> str:
-        """Runs the retriever workflow."""
+        if self.semantic_cache is None:
+            return None
+        return self.semantic_cache.stats()
 
-        retrieval_workflow = self._build_retriever_graph()
+    def retrieve(self, query: str, top_k=None, category=None, mode=None) -> str:
+        """Runs the retriever workflow in the given retrieval mode (default from config)."""
+
+        retrieval_workflow = self._build_retriever_graph(mode or self.config.retrieval_mode)
         query_as_msg = HumanMessage(query)
         if top_k is None:
             top_k = self.config.top_k
@@ -60,20 +224,106 @@ class RAGGraph():
         return result["retrieved"]
 
 
+    def retrieve_batch(self, queries: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Retrieve documents for many queries with one embedding call and one DB query per category.
+
+        Each query is a dict with a `q` text and optional `n_results` and `category`.
+        Results are returned in request order.
+        """
+
+        embeddings = self.embedding_service.embed_queries([query["q"] for query in queries])
+
+        groups: Dict[Optional[str], List[int]] = {}
+        for i, query in enumerate(queries):
+            groups.setdefault(query.get("category"), []).append(i)
+
+        results: List[List[Dict[str, Any]]] = [[] for _ in queries]
+        for category, indexes in groups.items():
+            group_results = self.db_service.query_batch(
+                [embeddings[i] for i in indexes],
+                [queries[i].get("n_results") or self.config.top_k for i in indexes],
+                category,
+            )
+            for i, retrieved in zip(indexes, group_results):
+                results[i] = retrieved
+
+        return results
+
+    async def aretrieve(self, query: str, top_k=None, category=None, mode=None) -> str:
+        """Runs the retriever workflow without blocking the event loop."""
+
+        retrieval_workflow = self._build_retriever_graph(mode or self.config.retrieval_mode)
+        query_as_msg = HumanMessage(query)
+        if top_k is None:
+            top_k = self.config.top_k
+        result = await retrieval_workflow.ainvoke({"messages": [query_as_msg], "top_k": top_k, "category": category})
+
+        return result["retrieved"]
+
     def run(self, convo_id: str, query: str) -> str:
         """Runs the conversational RAG workflow"""
 
-        query_as_msg = HumanMessage(query)
-        config = {"configurable": {"thread_id": convo_id}}
+        config, initial_state = self._start_turn(convo_id, query)
         rag_workflow = self._build_rag_graph()
-        
-        initial_state = {
-            "messages": [query_as_msg],
-            "top_k": self.config.top_k,
-            "category": None
-        }
-        
-        result = rag_workflow.invoke(initial_state, config)
+
+        try:
+            result = rag_workflow.invoke(initial_state, config, durability="exit")
+        finally:
+            self._end_turn(convo_id)
+        response = result["messages"][-1]
+
+        return response.content
+
+    def stream(self, convo_id: str, query: str) -> Iterator[str]:
+        """Runs the conversational RAG workflow, yielding response tokens as they are generated.
+
+        The final AIMessage is still written to the conversation checkpoint
+        by the generate node, exactly as in `run`.
+        """
+
+        config, initial_state = self._start_turn(convo_id, query)
+        rag_workflow = self._build_rag_graph()
+
+        try:
+            for chunk, metadata in rag_workflow.stream(
+                initial_state, config, stream_mode="messages", durability="exit"
+            ):
+                if metadata.get("langgraph_node") not in ("generate", "cache_lookup"):
+                    continue
+                token = chunk.text
+                if token:
+                    yield token
+        finally:
+            self._end_turn(convo_id)
+
+    async def arun(self, convo_id: str, query: str) -> str:
+        """Runs the conversational RAG workflow without blocking the event loop."""
+
+        config, initial_state = await self._astart_turn(convo_id, query)
+        rag_workflow = self._build_rag_graph()
+
+        try:
+            result = await rag_workflow.ainvoke(initial_state, config, durability="exit")
+        finally:
+            await self._aend_turn(convo_id)
         response = result["messages"][-1]
 
-        return response.content
\ No newline at end of file
+        return response.content
+
+    async def astream(self, convo_id: str, query: str) -> AsyncIterator[str]:
+        """Async counterpart of `stream`, yielding response tokens as they are generated."""
+
+        config, initial_state = await self._astart_turn(convo_id, query)
+        rag_workflow = self._build_rag_graph()
+
+        try:
+            async for chunk, metadata in rag_workflow.astream(
+                initial_state, config, stream_mode="messages", durability="exit"
+            ):
+                if metadata.get("langgraph_node") not in ("generate", "cache_lookup"):
+                    continue
+                token = chunk.text
+                if token:
+                    yield token
+        finally:
+            await self._aend_turn(convo_id)
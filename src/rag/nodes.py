@@ -1,35 +1,191 @@
-from typing import Any
+import asyncio
+from typing import Callable, List, Optional
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage, RemoveMessage
+from langchain_core.runnables import RunnableLambda
+from langgraph.types import Overwrite
 from ..ai.embeddings.embedding_service import EmbeddingService
 from ..ai.llm.llm_service import LLMService
+from ..utils import metrics
+from .context_packer import ContextPacker
+from .semantic_cache import SemanticCache
 from .state import RAGState
-from ..vdb.chromadb_service import ChromaDBService
+from ..vdb.vector_store import VectorStore
 
 
-def build_embed_query_func(embedding_service: EmbeddingService):
+def _node(name: str, func: Callable, afunc: Optional[Callable] = None) -> RunnableLambda:
+    """Wrap node functions so every run is timed as stage `name`."""
+
+    def timed_func(state: RAGState):
+        with metrics.stage(name):
+            return func(state)
+
+    async def timed_afunc(state: RAGState):
+        with metrics.stage(name):
+            return await afunc(state)
+
+    return RunnableLambda(timed_func, afunc=timed_afunc if afunc else None)
+
+def build_embed_query_func(embedding_service: EmbeddingService) -> RunnableLambda:
     """Builds the query processing function"""
 
     def embed_query(state: RAGState):
         return {"query_embed": embedding_service.embed(state["messages"][-1].content)}
 
-    return embed_query
+    async def aembed_query(state: RAGState):
+        return {"query_embed": await embedding_service.aembed(state["messages"][-1].content)}
+
+    return _node("embed", embed_query, aembed_query)
+
+def _is_first_turn(messages: List[AnyMessage]) -> bool:
+    """Whether the conversation holds a single user question."""
+
+    return sum(isinstance(message, HumanMessage) for message in messages) == 1
+
+def build_cache_lookup_func(semantic_cache: SemanticCache) -> RunnableLambda:
+    """Builds the semantic cache lookup; on a hit the cached answer becomes the response"""
+
+    def cache_lookup(state: RAGState):
+        if not _is_first_turn(state["messages"]):
+            return {}
+        answer = semantic_cache.lookup(state["query_embed"], state["category"])
+        if answer is None:
+            return {}
+        return {"messages": [AIMessage(answer)]}
+
+    return _node("cache_lookup", cache_lookup)
+
+def build_cache_store_func(semantic_cache: SemanticCache) -> RunnableLambda:
+    """Builds the semantic cache writer for answers to first-turn questions"""
+
+    def cache_store(state: RAGState):
+        if not _is_first_turn(state["messages"]):
+            return {}
+        # The queried category is a source too: loading it may answer a question it could not before.
+        sources = {doc["category"] for doc in state["retrieved"]}
+        if state["category"] is not None:
+            sources.add(state["category"])
+        # An unscoped question that found nothing could be answered by any category loaded later.
+        if sources:
+            semantic_cache.store(
+                state["query_embed"],
+                state["category"],
+                state["messages"][-1].content,
+                sources,
+            )
+        return {}
+
+    return _node("cache_store", cache_store)
+
+def build_lexical_func(db_service: VectorStore) -> RunnableLambda:
+    """Builds the BM25 lookup; a confident match becomes the retrieval result on its own"""
+
+    def lexical_search(state: RAGState):
+        results, confident = db_service.lexical_query(
+            state["messages"][-1].content, state["top_k"], state["category"]
+        )
+        if confident:
+            return {"retrieved": results}
+        return {"lexical": results}
+
+    async def alexical_search(state: RAGState):
+        return await asyncio.to_thread(lexical_search, state)
 
-def build_retrieve_func(db_service: ChromaDBService):
-    """Builds the retrieval function"""
+    return _node("lexical", lexical_search, alexical_search)
+
+def _hydrate(retrieved: List[dict], db_service: VectorStore) -> List[dict]:
+    """Fill in document bodies for results restored from a checkpoint that only stores IDs.
+    Documents deleted from the store since are dropped."""
+
+    missing = list(dict.fromkeys(doc["id"] for doc in retrieved if "document" not in doc))
+    if not missing:
+        return retrieved
+
+    found = {doc["id"]: doc for doc in db_service.get_by_ids(missing)}
+    return [
+        doc if "document" in doc else {**found[doc["id"]], **doc}
+        for doc in retrieved
+        if "document" in doc or doc["id"] in found
+    ]
+
+def build_retrieve_func(db_service: VectorStore, max_retrieved: Optional[int] = None) -> RunnableLambda:
+    """Builds the retrieval function, keeping at most `max_retrieved` documents in state,
+    each tagged with the turn that retrieved it.
+    Lexical results left in state by the lexical node are fused with the vector results."""
 
     def retrieve(state: RAGState):
         retrieved = db_service.query(state["query_embed"], state["top_k"], state["category"])
-        return {"retrieved": retrieved}
+        if "lexical" in state:
+            retrieved = db_service.fuse([retrieved, state["lexical"]], state["top_k"])
+        metrics.RETRIEVED_DOCUMENTS.observe(len(retrieved))
+        if max_retrieved is None:
+            return {"retrieved": retrieved}
+        previous = _hydrate(state.get("retrieved", []), db_service)
+        turn = sum(isinstance(message, HumanMessage) for message in state["messages"])
+        kept = (previous + [{**doc, "turn": turn} for doc in retrieved])[-max_retrieved:]
+        return {"retrieved": Overwrite(kept), "retrieval_embed": state["query_embed"]}
+
+    async def aretrieve(state: RAGState):
+        # Chroma's persistent client is synchronous; keep it off the event loop.
+        return await asyncio.to_thread(retrieve, state)
+
+    return _node("retrieve", retrieve, aretrieve)
+
+def build_reuse_context_func(db_service: VectorStore) -> RunnableLambda:
+    """Builds the node for turns that skip retrieval: the documents of the latest
+    retrieval are re-tagged as the current turn's context"""
+
+    def reuse_context(state: RAGState):
+        previous = _hydrate(state.get("retrieved", []), db_service)
+        if not previous:
+            return {}
+        latest = max(doc.get("turn", 0) for doc in previous)
+        turn = sum(isinstance(message, HumanMessage) for message in state["messages"])
+        return {"retrieved": Overwrite([
+            {**doc, "turn": turn} if doc.get("turn", 0) == latest else doc for doc in previous
+        ])}
 
-    return retrieve 
+    async def areuse_context(state: RAGState):
+        return await asyncio.to_thread(reuse_context, state)
 
-def build_generate_res_func(llm_service: LLMService) -> dict[str, Any]:
-    """Builds the response generator function"""
+    return _node("reuse_context", reuse_context, areuse_context)
+
+def _trim_history(messages: List[AnyMessage], max_turns: int) -> List[RemoveMessage]:
+    """Return removals for the oldest messages so that at most `max_turns` turns remain
+    once the current turn's response is appended."""
+
+    human_indexes = [i for i, message in enumerate(messages) if isinstance(message, HumanMessage)]
+    if len(human_indexes) <= max_turns:
+        return []
+
+    first_kept = human_indexes[-max_turns]
+    return [RemoveMessage(id=message.id) for message in messages[:first_kept]]
+
+def build_generate_res_func(llm_service: LLMService, max_turns: int, context_budget: int) -> RunnableLambda:
+    """Builds the response generator function, keeping at most `max_turns` turns in state.
+    The prompt gets the history and documents that fit in `context_budget` tokens."""
+
+    packer = ContextPacker(context_budget)
+
+    def pack(state: RAGState):
+        with metrics.stage("context_pack"):
+            packed = packer.pack(state["messages"], state["retrieved"])
+        metrics.record_context_packing(packed.unpacked_tokens, packed.tokens)
+        return packed
 
     def generate_response(state: RAGState):
+        packed = pack(state)
         response = llm_service.rag_response(
-            messages=state["messages"],
-            retrieved=state["retrieved"],    
+            messages=packed.messages,
+            retrieved=packed.documents,
+        )
+        return {"messages": _trim_history(state["messages"], max_turns) + [response]}
+
+    async def agenerate_response(state: RAGState):
+        packed = pack(state)
+        response = await llm_service.arag_response(
+            messages=packed.messages,
+            retrieved=packed.documents,
         )
-        return {"messages": [response]}
+        return {"messages": _trim_history(state["messages"], max_turns) + [response]}
 
-    return generate_response
\ No newline at end of file
+    return _node("generate", generate_response, agenerate_response)
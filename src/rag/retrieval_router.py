@@ -0,0 +1,64 @@
+import re
+from typing import List
+import numpy as np
+
+# Turns made only of these words acknowledge the previous answer ("ok, thanks!").
+ACKNOWLEDGEMENTS = {
+    "ok", "okay", "k", "thanks", "thank", "you", "thx", "ty", "cheers", "great", "cool", "nice",
+    "perfect", "awesome", "good", "got", "it", "sounds", "fine", "yes", "yeah", "yep", "no", "nope",
+    "sure", "alright", "bye", "goodbye", "much", "very", "so", "that", "helps", "helpful", "understood",
+}
+
+# Requests to rework the previous answer ("can you shorten that?").
+REWRITE_PATTERN = re.compile(
+    r"\b(shorten|shorter|summari[sz]e|rephrase|reword|simplify|simpler|translate|repeat|"
+    r"bullet points?|in a table|tl;?dr)\b"
+)
+
+# References back to what was already said or listed ("what about the second one?"). Ordinals
+# only count in pronoun form, since "the other houses in Leeds" asks for something new.
+BACK_REFERENCE_PATTERN = re.compile(
+    r"\b(you (just )?(said|mentioned|listed|described|suggested|recommended)|"
+    r"did you (say|mention|list|describe|suggest|recommend)|your (last |previous )?"
+    r"(answer|response|reply|message)|(the|that) (above|previous|last) (answer|response)|"
+    r"(the|that|this) (first|second|third|fourth|fifth|last|previous|other|former|latter) one|"
+    r"the (former|latter))\b"
+)
+
+# Words in any script; "tl;dr" and contractions stay whole.
+WORD_PATTERN = re.compile(r"[\w;']+")
+
+
+class RetrievalRouter:
+    """Decides whether a conversational turn needs new documents or can reuse the
+    context already retrieved for the conversation.
+
+    `is_follow_up` is a local check on the question text alone, run before
+    anything is embedded. `is_same_topic` compares the question's embedding with
+    the one the current context was retrieved for.
+    """
+
+    def __init__(self, similarity_threshold: float = 0.9):
+        self.similarity_threshold = similarity_threshold
+
+    @staticmethod
+    def is_follow_up(question: str) -> bool:
+        """Whether the question acknowledges, reworks or refers back to the previous answer."""
+
+        text = question.lower()
+        words = WORD_PATTERN.findall(text)
+        if not words:
+            return False
+        if all(word in ACKNOWLEDGEMENTS for word in words):
+            return True
+        return bool(REWRITE_PATTERN.search(text) or BACK_REFERENCE_PATTERN.search(text))
+
+    def is_same_topic(self, query_embed: List[float], retrieval_embed: List[float]) -> bool:
+        """Whether the query is close enough to the one the context was retrieved for."""
+
+        query = np.asarray(query_embed, dtype=np.float32)
+        previous = np.asarray(retrieval_embed, dtype=np.float32)
+        if query.shape != previous.shape:
+            return False
+        norms = np.linalg.norm(query) * np.linalg.norm(previous)
+        return bool(norms > 0 and float(query @ previous) / norms >= self.similarity_threshold)
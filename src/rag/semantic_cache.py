@@ -0,0 +1,108 @@
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from ..vdb.category_versions import CategoryVersions
+
+
+class SemanticCache:
+    """Answer cache for first-turn questions, matched by query embedding similarity.
+
+    Embeddings are kept L2-normalised in one preallocated matrix, so a lookup
+    is a single matrix-vector product. Entries expire after `ttl_seconds`, the
+    least recently used entry is replaced once `max_entries` is reached, and an
+    entry is ignored as soon as any category its answer was built from changes.
+    """
+
+    def __init__(
+        self,
+        versions: CategoryVersions,
+        threshold: float = 0.95,
+        max_entries: int = 1000,
+        ttl_seconds: Optional[float] = None,
+    ):
+        self.versions = versions
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._matrix: Optional[np.ndarray] = None
+        self._created = np.zeros(max_entries)
+        self._last_used = np.zeros(max_entries)
+        self._valid = np.zeros(max_entries, dtype=bool)
+        self._entries: List[Optional[Dict[str, Any]]] = [None] * max_entries
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def lookup(self, embedding: List[float], category: Optional[str]) -> Optional[str]:
+        """Return the cached answer of the most similar live entry above the threshold."""
+        now = time.monotonic()
+        query = self._normalize(embedding)
+
+        with self._lock:
+            if self._matrix is None or self._matrix.shape[1] != query.shape[0] or not self._valid.any():
+                self.misses += 1
+                return None
+
+            if self.ttl_seconds is not None:
+                self._valid &= (now - self._created) <= self.ttl_seconds
+
+            scores = np.where(self._valid, self._matrix @ query, -np.inf)
+            # Check candidates from best to worst until one passes the non-vector filters.
+            candidates = np.flatnonzero(scores >= self.threshold)
+            for slot in candidates[np.argsort(scores[candidates])[::-1]]:
+                entry = self._entries[slot]
+                if not self.versions.is_current(entry["versions"]):
+                    self._valid[slot] = False
+                    continue
+                if entry["category"] != category:
+                    continue
+                self._last_used[slot] = now
+                self.hits += 1
+                return entry["answer"]
+
+            self.misses += 1
+            return None
+
+    def store(
+        self,
+        embedding: List[float],
+        category: Optional[str],
+        answer: str,
+        source_categories: Iterable[str],
+    ) -> None:
+        """Cache an answer, replacing an invalid or the least recently used entry when full."""
+        now = time.monotonic()
+        vector = self._normalize(embedding)
+        snapshot: Tuple[Tuple[str, int], ...] = self.versions.snapshot(source_categories)
+
+        with self._lock:
+            if self._matrix is None or self._matrix.shape[1] != vector.shape[0]:
+                self._matrix = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+                self._valid[:] = False
+
+            free = np.flatnonzero(~self._valid)
+            slot = free[0] if free.size else int(np.argmin(self._last_used))
+
+            self._matrix[slot] = vector
+            self._created[slot] = now
+            self._last_used[slot] = now
+            self._valid[slot] = True
+            self._entries[slot] = {"answer": answer, "category": category, "versions": snapshot}
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters, hit rate and the number of live entries."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": int(self._valid.sum()),
+            }
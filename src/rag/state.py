@@ -5,7 +5,9 @@ from operator import add
 class RAGState(TypedDict):
     """In-memory State for both RAG and Retriever graphs"""
     query_embed: NotRequired[List[float]]
+    retrieval_embed: NotRequired[List[float]]
     retrieved: Annotated[List[str], add]
+    lexical: NotRequired[List[dict]]
     messages:Annotated[List[AnyMessage],add_messages]
     top_k: Optional[int]
     category: Optional[int]
\ No newline at end of file
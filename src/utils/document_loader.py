@@ -1,65 +1,125 @@
 import pandas as pd
+from collections import deque
 from pathlib import Path
-from typing import Optional
-import hashlib
-import json
-from ..vdb.chromadb_service import ChromaDBService
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+import time
+from .ingest_checkpoint import IngestCheckpoint
+from .ingest_manifest import IngestManifest
+from .record_readers import READERS, RawRecord, content_hash
+from ..vdb.store_snapshot import SNAPSHOT_PAGE_ROWS, StoreSnapshot
+from ..vdb.vector_store import VectorStore
 from ..ai.embeddings.embedding_service import EmbeddingService
 
+# (doc_id, content, content_hash, position) ready to be embedded.
+Record = Tuple[str, str, str, int]
+
+DELETE_BATCH_SIZE = 5000
+
 
 class DocumentLoader:
     """
     Loads structured documents from CSV or JSONL files, embeds them,
     and upserts them into a ChromaDB collection. Supports cleanup and
     category listing.
+
+    Records are accumulated into batches; each batch is embedded with one
+    provider call and upserted with one DB call, and up to `concurrency`
+    batches are kept in flight at a time.
+
+    A per-category manifest of content hashes is kept next to the Chroma
+    directory so reloads only embed new or changed rows.
+
+    Source files are streamed (CSV in chunks, JSONL line by line), and the
+    position up to which every record is committed is checkpointed after each
+    batch so an interrupted load can be resumed.
     """
-    def __init__(self, embedding_service: EmbeddingService, db_service: ChromaDBService):
+    def __init__(self, embedding_service: EmbeddingService, db_service: VectorStore):
         self.embedding_service = embedding_service
         self.db_service = db_service
+        self.config = embedding_service.config
+        chroma_dir = Path(self.config.chroma_db_dir)
+        self.manifest_dir = chroma_dir.parent / f"{chroma_dir.name}_manifests"
 
-    def load_documents(self, file_path: str, category: str) -> None:
+    def load_documents(
+        self,
+        file_path: str,
+        category: str,
+        batch_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        prune: bool = False,
+        full: bool = False,
+        resume: bool = False,
+    ) -> Dict[str, int]:
         """
         Detect the file type and load its contents into the vector database.
         Supports CSV and JSONL/NDJSON formats.
+
+        Only rows that are new or whose content changed since the last load
+        are embedded, unless `full` is set. With `prune`, documents of the
+        category that are no longer in the file are deleted. With `resume`,
+        a load of the same file that was interrupted continues after the last
+        committed record.
         """
         file_path = str(Path(file_path).resolve())
         
         if not Path(file_path).exists():
             raise ValueError(f"File not found: {file_path}")
+
+        if resume and prune:
+            raise ValueError("Resume and prune cannot be combined: skipped rows would be pruned")
         
         file_extension = Path(file_path).suffix.lower()
 
-        if file_extension == '.csv':
-            self._load_csv(file_path, category)
-        elif file_extension in ('.jsonl', '.ndjson'):
-            self._load_jsonl(file_path, category)
-        else:
+        if file_extension not in READERS:
             raise ValueError(f"Unsupported file type: {file_extension}. Supported: .csv, .jsonl, .ndjson")
 
-    def _load_csv(self, file_path: str, category: str) -> None:
-        """
-        Load records from a CSV file, generate content strings, embed them,
-        and upsert into the vector DB. Each row becomes one document.
-        """
-        df = pd.read_csv(file_path)
-        df = df.dropna()
-        
-        print(f"Found {len(df)} documents to process")
-
-        for _, row in df.iterrows():
+        batch_size = batch_size or self.config.ingest_batch_size
+        concurrency = concurrency or self.config.ingest_concurrency
+        if batch_size < 1 or concurrency < 1:
+            raise ValueError("Batch size and concurrency must be positive integers")
 
-            row_dict = row.to_dict()
-            if 'id' in row_dict:
-                doc_id = str(row_dict.pop('id'))
+        checkpoint = IngestCheckpoint(self.manifest_dir, category, self.config.embeddings_model)
+        fingerprint = checkpoint.fingerprint(file_path)
+        start_position = 0
+        if resume:
+            start_position = checkpoint.resume_position(file_path, fingerprint)
+            if start_position is None:
+                print("No checkpoint for this version of the file; loading from the start")
+                start_position = 0
             else:
-                doc_id = None
+                print(f"Resuming from position {start_position}")
 
-            content_parts = [f"{{{key}: {value}}}" for key, value in row_dict.items()]
-            content = ", ".join(content_parts)
-            
-            self._upsert_doc(content, category, doc_id)
-        
-        print(f"Finished processing documents for category '{category}'")
+        records = READERS[file_extension](file_path, start_position, self.config.ingest_chunk_rows)
+        manifest = IngestManifest(self.manifest_dir, category, self.config.embeddings_model)
+        summary = {"added": 0, "updated": 0, "unchanged": 0, "deleted": 0}
+        seen: Dict[str, str] = {}
+
+        start = time.perf_counter()
+        changed = self._changed_records(records, category, manifest, seen, summary, full)
+        try:
+            processed = self._ingest(
+                changed, category, batch_size, concurrency, manifest,
+                on_progress=lambda position: checkpoint.save(file_path, fingerprint, position),
+            )
+            if prune:
+                summary["deleted"] = self.prune(manifest, seen)
+            checkpoint.discard()
+        finally:
+            if summary["added"] or summary["updated"] or summary["deleted"]:
+                self.db_service.versions.bump(category)
+        elapsed = time.perf_counter() - start
+        rate = processed / elapsed if elapsed > 0 else 0.0
+
+        print(f"Finished processing {processed} records for category '{category}' "
+              f"in {elapsed:.2f}s ({rate:.1f} docs/sec)")
+        print(f"Added: {summary['added']}, updated: {summary['updated']}, "
+              f"unchanged: {summary['unchanged']}, deleted: {summary['deleted']}")
+        cache_stats = self.embedding_service.cache_stats()
+        if cache_stats:
+            print(f"Embedding cache: {cache_stats['memory_hits'] + cache_stats['disk_hits']} hits, "
+                  f"{cache_stats['misses']} misses")
+        return summary
 
     def _validate_csv(self, df: pd.DataFrame) -> None:
         """Ensure CSV includes a usable 'id' column."""
@@ -69,61 +129,162 @@ class DocumentLoader:
         if df['id'].isna().all():
             raise ValueError("No valid IDs found in CSV")
 
-    def _upsert_doc(self, content: str, category: str, doc_id: Optional[str] = None) -> None:
-        """Embed document content and upsert it into ChromaDB."""
-        if not doc_id:
-            doc_id = self._generate_document_id(content, category)
-        
-        embedding = self.embedding_service.embed(content)
-        
-        self.db_service.upsert(
-            id=doc_id,
-            embed=embedding,
-            content=content,
-            category=category
-        )
+    def _changed_records(
+        self,
+        records: Iterable[RawRecord],
+        category: str,
+        manifest: IngestManifest,
+        seen: Dict[str, str],
+        summary: Dict[str, int],
+        full: bool,
+    ) -> Iterator[Record]:
+        """Yield only records that are new or changed, counting each outcome in `summary`."""
+        for position, doc_id, content in records:
+            digest = content_hash(content, category)
+            if not doc_id:
+                doc_id = digest
 
-    def _generate_document_id(self, content: str, category: str) -> str:
-        """Create a deterministic MD5 hash ID based on content + category."""
-        hash_input = f"{content}{category}".encode('utf-8')
-        return hashlib.md5(hash_input).hexdigest()
+            if self.is_changed(doc_id, digest, manifest, seen, summary, full):
+                yield doc_id, content, digest, position
 
-    def _load_jsonl(self, file_path: str, category: str) -> None:
-        """Load newline-delimited JSON where each record must contain an 'id' field.
+    @staticmethod
+    def is_changed(
+        doc_id: str,
+        digest: str,
+        manifest: IngestManifest,
+        seen: Dict[str, str],
+        summary: Dict[str, int],
+        full: bool,
+    ) -> bool:
+        """Classify one record against the manifest and the records seen so far in this load."""
+        first_seen = doc_id not in seen
+        if not first_seen and seen[doc_id] == digest:
+            return False
+        seen[doc_id] = digest
 
-        Each record may provide a `content` or `text` field; otherwise the loader will
-        serialize remaining fields into a string to be embedded.
-        """
+        if first_seen:
+            previous_hash = manifest.get(doc_id)
+            if previous_hash == digest and not full:
+                summary["unchanged"] += 1
+                return False
+            summary["added" if previous_hash is None else "updated"] += 1
+
+        return True
+
+    def _ingest(
+        self,
+        records: Iterable[Record],
+        category: str,
+        batch_size: int,
+        concurrency: int,
+        manifest: IngestManifest,
+        on_progress: Callable[[int], None],
+    ) -> int:
+        """Embed and upsert records batch by batch with a bounded worker pool.
 
+        Batches can finish out of order, so `on_progress` is called with the end
+        position of the last batch before which every batch has been committed.
+        A batch holding an ID that an earlier batch still in flight also holds
+        waits for that batch, so the last row of a repeated ID is always written
+        last, including when a resumed load replays batches from the checkpoint.
+        """
         processed = 0
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line_no, line in enumerate(f, start=1):
-                line = line.strip()
-                if not line:
-                    continue
+        in_flight = set()
+        # (future, end position) in submission order, and the futures committed so far.
+        submitted = deque()
+        committed = set()
+        # The latest in-flight batch of each ID.
+        writing: Dict[str, Future] = {}
+
+        def commit(done) -> int:
+            count = 0
+            for future in done:
+                for doc_id, content_hash in future.result():
+                    manifest.set(doc_id, content_hash)
+                    if writing.get(doc_id) is future:
+                        del writing[doc_id]
+                    count += 1
+                committed.add(future)
+
+            position = None
+            while submitted and submitted[0][0] in committed:
+                future, position = submitted.popleft()
+                committed.discard(future)
+            if position is not None:
+                on_progress(position)
+            return count
 
-                try:
-                    record = json.loads(line)
-                except json.JSONDecodeError as e:
-                    raise ValueError(f"Invalid JSON on line {line_no}: {e}")
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                for batch in self._batched(records, batch_size):
+                    earlier = {writing[doc_id] for doc_id, *_ in batch if doc_id in writing}
+                    if earlier:
+                        done, _ = wait(earlier)
+                        in_flight -= done
+                        processed += commit(done)
+                    if len(in_flight) >= concurrency:
+                        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        processed += commit(done)
+                    future = executor.submit(self._upsert_batch, batch, category)
+                    in_flight.add(future)
+                    submitted.append((future, batch[-1][3]))
+                    for doc_id, *_ in batch:
+                        writing[doc_id] = future
 
-                if not isinstance(record, dict):
-                    raise ValueError(f"Each JSONL line must be an object (line {line_no})")
+                done, in_flight = wait(in_flight)
+                processed += commit(done)
+        finally:
+            # Keep whatever was committed so an interrupted load is not redone.
+            manifest.save()
 
-                if 'id' not in record:
-                    raise ValueError(f"Record on line {line_no} missing required 'id' field")
+        return processed
 
-                doc_id = str(record.get('id'))
+    def prune(self, manifest: IngestManifest, seen: Dict[str, str]) -> int:
+        """Bulk-delete documents recorded in the manifest but absent from the source file."""
+        stale_ids = [doc_id for doc_id in manifest.documents if doc_id not in seen]
 
-                try:
-                    content = json.dumps(record, ensure_ascii=False)
-                except (TypeError, ValueError):
-                    content = str(record)
+        for i in range(0, len(stale_ids), DELETE_BATCH_SIZE):
+            chunk = stale_ids[i:i + DELETE_BATCH_SIZE]
+            self.db_service.delete_documents(ids=chunk)
+            manifest.remove(chunk)
+            manifest.save()
 
-                self._upsert_doc(content, category, doc_id)
-                processed += 1
+        return len(stale_ids)
 
-        print(f"Finished processing {processed} records for category '{category}'")
+    def _batched(
+        self, records: Iterable[Record], batch_size: int
+    ) -> Iterator[List[Record]]:
+        """Group records into lists of at most `batch_size` items."""
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _upsert_batch(self, batch: List[Record], category: str) -> List[Tuple[str, str]]:
+        """
+        Embed a batch of documents with one provider call and upsert them together.
+        Returns the (doc_id, content_hash) pairs that were committed.
+        """
+        documents = {}
+        for doc_id, content, content_hash, _ in batch:
+            # Later rows win; `_ingest` orders batches that share an ID the same way.
+            documents[doc_id] = (content, content_hash)
+
+        ids = list(documents.keys())
+        contents = [content for content, _ in documents.values()]
+        embeddings = self.embedding_service.embed_batch(contents)
+
+        self.db_service.upsert_batch(
+            ids=ids,
+            embeds=embeddings,
+            contents=contents,
+            category=category
+        )
+        return [(doc_id, content_hash) for doc_id, (_, content_hash) in documents.items()]
 
     def clear_documents(self, category: Optional[str] = None) -> None:
         """Delete documents from a specific category or all categories."""
@@ -133,34 +294,113 @@ class DocumentLoader:
             print("Deleting all documents")
 
         self.db_service.delete_documents(category=category)
+        IngestManifest.clear(self.manifest_dir, category)
+        IngestCheckpoint.clear(self.manifest_dir, category)
+        self.db_service.versions.bump(category)
+
+
+    def migrate_layout(self) -> None:
+        """Move the stored documents into the collection layout set by `CHROMA_LAYOUT`."""
+        migrate = getattr(self.db_service, "migrate_layout", None)
+        if migrate is None:
+            raise ValueError("--migrate-layout is only supported by the chroma vector store")
+        print(f"Migrating documents to the '{self.db_service.layout}' collection layout...")
+        start = time.perf_counter()
+        moved = migrate()
+        self.db_service.versions.bump()
+        print(f"Moved {moved} documents in {time.perf_counter() - start:.2f}s")
+
+    def export_snapshot(self, path: str, page_size: Optional[int] = None) -> None:
+        """Write the stored documents and their embeddings to a snapshot directory."""
+        print(f"Exporting {self.db_service.count()} documents to {path}...")
+        start = time.perf_counter()
+        exported = StoreSnapshot(Path(path)).export(
+            self.db_service, self.config.embeddings_model, page_size or SNAPSHOT_PAGE_ROWS
+        )
+        print(f"Exported {exported} documents in {time.perf_counter() - start:.2f}s")
+
+    def import_snapshot(self, path: str, page_size: Optional[int] = None) -> None:
+        """
+        Upsert the documents of a snapshot with their stored embeddings, so
+        nothing is sent to the embedding provider. The content-hash manifests
+        are rebuilt as well, so later loads of the same files only embed
+        changed rows.
+        """
+        snapshot = StoreSnapshot(Path(path))
+        meta = snapshot.meta()
+        if meta["embeddings_model"] != self.config.embeddings_model:
+            raise ValueError(f"Snapshot was embedded with {meta['embeddings_model']}, "
+                             f"but EMBEDDINGS_MODEL is {self.config.embeddings_model}")
+        if self.config.embedding_dimensions and meta["dimensions"] != self.config.embedding_dimensions:
+            raise ValueError(f"Snapshot holds {meta['dimensions']}-dimension vectors, "
+                             f"but EMBEDDING_DIMENSIONS is {self.config.embedding_dimensions}")
+
+        print(f"Importing {meta['documents']} documents from {path}...")
+        start = time.perf_counter()
+        manifests: Dict[str, IngestManifest] = {}
+        imported = 0
+        try:
+            for ids, categories, documents, embeddings in snapshot.pages(page_size or SNAPSHOT_PAGE_ROWS):
+                rows_by_category: Dict[str, List[int]] = {}
+                for row, category in enumerate(categories):
+                    rows_by_category.setdefault(category, []).append(row)
+                for category, rows in rows_by_category.items():
+                    category_ids = [ids[row] for row in rows]
+                    contents = [documents[row] for row in rows]
+                    self.db_service.upsert_batch(
+                        ids=category_ids, embeds=embeddings[rows], contents=contents, category=category
+                    )
+                    manifest = manifests.get(category)
+                    if manifest is None:
+                        manifest = manifests[category] = IngestManifest(
+                            self.manifest_dir, category, self.config.embeddings_model
+                        )
+                    for doc_id, content in zip(category_ids, contents):
+                        manifest.set(doc_id, content_hash(content, category))
+                imported += len(ids)
+        finally:
+            for category, manifest in manifests.items():
+                manifest.save()
+                self.db_service.versions.bump(category)
+        elapsed = time.perf_counter() - start
+        rate = imported / elapsed if elapsed > 0 else 0.0
+        print(f"Imported {imported} documents in {elapsed:.2f}s ({rate:.1f} docs/sec)")
+
+    def rebuild_lexical_index(self) -> None:
+        """Rebuild the lexical search index from the documents already in the vector DB."""
+        start = time.perf_counter()
+        indexed = self.db_service.rebuild_lexical_index()
+        print(f"Indexed {indexed} documents for lexical search in {time.perf_counter() - start:.2f}s")
+
+    def rebuild_category_stats(self) -> None:
+        """Recount the per-category statistics from the documents already in the vector DB."""
+        start = time.perf_counter()
+        self.db_service.rebuild_category_stats()
+        categories = self.db_service.stats.all()
+        print(f"Counted {len(categories)} categories in {time.perf_counter() - start:.2f}s")
 
-            
     def list_categories(self) -> None:
         """
-        Print category-level document counts from the vector DB.
-        Helps inspect what's stored.
+        Print category-level document counts, sizes and last update times.
+        Reads the maintained statistics instead of scanning the vector DB.
         """
-        categories = {}
-        collection_data = self.db_service.get_documents()
-        
-        if not collection_data or 'metadatas' not in collection_data or not collection_data['metadatas']:
-            print("No documents found in storage")
-            return
-            
-        for metadata in collection_data['metadatas']:
-            if isinstance(metadata, dict) and 'category' in metadata:
-                category = metadata['category']
-                categories[category] = categories.get(category, 0) + 1
-                
+        categories = self.db_service.stats.all()
+        if not categories and self.db_service.count() > 0:
+            # Collections populated before statistics were kept.
+            print("Category statistics missing; rebuilding them...")
+            self.db_service.rebuild_category_stats()
+            categories = self.db_service.stats.all()
+
         if not categories:
-            print("No categories found")
+            print("No documents found in storage")
             return
-            
+
         print("\nDocuments info:")
-        print("-" * 50)
-        print(f"{'Category':<30} | {'Document Count':>15}")
-        print("-" * 50)
-        
-        for category, count in sorted(categories.items()):
-            print(f"{category:<30} | {count:>15}")
-        print("-" * 50)
\ No newline at end of file
+        print("-" * 80)
+        print(f"{'Category':<30} | {'Document Count':>15} | {'Size (KB)':>10} | {'Last updated':<15}")
+        print("-" * 80)
+
+        for entry in categories:
+            print(f"{entry['category']:<30} | {entry['documents']:>15} | "
+                  f"{entry['bytes'] / 1024:>10.1f} | {entry['updated_at']}")
+        print("-" * 80)
\ No newline at end of file
@@ -0,0 +1,81 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Optional
+from urllib.parse import quote
+
+# Bytes hashed from each end of the source file for its fingerprint.
+FINGERPRINT_SAMPLE_BYTES = 1 << 20
+
+
+class IngestCheckpoint:
+    """
+    Progress marker for one category's load: the source file's fingerprint and
+    the position up to which every record has been committed. Lets an
+    interrupted load continue where it stopped instead of starting over.
+    """
+
+    def __init__(self, manifest_dir: Path, category: str, embeddings_model: str):
+        self.path = Path(manifest_dir) / f"{quote(category, safe='')}.progress"
+        self.embeddings_model = embeddings_model
+
+    @staticmethod
+    def fingerprint(file_path: str) -> str:
+        """Identify a file version by its size, modification time and the bytes at both ends."""
+        stat = os.stat(file_path)
+        digest = hashlib.sha256(f"{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8"))
+        with open(file_path, "rb") as f:
+            digest.update(f.read(FINGERPRINT_SAMPLE_BYTES))
+            if stat.st_size > FINGERPRINT_SAMPLE_BYTES:
+                f.seek(max(stat.st_size - FINGERPRINT_SAMPLE_BYTES, FINGERPRINT_SAMPLE_BYTES))
+                digest.update(f.read())
+        return digest.hexdigest()
+
+    def resume_position(self, file_path: str, fingerprint: str) -> Optional[int]:
+        """Return the committed position for this exact file, or None if there is none."""
+        if not self.path.exists():
+            return None
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        if (
+            data.get("file") != file_path
+            or data.get("fingerprint") != fingerprint
+            or data.get("embeddings_model") != self.embeddings_model
+        ):
+            return None
+        return data.get("position")
+
+    def save(self, file_path: str, fingerprint: str, position: int) -> None:
+        """Atomically record that every record before `position` has been committed."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".progress.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "file": file_path,
+                "fingerprint": fingerprint,
+                "embeddings_model": self.embeddings_model,
+                "position": position,
+            }, f)
+        os.replace(tmp_path, self.path)
+
+    def discard(self) -> None:
+        """Remove the marker once a load has completed."""
+        self.path.unlink(missing_ok=True)
+
+    @staticmethod
+    def clear(manifest_dir: Path, category: Optional[str] = None) -> None:
+        """Delete the progress marker of one category, or of every category."""
+        manifest_dir = Path(manifest_dir)
+        if not manifest_dir.exists():
+            return
+
+        if category is not None:
+            paths = [manifest_dir / f"{quote(category, safe='')}.progress"]
+        else:
+            paths = list(manifest_dir.glob("*.progress"))
+
+        for path in paths:
+            path.unlink(missing_ok=True)
@@ -0,0 +1,67 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+from urllib.parse import quote
+
+
+class IngestManifest:
+    """
+    Persistent map of document id -> content hash for one category.
+    Lets the loader skip rows whose content has not changed since the
+    last load, and find rows that disappeared from the source file.
+    """
+
+    def __init__(self, manifest_dir: Path, category: str, embeddings_model: str):
+        self.path = Path(manifest_dir) / f"{quote(category, safe='')}.json"
+        self.embeddings_model = embeddings_model
+        self.documents: Dict[str, str] = {}
+        self._load()
+
+    def _load(self) -> None:
+        """Read the manifest from disk, discarding it if it was built with another model."""
+        if not self.path.exists():
+            return
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        # Vectors from a different model are not comparable; treat everything as new.
+        if data.get("embeddings_model") == self.embeddings_model:
+            self.documents = data.get("documents", {})
+
+    def get(self, doc_id: str) -> Optional[str]:
+        """Return the stored content hash for a document id."""
+        return self.documents.get(doc_id)
+
+    def set(self, doc_id: str, content_hash: str) -> None:
+        """Record the content hash of a committed document."""
+        self.documents[doc_id] = content_hash
+
+    def remove(self, doc_ids: Iterable[str]) -> None:
+        """Forget the given document ids."""
+        for doc_id in doc_ids:
+            self.documents.pop(doc_id, None)
+
+    def save(self) -> None:
+        """Atomically write the manifest to disk."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"embeddings_model": self.embeddings_model, "documents": self.documents}, f)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def clear(manifest_dir: Path, category: Optional[str] = None) -> None:
+        """Delete the manifest of one category, or of every category."""
+        manifest_dir = Path(manifest_dir)
+        if not manifest_dir.exists():
+            return
+
+        if category is not None:
+            paths = [manifest_dir / f"{quote(category, safe='')}.json"]
+        else:
+            paths = list(manifest_dir.glob("*.json"))
+
+        for path in paths:
+            path.unlink(missing_ok=True)
@@ -0,0 +1,197 @@
+"""Prometheus metrics for the RAG pipeline and an optional per-request timing breakdown."""
+import time
+from contextlib import contextmanager
+from contextvars import Context, ContextVar
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+STAGE_SECONDS = Histogram(
+    "rag_stage_duration_seconds",
+    "Time spent in each step of a request: graph nodes, graph compilation and prompt loading.",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+PROVIDER_SECONDS = Histogram(
+    "rag_provider_request_duration_seconds",
+    "Latency of calls to the embedding and chat model providers.",
+    ["provider", "operation"],
+    buckets=LATENCY_BUCKETS,
+)
+VECTOR_QUERY_SECONDS = Histogram(
+    "rag_vector_query_duration_seconds",
+    "Latency of vector store queries.",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+EMBEDDING_BATCH_SIZE = Histogram(
+    "rag_embedding_batch_size",
+    "Queries coalesced into one query-embedding provider call.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+EMBEDDING_QUEUE_SECONDS = Histogram(
+    "rag_embedding_queue_seconds",
+    "Time a query waited for its embedding batch to be sent.",
+    buckets=LATENCY_BUCKETS,
+)
+RETRIEVED_DOCUMENTS = Histogram(
+    "rag_retrieved_documents",
+    "Number of documents returned per retrieval.",
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100),
+)
+PROMPT_CHARACTERS = Histogram(
+    "rag_prompt_characters",
+    "Characters sent to the chat model per generation.",
+    buckets=(500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000),
+)
+CONTEXT_TOKENS = Histogram(
+    "rag_context_tokens",
+    "Estimated tokens of conversation history and documents per generation, before and after packing.",
+    ["phase"],
+    buckets=(250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000),
+)
+CONTEXT_TOKENS_SAVED = Counter(
+    "rag_context_tokens_saved",
+    "Estimated prompt tokens left out by context packing.",
+)
+LLM_TOKENS = Counter(
+    "rag_llm_tokens",
+    "Tokens reported by the chat model provider.",
+    ["direction"],
+)
+RETRIEVAL_ROUTES = Counter(
+    "rag_retrieval_routes",
+    "Conversational turns by whether they retrieved documents or reused the existing context.",
+    ["route", "reason"],
+)
+
+_timings: ContextVar[Optional[Dict[str, Any]]] = ContextVar("rag_timings", default=None)
+
+
+@contextmanager
+def timed(histogram: Histogram, breakdown_key: str, **labels: str) -> Iterator[None]:
+    """Observe the block's duration in `histogram` and, when a breakdown is being
+    collected for the current request, add it under `breakdown_key`."""
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        (histogram.labels(**labels) if labels else histogram).observe(elapsed)
+        timings = _timings.get()
+        if timings is not None:
+            timings[breakdown_key] = timings.get(breakdown_key, 0.0) + elapsed
+
+
+def stage(name: str):
+    """Time a pipeline stage such as a graph node."""
+
+    return timed(STAGE_SECONDS, name, stage=name)
+
+
+def provider_call(provider: str, operation: str):
+    """Time a request to an embedding or chat model provider."""
+
+    return timed(PROVIDER_SECONDS, f"{provider}.{operation}", provider=provider, operation=operation)
+
+
+def vector_query(operation: str):
+    """Time a vector store query."""
+
+    return timed(VECTOR_QUERY_SECONDS, f"vector_store.{operation}", operation=operation)
+
+
+def record_llm_usage(usage: Optional[Dict[str, Any]]) -> None:
+    """Count input, output and prompt-cache tokens when the provider reports them and,
+    when a breakdown is being collected, report them under `llm_tokens`."""
+
+    if not usage:
+        return
+    details = usage.get("input_token_details") or {}
+    tokens = {
+        "input": usage.get("input_tokens", 0),
+        "output": usage.get("output_tokens", 0),
+        "cache_read": details.get("cache_read", 0),
+        "cache_creation": details.get("cache_creation", 0),
+    }
+    for direction, count in tokens.items():
+        LLM_TOKENS.labels(direction=direction).inc(count)
+    timings = _timings.get()
+    if timings is not None:
+        timings["llm_tokens"] = tokens
+
+
+def record_retrieval_route(route: str, reason: str) -> None:
+    """Count a turn's retrieval routing decision and, when a breakdown is being
+    collected, report it under `retrieval_route`."""
+
+    RETRIEVAL_ROUTES.labels(route=route, reason=reason).inc()
+    timings = _timings.get()
+    if timings is not None:
+        timings["retrieval_route"] = f"{route}:{reason}"
+
+
+def record_context_packing(unpacked_tokens: int, packed_tokens: int) -> None:
+    """Observe the prompt context size before and after packing and, when a breakdown
+    is being collected, report it under `context_tokens`."""
+
+    CONTEXT_TOKENS.labels(phase="unpacked").observe(unpacked_tokens)
+    CONTEXT_TOKENS.labels(phase="packed").observe(packed_tokens)
+    saved = max(unpacked_tokens - packed_tokens, 0)
+    CONTEXT_TOKENS_SAVED.inc(saved)
+    timings = _timings.get()
+    if timings is not None:
+        timings["context_tokens"] = {"unpacked": unpacked_tokens, "packed": packed_tokens, "saved": saved}
+
+
+@contextmanager
+def collect_timings() -> Iterator[Dict[str, Any]]:
+    """Collect a per-request breakdown of the timed blocks run inside the context.
+
+    The dict is shared by reference with the threads and tasks the graph
+    spawns (they copy the context), and is filled with milliseconds per key,
+    plus a `total`, when the block exits. Generations also add their
+    `context_tokens` estimates and provider-reported `llm_tokens`, and
+    conversational turns their `retrieval_route`.
+    """
+
+    timings: Dict[str, Any] = {}
+    token = _timings.set(timings)
+    start = time.perf_counter()
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+        timings["total"] = time.perf_counter() - start
+        for key, seconds in timings.items():
+            if isinstance(seconds, float):
+                timings[key] = round(seconds * 1000, 3)
+
+
+@contextmanager
+def timings_for(contexts: Iterable[Context]) -> Iterator[None]:
+    """Add the timed blocks run inside the context to the breakdown of every request
+    whose copied `contexts` are given, for work done once on behalf of several
+    requests in another thread."""
+
+    shared: Dict[str, Any] = {}
+    token = _timings.set(shared)
+    try:
+        yield
+    finally:
+        _timings.reset(token)
+        for context in contexts:
+            timings = context.get(_timings)
+            if timings is None:
+                continue
+            for key, seconds in shared.items():
+                if isinstance(seconds, float):
+                    timings[key] = timings.get(key, 0.0) + seconds
+
+
+def render() -> Tuple[bytes, str]:
+    """Return the metrics in the Prometheus text format and its content type."""
+
+    return generate_latest(), CONTENT_TYPE_LATEST
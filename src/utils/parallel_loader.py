@@ -0,0 +1,358 @@
+import glob
+import json
+import multiprocessing
+import queue
+import random
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from .document_loader import DocumentLoader
+from .ingest_manifest import IngestManifest
+from .record_readers import READERS, parse_file
+
+# (file path, category) pairs to load.
+LoadPlan = List[Tuple[str, str]]
+# (category, doc_ids, contents, content hashes, embeddings) ready to be written.
+EmbeddedBatch = Tuple[str, List[str], List[str], List[str], List[List[float]]]
+
+MAX_RATE_LIMIT_RETRIES = 8
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Whether a provider error means "too many requests" (HTTP 429)."""
+    status = getattr(error, "status_code", None) or getattr(error, "http_status", None)
+    return status == 429 or "ratelimit" in type(error).__name__.lower()
+
+
+def _entry_module() -> Optional[str]:
+    """Importable name of the running program's main module, if it has one."""
+    main = sys.modules["__main__"]
+    spec = getattr(main, "__spec__", None)
+    if spec is not None:
+        return spec.name
+    path = getattr(main, "__file__", None)
+    return Path(path).stem if path else None
+
+
+class AdaptiveLimiter:
+    """Concurrency limit for provider calls that halves on rate-limit errors and
+    grows back by one after a run of successful calls."""
+
+    def __init__(self, max_concurrency: int, recovery_calls: int = 10):
+        self.max_concurrency = max_concurrency
+        self.limit = max_concurrency
+        self.recovery_calls = recovery_calls
+        self._active = 0
+        self._successes = 0
+        self._condition = threading.Condition()
+
+    def __enter__(self):
+        with self._condition:
+            self._condition.wait_for(lambda: self._active < self.limit)
+            self._active += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        with self._condition:
+            self._active -= 1
+            self._condition.notify_all()
+
+    def success(self) -> None:
+        with self._condition:
+            self._successes += 1
+            if self._successes >= self.recovery_calls and self.limit < self.max_concurrency:
+                self.limit += 1
+                self._successes = 0
+                self._condition.notify_all()
+
+    def throttle(self) -> None:
+        with self._condition:
+            self.limit = max(1, self.limit // 2)
+            self._successes = 0
+
+
+class _Writer(threading.Thread):
+    """Single thread that upserts embedded batches and records them in the manifests."""
+
+    def __init__(self, db_service, manifests: Dict[str, IngestManifest], max_pending: int):
+        super().__init__(daemon=True)
+        self.db_service = db_service
+        self.manifests = manifests
+        self.queue: "queue.Queue[Optional[EmbeddedBatch]]" = queue.Queue(maxsize=max_pending)
+        self.written = 0
+        self.error: Optional[Exception] = None
+
+    def run(self) -> None:
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            if self.error is not None:
+                # Keep draining so producers never block on a dead writer.
+                continue
+            category, ids, contents, hashes, embeddings = item
+            try:
+                self.db_service.upsert_batch(ids=ids, embeds=embeddings, contents=contents, category=category)
+            except Exception as e:
+                self.error = e
+                continue
+            manifest = self.manifests[category]
+            for doc_id, digest in zip(ids, hashes):
+                manifest.set(doc_id, digest)
+            self.written += len(ids)
+
+
+class ParallelLoader:
+    """
+    Loads many files at once as a three-stage pipeline:
+
+    - parser processes stream and serialize files into batches of records;
+    - a shared pool of threads embeds changed records, backing off and
+      lowering its concurrency when the provider rate-limits;
+    - a single writer thread upserts to Chroma and updates the manifests.
+
+    Bounded queues between the stages keep memory flat while parsing, embedding
+    and writing overlap. Change detection, pruning and version bumps follow
+    `DocumentLoader.load_documents`, per category.
+    """
+
+    def __init__(self, document_loader: DocumentLoader):
+        self.loader = document_loader
+        self.embedding_service = document_loader.embedding_service
+        self.db_service = document_loader.db_service
+        self.config = document_loader.config
+
+    @staticmethod
+    def plan_directory(directory: str) -> LoadPlan:
+        """Every supported file directly inside `directory`, each loaded into a category named after the file."""
+        root = Path(directory)
+        if not root.is_dir():
+            raise ValueError(f"Directory not found: {directory}")
+
+        plan = [
+            (str(path.resolve()), path.stem)
+            for path in sorted(root.iterdir())
+            if path.is_file() and path.suffix.lower() in READERS
+        ]
+        if not plan:
+            raise ValueError(f"No .csv, .jsonl or .ndjson files in {directory}")
+        return plan
+
+    @staticmethod
+    def plan_manifest(manifest_path: str) -> LoadPlan:
+        """Files matched by a JSON object of {glob: category}; globs are relative to the manifest file."""
+        path = Path(manifest_path)
+        if not path.exists():
+            raise ValueError(f"File not found: {manifest_path}")
+
+        with open(path, "r", encoding="utf-8") as f:
+            mapping = json.load(f)
+        if not isinstance(mapping, dict) or not all(
+            isinstance(pattern, str) and isinstance(category, str) for pattern, category in mapping.items()
+        ):
+            raise ValueError("Load manifest must be a JSON object mapping globs to category names")
+
+        plan: Dict[str, str] = {}
+        for pattern, category in mapping.items():
+            matches = sorted(glob.glob(str(path.parent / pattern), recursive=True))
+            if not matches:
+                print(f"Warning: no files match '{pattern}'")
+            for match in matches:
+                match_path = Path(match)
+                if match_path.is_file() and match_path.suffix.lower() in READERS:
+                    plan.setdefault(str(match_path.resolve()), category)
+        if not plan:
+            raise ValueError(f"No supported files matched by {manifest_path}")
+        return list(plan.items())
+
+    def load_files(
+        self,
+        plan: LoadPlan,
+        batch_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        workers: Optional[int] = None,
+        prune: bool = False,
+        full: bool = False,
+    ) -> Dict[str, Dict[str, int]]:
+        """Load every (file, category) pair in `plan`; returns a summary per category."""
+        batch_size = batch_size or self.config.ingest_batch_size
+        concurrency = concurrency or self.config.ingest_concurrency
+        workers = min(workers or self.config.ingest_parse_workers, len(plan))
+        if batch_size < 1 or concurrency < 1 or workers < 1:
+            raise ValueError("Batch size, concurrency and workers must be positive integers")
+
+        categories = list(dict.fromkeys(category for _, category in plan))
+        manifests = {
+            category: IngestManifest(self.loader.manifest_dir, category, self.config.embeddings_model)
+            for category in categories
+        }
+        summaries = {category: {"added": 0, "updated": 0, "unchanged": 0, "deleted": 0} for category in categories}
+        seen: Dict[str, Dict[str, str]] = {category: {} for category in categories}
+
+        print(f"Loading {len(plan)} files into {len(categories)} categories "
+              f"with {workers} parser processes and {concurrency} embedding workers")
+        start = time.perf_counter()
+        writer = _Writer(self.db_service, manifests, max_pending=concurrency * 2)
+        writer.start()
+        try:
+            self._run(plan, manifests, summaries, seen, writer, batch_size, concurrency, workers, full)
+            if prune:
+                for category in categories:
+                    summaries[category]["deleted"] = self.loader.prune(manifests[category], seen[category])
+        finally:
+            writer.queue.put(None)
+            writer.join()
+            for category in categories:
+                manifests[category].save()
+                summary = summaries[category]
+                if summary["added"] or summary["updated"] or summary["deleted"]:
+                    self.db_service.versions.bump(category)
+        if writer.error is not None:
+            raise writer.error
+
+        elapsed = time.perf_counter() - start
+        rate = writer.written / elapsed if elapsed > 0 else 0.0
+        print(f"Finished processing {writer.written} records in {elapsed:.2f}s ({rate:.1f} docs/sec)")
+        for category, summary in summaries.items():
+            print(f"{category}: added {summary['added']}, updated {summary['updated']}, "
+                  f"unchanged {summary['unchanged']}, deleted {summary['deleted']}")
+        return summaries
+
+    def _run(
+        self,
+        plan: LoadPlan,
+        manifests: Dict[str, IngestManifest],
+        summaries: Dict[str, Dict[str, int]],
+        seen: Dict[str, Dict[str, str]],
+        writer: _Writer,
+        batch_size: int,
+        concurrency: int,
+        workers: int,
+        full: bool,
+    ) -> None:
+        """Drive the parser processes and the embedding pool until every file is written."""
+        limiter = AdaptiveLimiter(concurrency)
+        pending: Dict[str, List[Tuple[str, str, str]]] = {category: [] for category in manifests}
+        in_flight = set()
+        # The latest in-flight batch of each (category, ID).
+        embedding: Dict[Tuple[str, str], Future] = {}
+
+        def hand_off(done) -> None:
+            for future in done:
+                batch = future.result()
+                writer.queue.put(batch)
+                category, ids = batch[0], batch[1]
+                for doc_id in ids:
+                    if embedding.get((category, doc_id)) is future:
+                        del embedding[(category, doc_id)]
+                if writer.error is not None:
+                    raise writer.error
+
+        def submit(executor, category: str, records: List[Tuple[str, str, str]]) -> None:
+            nonlocal in_flight
+            # A later version of a document is handed to the writer after the earlier one.
+            earlier = {embedding[category, doc_id] for doc_id, _, _ in records if (category, doc_id) in embedding}
+            if earlier:
+                done, _ = wait(earlier)
+                in_flight -= done
+                hand_off(done)
+            if len(in_flight) >= concurrency * 2:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                hand_off(done)
+            future = executor.submit(self._embed, category, records, limiter)
+            in_flight.add(future)
+            for doc_id, _, _ in records:
+                embedding[category, doc_id] = future
+
+        # By now the writer, Chroma and the query batcher have threads running, and
+        # forking a threaded process can leave a child stuck on a lock one of them
+        # held. Parsers are started from a clean process instead; `parse_file`
+        # needs no state from this one.
+        start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        context = multiprocessing.get_context(start_method)
+        if start_method == "forkserver":
+            # Each parser re-runs the entry script (e.g. main.py). With its imports
+            # preloaded into the server, that takes milliseconds instead of seconds.
+            context.set_forkserver_preload(["src.utils.record_readers", *filter(None, [_entry_module()])])
+        with context.Manager() as manager, \
+                ProcessPoolExecutor(max_workers=workers, mp_context=context) as parsers, \
+                ThreadPoolExecutor(max_workers=concurrency) as embedders:
+            records_queue = manager.Queue(maxsize=workers * 4)
+            stop = manager.Event()
+            parse_futures = [
+                parsers.submit(
+                    parse_file, i, file_path, category, Path(file_path).suffix.lower(),
+                    records_queue, stop, self.config.ingest_chunk_rows, batch_size,
+                )
+                for i, (file_path, category) in enumerate(plan)
+            ]
+
+            try:
+                remaining = len(plan)
+                while remaining:
+                    try:
+                        kind, index, payload = records_queue.get(timeout=1)
+                    except queue.Empty:
+                        for future in parse_futures:
+                            if future.done() and future.exception() is not None:
+                                raise future.exception()
+                        continue
+
+                    file_path, category = plan[index]
+                    if kind == "error":
+                        raise ValueError(f"{file_path}: {payload}")
+                    if kind == "done":
+                        remaining -= 1
+                        print(f"Parsed {payload} records from {file_path}")
+                        continue
+
+                    for doc_id, content, digest in payload:
+                        if self.loader.is_changed(
+                            doc_id, digest, manifests[category], seen[category], summaries[category], full
+                        ):
+                            pending[category].append((doc_id, content, digest))
+                    while len(pending[category]) >= batch_size:
+                        submit(embedders, category, pending[category][:batch_size])
+                        del pending[category][:batch_size]
+
+                for category, records in pending.items():
+                    if records:
+                        submit(embedders, category, records)
+                done, in_flight = wait(in_flight)
+                hand_off(done)
+            except BaseException:
+                stop.set()
+                for future in [*parse_futures, *in_flight]:
+                    future.cancel()
+                raise
+
+    def _embed(
+        self, category: str, records: List[Tuple[str, str, str]], limiter: AdaptiveLimiter
+    ) -> EmbeddedBatch:
+        """Embed one batch, retrying with exponential backoff while the provider rate-limits."""
+        documents = {}
+        for doc_id, content, digest in records:
+            # Later rows win; `_run` orders batches that share an ID the same way.
+            documents[doc_id] = (content, digest)
+        ids = list(documents.keys())
+        contents = [content for content, _ in documents.values()]
+        hashes = [digest for _, digest in documents.values()]
+
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            with limiter:
+                try:
+                    embeddings = self.embedding_service.embed_batch(contents)
+                except Exception as e:
+                    if not is_rate_limit_error(e) or attempt == MAX_RATE_LIMIT_RETRIES:
+                        raise
+                    limiter.throttle()
+                    delay = min(60.0, 2 ** attempt) * (0.5 + random.random() / 2)
+                else:
+                    limiter.success()
+                    return category, ids, contents, hashes, embeddings
+            print(f"Rate limited by the embeddings provider; retrying in {delay:.1f}s "
+                  f"(concurrency {limiter.limit})")
+            time.sleep(delay)
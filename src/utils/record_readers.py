@@ -0,0 +1,156 @@
+import hashlib
+import json
+from queue import Full
+from typing import Any, Iterator, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+"""Streaming readers that turn source files into (position, id, content) records.
+
+Kept free of the vector store and provider imports so it is cheap to run in
+parser processes.
+"""
+
+# (position, doc_id, content) as parsed from the source file; doc_id may be missing.
+# The position is where reading resumes after this record (CSV data row count or
+# JSONL byte offset).
+RawRecord = Tuple[int, Optional[str], str]
+
+
+def read_csv(file_path: str, start: int = 0, chunk_rows: int = 10000) -> Iterator[RawRecord]:
+    """
+    Read records from a CSV file in chunks and yield (position, id, content).
+    Each row becomes one document; rows with missing values are skipped.
+    Positions count data rows, and the first `start` rows are skipped.
+    """
+    position = 0
+    # Values are kept as the text in the file, so content does not depend on
+    # the dtypes pandas would infer for each chunk.
+    with pd.read_csv(file_path, dtype=str, chunksize=chunk_rows) as reader:
+        for chunk in reader:
+            if position + len(chunk) <= start:
+                position += len(chunk)
+                continue
+            if position < start:
+                chunk = chunk.iloc[start - position:]
+                position = start
+
+            positions = position + np.arange(1, len(chunk) + 1)
+            position += len(chunk)
+
+            complete = chunk.notna().all(axis=1).to_numpy()
+            chunk = chunk[complete]
+            positions = positions[complete]
+
+            doc_ids = chunk.pop('id').tolist() if 'id' in chunk.columns else [None] * len(chunk)
+            yield from zip(positions.tolist(), doc_ids, row_contents(chunk))
+
+
+def row_contents(df: pd.DataFrame) -> List[str]:
+    """Render every row as "{column: value}, ..." with column-wise string operations."""
+    if df.empty or len(df.columns) == 0:
+        return [""] * len(df)
+
+    parts = [f"{{{column}: " + df[column] + "}" for column in df.columns]
+    return parts[0].str.cat(parts[1:], sep=", ").tolist()
+
+
+def read_jsonl(file_path: str, start: int = 0, chunk_rows: Optional[int] = None) -> Iterator[RawRecord]:
+    """Read newline-delimited JSON where each record must contain an 'id' field.
+
+    Each record may provide a `content` or `text` field; otherwise the loader will
+    serialize remaining fields into a string to be embedded. Positions are
+    byte offsets, and reading begins at byte `start`; lines are then only
+    counted from there, so errors name the line's byte offset instead.
+    `chunk_rows` is accepted for a common reader signature; lines are always
+    read one at a time.
+    """
+
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        position = start
+        for line_no, line in enumerate(f, start=1):
+            where = f"line {line_no}" if start == 0 else f"the line at byte {position}"
+            position += len(line)
+            line = line.strip()
+            if not line:
+                continue
+
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON on {where}: {e}")
+
+            if not isinstance(record, dict):
+                raise ValueError(f"Each JSONL line must be an object ({where})")
+
+            if 'id' not in record:
+                raise ValueError(f"Record on {where} missing required 'id' field")
+
+            doc_id = str(record.get('id'))
+
+            try:
+                content = json.dumps(record, ensure_ascii=False)
+            except (TypeError, ValueError):
+                content = str(record)
+
+            yield position, doc_id, content
+
+
+READERS = {
+    '.csv': read_csv,
+    '.jsonl': read_jsonl,
+    '.ndjson': read_jsonl,
+}
+
+
+def content_hash(content: str, category: str) -> str:
+    """Create a deterministic MD5 hash ID based on content + category."""
+    hash_input = f"{content}{category}".encode('utf-8')
+    return hashlib.md5(hash_input).hexdigest()
+
+
+def parse_file(
+    file_index: int,
+    file_path: str,
+    category: str,
+    extension: str,
+    queue: Any,
+    stop: Any,
+    chunk_rows: int,
+    batch_size: int,
+) -> None:
+    """Parser process entry point: stream a file onto `queue` as batches of
+    (doc_id, content, content_hash), then report ("done", file_index, count).
+
+    Errors are reported as ("error", file_index, message). Parsing stops early
+    once `stop` is set.
+    """
+    count = 0
+    batch = []
+
+    def put(message) -> bool:
+        while not stop.is_set():
+            try:
+                queue.put(message, timeout=1)
+                return True
+            except Full:
+                continue
+        return False
+
+    try:
+        for _, doc_id, content in READERS[extension](file_path, 0, chunk_rows):
+            digest = content_hash(content, category)
+            batch.append((doc_id or digest, content, digest))
+            if len(batch) >= batch_size:
+                count += len(batch)
+                if not put(("batch", file_index, batch)):
+                    return
+                batch = []
+        if batch:
+            count += len(batch)
+            if not put(("batch", file_index, batch)):
+                return
+        put(("done", file_index, count))
+    except Exception as e:
+        put(("error", file_index, str(e)))
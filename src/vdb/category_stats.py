@@ -0,0 +1,82 @@
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# category -> (document count change, byte change)
+StatsDelta = Dict[str, Tuple[int, int]]
+
+
+class CategoryStats:
+    """Per-category document counts, content bytes and last-update times.
+
+    Kept in SQLite next to the Chroma data and adjusted by every upsert and
+    delete, so listing categories never scans the collection. Increments are
+    applied in SQL, which keeps them correct when the CLI loader and the API
+    server write concurrently.
+    """
+
+    def __init__(self, db_path: Path):
+        """Open (or create) the statistics file."""
+        self._lock = threading.Lock()
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS categories ("
+            "category TEXT PRIMARY KEY, documents INTEGER NOT NULL, bytes INTEGER NOT NULL, "
+            "updated_at REAL NOT NULL) WITHOUT ROWID"
+        )
+        self._conn.commit()
+
+    def apply(self, deltas: StatsDelta) -> None:
+        """Add document and byte changes to their categories and mark them updated."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO categories (category, documents, bytes, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (category) DO UPDATE SET documents = documents + excluded.documents, "
+                "bytes = bytes + excluded.bytes, updated_at = excluded.updated_at",
+                [(category, count, size, now) for category, (count, size) in deltas.items()],
+            )
+            self._conn.execute("DELETE FROM categories WHERE documents <= 0")
+
+    def replace(self, totals: StatsDelta) -> None:
+        """Replace all statistics with freshly counted totals. Categories that were
+        already tracked keep their last-updated time."""
+        now = time.time()
+        totals = {category: value for category, value in totals.items() if value[0] > 0}
+        with self._lock, self._conn:
+            placeholders = ",".join("?" * len(totals))
+            self._conn.execute(f"DELETE FROM categories WHERE category NOT IN ({placeholders})", list(totals))
+            self._conn.executemany(
+                "INSERT INTO categories (category, documents, bytes, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (category) DO UPDATE SET documents = excluded.documents, bytes = excluded.bytes",
+                [(category, count, size, now) for category, (count, size) in totals.items()],
+            )
+
+    def clear(self, category: Optional[str] = None) -> None:
+        """Drop the statistics of one category, or of every category."""
+        with self._lock, self._conn:
+            if category is None:
+                self._conn.execute("DELETE FROM categories")
+            else:
+                self._conn.execute("DELETE FROM categories WHERE category = ?", (category,))
+
+    def all(self) -> List[Dict[str, Any]]:
+        """Return every category's statistics, sorted by name."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT category, documents, bytes, updated_at FROM categories ORDER BY category"
+            ).fetchall()
+        return [
+            {
+                "category": category,
+                "documents": documents,
+                "bytes": size,
+                "updated_at": datetime.fromtimestamp(updated_at, timezone.utc).isoformat(timespec="seconds"),
+            }
+            for category, documents, size, updated_at in rows
+        ]
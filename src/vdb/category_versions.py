@@ -0,0 +1,56 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+ALL_CATEGORIES = "*"
+
+
+class CategoryVersions:
+    """
+    Per-category change counters persisted next to the Chroma data.
+    The loader bumps a category whenever its documents are reloaded or
+    deleted, so caches in other processes can tell that results derived
+    from it are stale. Reads are only re-done when the file changes.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._mtime: Optional[float] = None
+        self._versions: Dict[str, int] = {}
+
+    def current(self) -> Dict[str, int]:
+        """Return the latest counters, re-reading the file only if it changed."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+
+        if mtime != self._mtime:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._versions = json.load(f)
+            self._mtime = mtime
+        return self._versions
+
+    def snapshot(self, categories: Iterable[str]) -> Tuple[Tuple[str, int], ...]:
+        """Return the counters of the given categories plus the global reset counter."""
+        versions = self.current()
+        keys = sorted(set(categories) | {ALL_CATEGORIES})
+        return tuple((key, versions.get(key, 0)) for key in keys)
+
+    def is_current(self, snapshot: Tuple[Tuple[str, int], ...]) -> bool:
+        """Check whether none of the categories in a snapshot changed since it was taken."""
+        versions = self.current()
+        return all(versions.get(key, 0) == version for key, version in snapshot)
+
+    def bump(self, category: Optional[str] = None) -> None:
+        """Mark a category (or, with None, every category) as changed."""
+        versions = dict(self.current())
+        key = category if category is not None else ALL_CATEGORIES
+        versions[key] = versions.get(key, 0) + 1
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(versions, f)
+        os.replace(tmp_path, self.path)
@@ -1,17 +1,46 @@
+import hashlib
+import heapq
+import re
 import chromadb
+from concurrent.futures import ThreadPoolExecutor
 from chromadb.api.models.Collection import Collection
 from chromadb.config import Settings
-from typing import List, Dict, Any, Optional
-from pathlib import Path
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+from .vector_store import VectorStore
 from ..config import Config
 
-class ChromaDBService:
+MAIN_COLLECTION = "main"
+# HNSW settings fixed when a collection is created; the others can be changed in place.
+FIXED_HNSW_SETTINGS = ("space", "ef_construction", "max_neighbors")
+# Collections searched in parallel by a query without a category filter.
+FANOUT_WORKERS = 8
+
+
+def collection_name(category: str) -> str:
+    """Name of a category's collection in the per-category layout.
+
+    Chroma restricts collection names, so the category is slugged and a hash
+    keeps names of categories that slug alike apart.
+    """
+    slug = re.sub(r"[^a-zA-Z0-9]+", "-", category).strip("-")[:48]
+    digest = hashlib.sha1(category.encode("utf-8")).hexdigest()[:10]
+    return f"category-{slug}-{digest}" if slug else f"category-{digest}"
+
+
+class ChromaDBService(VectorStore):
+    """Chroma engine, with all documents in one `main` collection filtered by category
+    (`CHROMA_LAYOUT=single`) or one collection per category (`per_category`).
+
+    In the per-category layout a category search only walks that category's
+    HNSW graph, deleting a category drops its collection, and a search over
+    all categories queries every collection concurrently and merges the
+    results by distance.
+    """
+
     def __init__(self, config: Config):
-        """Initialize persistent ChromaDB client and main collection."""
-        self.config: Config = config
-        self.persist_directory = Path(self.config.chroma_db_dir)
-        self.persist_directory.mkdir(parents=True, exist_ok=True)
-        
+        """Initialize persistent ChromaDB client and the collections of the configured layout."""
+        super().__init__(config)
+
         self.client = chromadb.PersistentClient(
             path=str(self.persist_directory),
             settings=Settings(
@@ -19,60 +48,336 @@ class ChromaDBService:
                 is_persistent=True
             )
         )
-        
-        self.collection: Collection = self.client.get_or_create_collection(
-            name="main",
-            metadata={"description": "Main collection"}
-        )
+        self.layout = self.config.chroma_layout
+        self._collections: Dict[str, Collection] = {}
+        self._listed_versions: Optional[Dict[str, int]] = None
+        self._fanout: Optional[ThreadPoolExecutor] = None
 
-    def upsert(self, id: str, embed: List[float], content: str, category: str) -> None:
-        """Insert or update a document with embedding and category."""
-        self.collection.upsert(
-            embeddings=[embed],
-            ids=[id],
-            documents=[content],
-            metadatas=[{"category": category}]
-        )
-    
-    def query(
+        if self.layout == "single":
+            self.collection: Collection = self._apply_hnsw_settings(self.client.get_or_create_collection(
+                name=MAIN_COLLECTION,
+                metadata={"description": "Main collection"},
+                configuration=self._hnsw_configuration(),
+            ))
+            if self._list_category_collections():
+                print("Warning: per-category collections found; run --migrate-layout to move them into 'main'.")
+        else:
+            self._fanout = ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix="chroma-fanout")
+            if self._main_collection_count() > 0:
+                print("Warning: documents found in the 'main' collection; "
+                      "run --migrate-layout to split them into per-category collections.")
+
+    def _hnsw_configuration(self) -> Dict[str, Any]:
+        """Index settings from `HNSW_*`, applied to every collection this service creates."""
+        return {
+            "hnsw": {
+                "space": self.config.hnsw_space,
+                "ef_construction": self.config.hnsw_construction_ef,
+                "ef_search": self.config.hnsw_search_ef,
+                "max_neighbors": self.config.hnsw_m,
+            }
+        }
+
+    def _apply_hnsw_settings(self, collection: Collection) -> Collection:
+        """Bring an existing collection's search settings in line with the configuration.
+
+        `ef_search` is updated in place. The space, `ef_construction` and `M` are
+        fixed once the index is built, so a mismatch is only reported.
+        """
+        wanted = self._hnsw_configuration()["hnsw"]
+        current = (collection.configuration or {}).get("hnsw") or {}
+        if current.get("ef_search") != wanted["ef_search"]:
+            collection.modify(configuration={"hnsw": {"ef_search": wanted["ef_search"]}})
+        mismatched = [key for key in FIXED_HNSW_SETTINGS if current.get(key, wanted[key]) != wanted[key]]
+        if mismatched:
+            print(f"Warning: collection '{collection.name}' was built with different HNSW settings "
+                  f"({', '.join(f'{key}={current[key]}' for key in mismatched)}); "
+                  f"reload its documents to apply the configured ones.")
+        return collection
+
+    def _list_category_collections(self) -> Dict[str, Collection]:
+        """Read the per-category collections from the client, keyed by category."""
+        return {
+            collection.metadata["category"]: collection
+            for collection in self.client.list_collections()
+            if (collection.metadata or {}).get("category") is not None
+        }
+
+    def _main_collection_count(self) -> int:
+        """Documents left in the single-layout collection, 0 if it does not exist."""
+        try:
+            return self.client.get_collection(MAIN_COLLECTION).count()
+        except Exception:
+            return 0
+
+    def _category_collections(self, refresh: bool = False) -> Dict[str, Collection]:
+        """Per-category collections, re-listed when another process may have changed them.
+
+        Loads and deletes bump the category versions, so the list is only read
+        again when the versions file changed or when `refresh` is given.
+        """
+        versions = self.versions.current()
+        if refresh or versions != self._listed_versions:
+            listed = self._list_category_collections()
+            for category, collection in listed.items():
+                if category not in self._collections:
+                    self._apply_hnsw_settings(collection)
+            self._collections = listed
+            self._listed_versions = dict(versions)
+        return self._collections
+
+    def _category_collection(self, category: str, create: bool = False) -> Optional[Collection]:
+        """Return a category's collection, creating it when `create` is set."""
+        collection = self._category_collections().get(category)
+        if collection is None:
+            collection = self._category_collections(refresh=True).get(category)
+        if collection is None and create:
+            collection = self.client.get_or_create_collection(
+                name=collection_name(category),
+                metadata={"category": category},
+                configuration=self._hnsw_configuration(),
+            )
+            self._collections[category] = collection
+        return collection
+
+    def _all_collections(self) -> List[Collection]:
+        """Every collection holding documents, in a stable order."""
+        if self.layout == "single":
+            return [self.collection]
+        collections = self._category_collections()
+        return [collections[category] for category in sorted(collections)]
+
+    def _locate(self, ids: List[str]) -> List[Tuple[Collection, List[str]]]:
+        """Group `ids` by the collection that stores them; unknown IDs are left out
+        except in the single layout, where every ID belongs to `main`."""
+        if self.layout == "single":
+            return [(self.collection, ids)] if ids else []
+        located = []
+        for collection in self._all_collections():
+            found = collection.get(ids=ids, include=[])["ids"]
+            if found:
+                located.append((collection, found))
+        return located
+
+    def _write(
         self,
-        query_embed: List[float],
-        top_k: Optional[int] = None,
-        category: Optional[str] = None,
-    ) -> Dict[str, Any]:
-        """Query documents by embedding, optionally filtering by category."""
-        if top_k is None:
-            top_k = self.config.top_k
+        ids: List[str],
+        embeds: List[List[float]],
+        contents: List[str],
+        metadatas: List[Dict[str, Any]],
+        stored: Optional[Dict[str, Dict[str, Any]]] = None,
+    ) -> None:
+        """Upsert documents into the collection of their category."""
+        if self.layout == "single":
+            self.collection.upsert(
+                embeddings=embeds,
+                ids=ids,
+                documents=contents,
+                metadatas=metadatas
+            )
+            return
 
-        where = {"category": category} if category else None
+        if stored is None:
+            stored = self._metadata(list(dict.fromkeys(ids)))
+        # A document that changed category must leave its old collection; the
+        # stored metadata says which one, so no other collection is read.
+        moved: Dict[str, List[str]] = {}
+        for doc_id, metadata in zip(ids, metadatas):
+            previous = (stored.get(doc_id) or {}).get("category")
+            if previous is not None and previous != metadata["category"]:
+                moved.setdefault(previous, []).append(doc_id)
+        for previous, moved_ids in moved.items():
+            collection = self._category_collection(previous)
+            if collection is not None:
+                collection.delete(ids=list(dict.fromkeys(moved_ids)))
 
-        results = self.collection.query(
-            query_embeddings=[query_embed],
+        by_category: Dict[str, List[int]] = {}
+        for i, metadata in enumerate(metadatas):
+            by_category.setdefault(metadata["category"], []).append(i)
+        for category, indexes in by_category.items():
+            target = self._category_collection(category, create=True)
+            category_ids = [ids[i] for i in indexes]
+            target.upsert(
+                embeddings=[embeds[i] for i in indexes],
+                ids=category_ids,
+                documents=[contents[i] for i in indexes],
+                metadatas=[metadatas[i] for i in indexes],
+            )
+
+    def _search(self, query_embeds: List[List[float]], top_k: int, category: Optional[str]) -> List[List[Dict[str, Any]]]:
+        """Query the HNSW index of the category's collection, or every collection merged by distance.
+        In the single layout the `main` collection is filtered by category instead."""
+        if self.layout == "single":
+            where = {"category": category} if category else None
+            results = self.collection.query(
+                query_embeddings=query_embeds,
+                n_results=top_k,
+                where=where,
+            )
+            return [self._parse_results(results, i) for i in range(len(query_embeds))]
+
+        if category:
+            collection = self._category_collection(category)
+            collections = [collection] if collection is not None else []
+        else:
+            collections = self._all_collections()
+        if not collections:
+            return [[] for _ in query_embeds]
+        if len(collections) == 1:
+            return self._query_collection(collections[0], query_embeds, top_k)
+
+        per_collection = list(self._fanout.map(
+            lambda collection: self._query_collection(collection, query_embeds, top_k, with_distances=True),
+            collections,
+        ))
+        merged = []
+        for i in range(len(query_embeds)):
+            nearest = heapq.nsmallest(
+                top_k, (match for results in per_collection for match in results[i]), key=lambda match: match[0]
+            )
+            merged.append([doc for _, doc in nearest])
+        return merged
+
+    def _query_collection(
+        self,
+        collection: Collection,
+        query_embeds: List[List[float]],
+        top_k: int,
+        with_distances: bool = False,
+    ) -> List[List[Any]]:
+        """Query one collection; with `with_distances`, results are (distance, doc) pairs."""
+        results = collection.query(
+            query_embeddings=query_embeds,
             n_results=top_k,
-            where=where,
+            include=["documents", "metadatas", "distances"],
         )
-        
+        parsed = [self._parse_results(results, i) for i in range(len(query_embeds))]
+        if not with_distances:
+            return parsed
+        return [list(zip(results["distances"][i], docs)) for i, docs in enumerate(parsed)]
+
+    def _parse_results(self, results: Dict[str, Any], i: int) -> List[Dict[str, Any]]:
+        """Flatten the i-th query of a Chroma query response into result dicts."""
         parsed_results = []
-        for i in range(len(results["ids"][0])):
+        for j in range(len(results["ids"][i])):
             parsed_result = {
-                "id": results["ids"][0][i],
-                "document": results["documents"][0][i],
-                "category": results["metadatas"][0][i]["category"]
+                "id": results["ids"][i][j],
+                "document": results["documents"][i][j],
+                "category": results["metadatas"][i][j]["category"]
             }
             parsed_results.append(parsed_result)
-        
 
         return parsed_results
 
-    def delete_documents(self, ids: List[str] = None, category: Optional[str] = None) -> None:
+    def _remove(self, ids: Optional[List[str]] = None, category: Optional[str] = None) -> None:
         """Delete by IDs, category, or all documents."""
         if ids is not None:
-            self.collection.delete(ids=ids)
+            for collection, found in self._locate(ids):
+                collection.delete(ids=found)
+        elif self.layout == "per_category":
+            categories = [category] if category is not None else list(self._category_collections(refresh=True))
+            for name in categories:
+                collection = self._category_collection(name)
+                if collection is not None:
+                    self.client.delete_collection(collection.name)
+                    self._collections.pop(name, None)
         elif category is not None:
             self.collection.delete(where={"category": category})
         else:
-            self.collection.delete()
-            
-    def get_documents(self) -> Dict[str, Any]:
-        """Return raw collection data."""
-        return self.collection.get()
\ No newline at end of file
+            # Chroma refuses an unfiltered delete, so drop and recreate the collection.
+            metadata = self.collection.metadata
+            self.client.delete_collection(self.collection.name)
+            self.collection = self.client.get_or_create_collection(
+                name=MAIN_COLLECTION, metadata=metadata, configuration=self._hnsw_configuration()
+            )
+
+    def _metadata(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Return the stored metadata of those `ids` that exist, by ID; one read per collection."""
+        stored = {}
+        for collection in self._all_collections():
+            found = collection.get(ids=ids, include=["metadatas"])
+            stored.update(zip(found["ids"], [metadata or {} for metadata in found["metadatas"] or []]))
+        return stored
+
+    def _backfill_sizes(self, sizes: Dict[str, int]) -> None:
+        """Add `bytes` to the metadata of documents stored before sizes were recorded."""
+        for collection, found in self._locate(list(sizes)):
+            stored = collection.get(ids=found, include=["metadatas"])
+            collection.update(
+                ids=stored["ids"],
+                metadatas=[
+                    {**(metadata or {}), "bytes": sizes[doc_id]}
+                    for doc_id, metadata in zip(stored["ids"], stored["metadatas"])
+                ],
+            )
+
+    def get_by_ids(self, ids: List[str]) -> List[Dict[str, Any]]:
+        """Return documents for the given IDs, in the same shape as `query` results."""
+        if not ids:
+            return []
+        docs = []
+        for collection, found in self._locate(ids):
+            results = collection.get(ids=found, include=["documents", "metadatas"])
+            docs.extend(
+                {"id": doc_id, "document": document, "category": metadata["category"]}
+                for doc_id, document, metadata in zip(results["ids"], results["documents"], results["metadatas"])
+            )
+        return docs
+
+    def get_documents(
+        self,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        include: Sequence[str] = ("documents", "metadatas"),
+    ) -> Dict[str, Any]:
+        """Return a page of raw collection data. In the per-category layout the
+        collections are read one after the other, ordered by category."""
+        if self.layout == "single":
+            return self.collection.get(include=list(include), limit=limit, offset=offset)
+
+        page: Dict[str, Any] = {"ids": [], **{key: [] for key in include}}
+        for collection in self._all_collections():
+            if limit is not None and len(page["ids"]) >= limit:
+                break
+            size = collection.count()
+            if offset >= size:
+                offset -= size
+                continue
+            remaining = None if limit is None else limit - len(page["ids"])
+            part = collection.get(include=list(include), limit=remaining, offset=offset)
+            offset = 0
+            page["ids"].extend(part["ids"])
+            for key in include:
+                page[key].extend(part[key])
+        return page
+
+    def count(self) -> int:
+        """Return the number of stored documents."""
+        return sum(collection.count() for collection in self._all_collections())
+
+    def migrate_layout(self, page_size: int = 1000) -> int:
+        """Move documents stored in the other layout into the configured one.
+
+        Embeddings are copied as stored, so nothing is re-embedded. Each source
+        collection is dropped once all of its documents are copied. Returns the
+        number of documents moved.
+        """
+        if self.layout == "per_category":
+            sources = [self.client.get_collection(MAIN_COLLECTION)] if self._main_collection_count() else []
+        else:
+            sources = list(self._list_category_collections().values())
+
+        moved = 0
+        for source in sources:
+            offset = 0
+            while True:
+                page = source.get(include=["embeddings", "documents", "metadatas"], limit=page_size, offset=offset)
+                if not page["ids"]:
+                    break
+                offset += len(page["ids"])
+                self._write(page["ids"], page["embeddings"], page["documents"], page["metadatas"])
+                moved += len(page["ids"])
+            self.client.delete_collection(source.name)
+        if self.layout == "per_category":
+            self._category_collections(refresh=True)
+        return moved
@@ -0,0 +1,177 @@
+import math
+import re
+import sqlite3
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+TOKEN_PATTERN = re.compile(r"\w+")
+# SQLite caps the number of bound parameters per statement.
+MAX_VARIABLES = 500
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class LexicalIndex:
+    """BM25 inverted index persisted in SQLite.
+
+    Postings are stored per (term, document) with the term frequency, next to
+    each document's length and category; corpus totals are kept up to date on
+    every write so a query only touches the postings of its own terms. The
+    file is shared between the CLI loader and the API server.
+    """
+
+    def __init__(self, db_path: Path, k1: float = 1.2, b: float = 0.75):
+        """Open (or create) the index file."""
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "id TEXT PRIMARY KEY, category TEXT NOT NULL, length INTEGER NOT NULL) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS documents_category ON documents (category);"
+            "CREATE TABLE IF NOT EXISTS postings ("
+            "term TEXT NOT NULL, doc_id TEXT NOT NULL, tf INTEGER NOT NULL, "
+            "PRIMARY KEY (term, doc_id)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id);"
+            "CREATE TABLE IF NOT EXISTS corpus ("
+            "id INTEGER PRIMARY KEY CHECK (id = 0), doc_count INTEGER NOT NULL, total_length INTEGER NOT NULL);"
+            "INSERT OR IGNORE INTO corpus VALUES (0, 0, 0);"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _chunks(items: List[str]) -> Iterable[List[str]]:
+        """Split IDs into groups small enough for one statement."""
+        for i in range(0, len(items), MAX_VARIABLES):
+            yield items[i:i + MAX_VARIABLES]
+
+    def _delete(self, ids: List[str]) -> Tuple[int, int]:
+        """Delete documents and their postings; return the (count, total length) removed."""
+        count = total_length = 0
+        for chunk in self._chunks(ids):
+            placeholders = ",".join("?" * len(chunk))
+            removed, length = self._conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(length), 0) FROM documents WHERE id IN ({placeholders})",
+                chunk,
+            ).fetchone()
+            self._conn.execute(f"DELETE FROM postings WHERE doc_id IN ({placeholders})", chunk)
+            self._conn.execute(f"DELETE FROM documents WHERE id IN ({placeholders})", chunk)
+            count += removed
+            total_length += length
+        return count, total_length
+
+    def _adjust_corpus(self, count: int, total_length: int) -> None:
+        """Apply a change in document count and total token length to the corpus totals."""
+        self._conn.execute(
+            "UPDATE corpus SET doc_count = doc_count + ?, total_length = total_length + ? WHERE id = 0",
+            (count, total_length),
+        )
+
+    def add(self, ids: List[str], contents: List[str], category: str) -> None:
+        """Index documents of one category, replacing earlier versions of the same IDs.
+        The ID is indexed with the content so documents can be looked up by it."""
+        documents = []
+        postings = []
+        for doc_id, content in zip(ids, contents):
+            tokens = tokenize(doc_id) + tokenize(content)
+            documents.append((doc_id, category, len(tokens)))
+            postings.extend((term, doc_id, tf) for term, tf in Counter(tokens).items())
+
+        with self._lock, self._conn:
+            removed, removed_length = self._delete(list(ids))
+            self._conn.executemany("INSERT INTO documents VALUES (?, ?, ?)", documents)
+            self._conn.executemany("INSERT INTO postings VALUES (?, ?, ?)", postings)
+            self._adjust_corpus(
+                len(documents) - removed,
+                sum(length for _, _, length in documents) - removed_length,
+            )
+
+    def remove(self, ids: List[str]) -> None:
+        """Remove documents by ID."""
+        with self._lock, self._conn:
+            removed, removed_length = self._delete(list(ids))
+            self._adjust_corpus(-removed, -removed_length)
+
+    def clear(self, category: Optional[str] = None) -> None:
+        """Remove every document of a category, or everything when no category is given."""
+        with self._lock, self._conn:
+            if category is None:
+                self._conn.execute("DELETE FROM postings")
+                self._conn.execute("DELETE FROM documents")
+                self._conn.execute("UPDATE corpus SET doc_count = 0, total_length = 0 WHERE id = 0")
+                return
+            self._conn.execute(
+                "DELETE FROM postings WHERE doc_id IN (SELECT id FROM documents WHERE category = ?)",
+                (category,),
+            )
+            removed, removed_length = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM documents WHERE category = ?", (category,)
+            ).fetchone()
+            self._conn.execute("DELETE FROM documents WHERE category = ?", (category,))
+            self._adjust_corpus(-removed, -removed_length)
+
+    def search(
+        self, query: str, top_k: int, category: Optional[str] = None
+    ) -> Tuple[List[Tuple[str, float]], bool]:
+        """Return up to `top_k` (doc_id, BM25 score) pairs, best first, and whether the
+        best hit contains every distinct query term."""
+        terms = list(dict.fromkeys(tokenize(query)))[:MAX_VARIABLES // 2]
+        if not terms or top_k < 1:
+            return [], False
+
+        with self._lock:
+            doc_count, total_length = self._conn.execute(
+                "SELECT doc_count, total_length FROM corpus WHERE id = 0"
+            ).fetchone()
+            if doc_count == 0:
+                return [], False
+            placeholders = ",".join("?" * len(terms))
+            frequencies = self._conn.execute(
+                f"SELECT term, COUNT(*) FROM postings WHERE term IN ({placeholders}) GROUP BY term", terms
+            ).fetchall()
+            if not frequencies:
+                return [], False
+
+            # Lucene's BM25 idf, which stays positive for very common terms.
+            weights = [
+                (term, math.log(1 + (doc_count - df + 0.5) / (df + 0.5))) for term, df in frequencies
+            ]
+            values = ",".join("(?, ?)" for _ in weights)
+            params: List = [value for weight in weights for value in weight]
+            params += [self.k1 + 1, self.k1, 1 - self.b, self.b * doc_count / max(total_length, 1)]
+            where = ""
+            if category is not None:
+                where = "WHERE d.category = ?"
+                params.append(category)
+            params.append(top_k)
+
+            rows = self._conn.execute(
+                f"WITH q(term, idf) AS (VALUES {values}), "
+                f"p(k1_plus_1, k1, one_minus_b, b_over_avgdl) AS (SELECT ?, ?, ?, ?) "
+                f"SELECT postings.doc_id, "
+                f"SUM(q.idf * postings.tf * p.k1_plus_1 / "
+                f"(postings.tf + p.k1 * (p.one_minus_b + p.b_over_avgdl * d.length))) AS score, "
+                f"COUNT(*) AS matched "
+                f"FROM q JOIN postings ON postings.term = q.term "
+                f"JOIN documents d ON d.id = postings.doc_id CROSS JOIN p "
+                f"{where} GROUP BY postings.doc_id ORDER BY score DESC LIMIT ?",
+                params,
+            ).fetchall()
+
+        hits = [(doc_id, score) for doc_id, score, _ in rows]
+        covers_query = bool(rows) and rows[0][2] == len(terms)
+        return hits, covers_query
+
+    def __len__(self) -> int:
+        """Return the number of indexed documents."""
+        with self._lock:
+            return self._conn.execute("SELECT doc_count FROM corpus WHERE id = 0").fetchone()[0]
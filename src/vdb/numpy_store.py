@@ -0,0 +1,458 @@
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from .vector_store import VectorStore
+from ..config import Config
+
+# Rows scored per matrix product; bounds the float32 working set for float16 stores.
+BLOCK_ROWS = 16384
+# Rows of a float16 or int8 block converted to float32 at a time, small enough to stay in cache.
+CONVERT_ROWS = 256
+MIN_CAPACITY = 1024
+# SQLite caps the number of bound parameters per statement.
+MAX_VARIABLES = 500
+FREE_ROW = -1
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    Exact nearest-neighbour search over embeddings kept in memory-mapped arrays.
+
+    Vectors live in `embeddings.npy` (float32 or float16), next to their squared
+    norms and a category code per row; IDs, contents and the row each
+    document occupies are in SQLite. A query scores every row of the category
+    with one matrix product per block and keeps the best rows with
+    `argpartition`. Ranking uses L2 distance, the same as the Chroma
+    collection. Deleted rows are reused by later writes.
+
+    With `NUMPY_STORE_QUANTIZATION`, a compact int8 (scaled per row) or
+    float16 copy in `quantized.npy` is scanned instead, and the best
+    `top_k * NUMPY_RESCORE_FACTOR` candidates are re-scored against the
+    full-precision vectors, so a query reads mostly the smaller array.
+
+    Suited to collections that fit comfortably in the page cache, where a
+    brute-force scan beats building and searching an HNSW graph.
+    """
+
+    def __init__(self, config: Config):
+        """Open (or create) the arrays and their SQLite catalogue."""
+        super().__init__(config)
+        self.directory = self.persist_directory / "numpy_store"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.dtype = np.dtype(config.numpy_store_dtype)
+        self.quantization = config.numpy_store_quantization
+        self._lock = threading.RLock()
+        # (offset, row) where the last page read ended, so the next page can start after that row.
+        self._page_end: Optional[Tuple[int, int]] = None
+
+        self._conn = sqlite3.connect(str(self.directory / "store.sqlite3"), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "id TEXT PRIMARY KEY, row INTEGER NOT NULL UNIQUE, category TEXT NOT NULL, "
+            "document TEXT NOT NULL, bytes INTEGER NOT NULL) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS documents_category ON documents (category);"
+            "CREATE TABLE IF NOT EXISTS categories (code INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);"
+            "CREATE TABLE IF NOT EXISTS free_rows (row INTEGER PRIMARY KEY);"
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID;"
+        )
+        self._conn.commit()
+
+        stored_dtype = self._meta("dtype")
+        if stored_dtype is not None and np.dtype(stored_dtype) != self.dtype:
+            raise ValueError(
+                f"The NumPy vector store in {self.directory} holds {stored_dtype} vectors; "
+                f"set NUMPY_STORE_DTYPE={stored_dtype} or reset the store"
+            )
+        self._open()
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, **values: Any) -> None:
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO meta VALUES (?, ?)", [(key, str(value)) for key, value in values.items()]
+        )
+
+    def _open(self) -> None:
+        """Map the arrays as last committed, e.g. after another process wrote to the store."""
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        self.size = int(self._meta("size") or 0)
+        dim = self._meta("dim")
+        self.dim = int(dim) if dim is not None else None
+        self._quantized = self._scales = None
+        if self.dim is None:
+            self._embeddings = self._norms = self._categories = None
+            return
+        self._load_arrays()
+        if self.quantization != "none" and self._meta("quantization") != self.quantization:
+            self._build_quantized()
+
+    def _load_arrays(self) -> None:
+        self._embeddings = np.load(self.directory / "embeddings.npy", mmap_mode="r+")
+        self._norms = np.load(self.directory / "norms.npy", mmap_mode="r+")
+        self._categories = np.load(self.directory / "categories.npy", mmap_mode="r+")
+        if self.quantization != "none" and self._meta("quantization") == self.quantization:
+            self._quantized = np.load(self.directory / "quantized.npy", mmap_mode="r+")
+            if self.quantization == "int8":
+                self._scales = np.load(self.directory / "scales.npy", mmap_mode="r+")
+
+    def _quantize(self, vectors: np.ndarray):
+        """Return the compact copy of float32 `vectors`, and their int8 scales (None for float16)."""
+        if self.quantization == "float16":
+            return vectors.astype(np.float16), None
+        scales = np.abs(vectors).max(axis=1) / 127
+        scales[scales == 0] = 1
+        return np.rint(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+    def _build_quantized(self) -> None:
+        """(Re)build the compact copy from the stored vectors, e.g. when quantization is
+        turned on for an existing store or the copy was not kept up to date."""
+        capacity = len(self._embeddings)
+        with self._conn:
+            quantized_path = self.directory / "quantized.npy.tmp"
+            quantized = np.lib.format.open_memmap(
+                quantized_path, mode="w+", dtype=np.dtype(self.quantization), shape=(capacity, self.dim)
+            )
+            scales = None
+            if self.quantization == "int8":
+                scales = np.lib.format.open_memmap(
+                    self.directory / "scales.npy.tmp", mode="w+", dtype=np.float32, shape=(capacity,)
+                )
+            for start in range(0, capacity, BLOCK_ROWS):
+                block = np.asarray(self._embeddings[start:start + BLOCK_ROWS], dtype=np.float32)
+                quantized[start:start + len(block)], block_scales = self._quantize(block)
+                if scales is not None:
+                    scales[start:start + len(block)] = block_scales
+            for array in (quantized, scales):
+                if array is not None:
+                    array.flush()
+            del quantized, scales
+            os.replace(quantized_path, self.directory / "quantized.npy")
+            if self.quantization == "int8":
+                os.replace(self.directory / "scales.npy.tmp", self.directory / "scales.npy")
+            self._set_meta(quantization=self.quantization)
+        self._load_arrays()
+
+    def _refresh(self) -> None:
+        """Re-open the arrays when another connection has committed changes."""
+        if self._conn.execute("PRAGMA data_version").fetchone()[0] != self._data_version:
+            self._open()
+
+    def _grow(self, rows: int) -> None:
+        """Make room for at least `rows` rows, doubling the arrays as needed."""
+        capacity = 0 if self._embeddings is None else len(self._embeddings)
+        if rows <= capacity:
+            return
+        new_capacity = max(rows, capacity * 2, MIN_CAPACITY)
+
+        arrays = {
+            "embeddings.npy": (self._embeddings, self.dtype, (new_capacity, self.dim), 0),
+            "norms.npy": (self._norms, np.float32, (new_capacity,), 0),
+            "categories.npy": (self._categories, np.int32, (new_capacity,), FREE_ROW),
+        }
+        if self.quantization != "none":
+            quantized_dtype = np.dtype(self.quantization)
+            arrays["quantized.npy"] = (self._quantized, quantized_dtype, (new_capacity, self.dim), 0)
+            if self.quantization == "int8":
+                arrays["scales.npy"] = (self._scales, np.float32, (new_capacity,), 1)
+        for name, (old, dtype, shape, fill) in arrays.items():
+            tmp_path = self.directory / f"{name}.tmp"
+            grown = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=dtype, shape=shape)
+            grown[:] = fill
+            if old is not None:
+                grown[:capacity] = old
+            grown.flush()
+            del grown
+            os.replace(tmp_path, self.directory / name)
+
+        self._set_meta(quantization=self.quantization)
+        self._load_arrays()
+
+    @staticmethod
+    def _chunks(items: List[Any]) -> Iterable[List[Any]]:
+        """Split values into groups small enough for one statement."""
+        for i in range(0, len(items), MAX_VARIABLES):
+            yield items[i:i + MAX_VARIABLES]
+
+    def _select(self, sql: str, values: List[Any]) -> List[tuple]:
+        """Run a `... IN ({})` query over any number of values."""
+        rows = []
+        for chunk in self._chunks(values):
+            rows.extend(self._conn.execute(sql.format(",".join("?" * len(chunk))), chunk).fetchall())
+        return rows
+
+    def _category_code(self, name: str) -> int:
+        self._conn.execute("INSERT OR IGNORE INTO categories (name) VALUES (?)", (name,))
+        return self._conn.execute("SELECT code FROM categories WHERE name = ?", (name,)).fetchone()[0]
+
+    def _write(
+        self,
+        ids: List[str],
+        embeds: List[List[float]],
+        contents: List[str],
+        metadatas: List[Dict[str, Any]],
+        stored: Optional[Dict[str, Dict[str, Any]]] = None,
+    ) -> None:
+        """Write vectors into their rows, then commit the catalogue."""
+        # Later duplicates win, as with a Chroma upsert.
+        latest = {doc_id: i for i, doc_id in enumerate(ids)}
+        order = list(latest.values())
+        ids = [ids[i] for i in order]
+        vectors = np.asarray(embeds, dtype=np.float32)[order]
+        if vectors.ndim != 2:
+            raise ValueError("Embeddings must be a list of equal-length vectors")
+
+        with self._lock, self._conn:
+            self._refresh()
+            self._page_end = None
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                self._set_meta(dim=self.dim, dtype=self.dtype.name, quantization=self.quantization)
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match the store's {self.dim}")
+
+            rows = dict(self._select("SELECT id, row FROM documents WHERE id IN ({})", ids))
+            new_ids = [doc_id for doc_id in ids if doc_id not in rows]
+            free = [row for (row,) in self._conn.execute(
+                "SELECT row FROM free_rows ORDER BY row LIMIT ?", (len(new_ids),)
+            ).fetchall()]
+            self._select("DELETE FROM free_rows WHERE row IN ({})", free)
+            fresh = list(range(self.size, self.size + len(new_ids) - len(free)))
+            rows.update(zip(new_ids, free + fresh))
+            size = self.size + len(fresh)
+            self._grow(size)
+
+            targets = np.array([rows[doc_id] for doc_id in ids], dtype=np.int64)
+            stored = vectors.astype(self.dtype)
+            self._embeddings[targets] = stored
+            self._norms[targets] = np.einsum("ij,ij->i", stored, stored, dtype=np.float32)
+            codes = {}
+            for metadata in metadatas:
+                if metadata["category"] not in codes:
+                    codes[metadata["category"]] = self._category_code(metadata["category"])
+            self._categories[targets] = [codes[metadatas[i]["category"]] for i in order]
+            if self._quantized is not None:
+                quantized, scales = self._quantize(vectors)
+                self._quantized[targets] = quantized
+                if scales is not None:
+                    self._scales[targets] = scales
+            else:
+                # Without a maintained copy, a process that wants one rebuilds it on open.
+                self._set_meta(quantization="none")
+            for array in (self._embeddings, self._norms, self._categories, self._quantized, self._scales):
+                if array is not None:
+                    array.flush()
+
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?)",
+                [
+                    (doc_id, rows[doc_id], metadatas[i]["category"], contents[i], metadatas[i]["bytes"])
+                    for doc_id, i in zip(ids, order)
+                ],
+            )
+            self.size = size
+            self._set_meta(size=size)
+
+    def _search(self, query_embeds: List[List[float]], top_k: int, category: Optional[str]) -> List[List[Dict[str, Any]]]:
+        """Score every row of the category against each query and return the best `top_k`.
+        With a quantized copy, its best candidates are re-scored at full precision."""
+        queries = np.asarray(query_embeds, dtype=np.float32)
+        with self._lock:
+            self._refresh()
+            embeddings, norms, categories, size = self._embeddings, self._norms, self._categories, self.size
+            quantized, scales = self._quantized, self._scales
+            code = None
+            if category:
+                found = self._conn.execute("SELECT code FROM categories WHERE name = ?", (category,)).fetchone()
+                if found is None:
+                    return [[] for _ in query_embeds]
+                code = found[0]
+        if embeddings is None or size == 0 or top_k < 1:
+            return [[] for _ in query_embeds]
+
+        if quantized is None:
+            ranked_rows = self._scan(queries, embeddings, None, norms, categories, size, code, top_k)
+        else:
+            candidates = self._scan(
+                queries, quantized, scales, norms, categories, size, code, top_k * self.config.numpy_rescore_factor
+            )
+            ranked_rows = self._rescore(queries, embeddings, norms, candidates, top_k)
+
+        with self._lock:
+            documents = {
+                row: {"id": doc_id, "document": document, "category": name}
+                for row, doc_id, document, name in self._select(
+                    "SELECT row, id, document, category FROM documents WHERE row IN ({})",
+                    np.unique(ranked_rows).tolist(),
+                )
+            }
+        # Rows written but not yet committed have no catalogue entry and are skipped.
+        return [[documents[row] for row in rows if row in documents] for rows in ranked_rows.tolist()]
+
+    @staticmethod
+    def _dot(queries: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+        """`queries @ vectors.T` in float32. Float16 and int8 rows are converted a few at a
+        time into a reused buffer, which is much faster than converting the whole block."""
+        if vectors.dtype == np.float32:
+            return queries @ vectors.T
+        products = np.empty((len(queries), len(vectors)), dtype=np.float32)
+        buffer = np.empty((min(CONVERT_ROWS, len(vectors)), vectors.shape[1]), dtype=np.float32)
+        for start in range(0, len(vectors), CONVERT_ROWS):
+            chunk = vectors[start:start + CONVERT_ROWS]
+            converted = buffer[:len(chunk)]
+            np.copyto(converted, chunk, casting="unsafe")
+            np.matmul(queries, converted.T, out=products[:, start:start + len(chunk)])
+        return products
+
+    def _scan(
+        self,
+        queries: np.ndarray,
+        vectors: np.ndarray,
+        scales: Optional[np.ndarray],
+        norms: np.ndarray,
+        categories: np.ndarray,
+        size: int,
+        code: Optional[int],
+        top_k: int,
+    ) -> np.ndarray:
+        """Return the rows of the best `top_k` matches per query, best first.
+        `scales` are the per-row factors of an int8 copy."""
+        # Maximising q.x - |x|^2 / 2 is minimising the L2 distance |q - x|.
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        for start in range(0, size, BLOCK_ROWS):
+            block_categories = categories[start:min(start + BLOCK_ROWS, size)]
+            mask = block_categories == code if code is not None else block_categories != FREE_ROW
+            selected = np.flatnonzero(mask)
+            if not len(selected):
+                continue
+            # Mostly live rows: score the contiguous block and rule the rest out,
+            # which avoids copying the selected rows.
+            contiguous = len(selected) * 2 >= len(mask)
+            if contiguous:
+                rows = start + np.arange(len(mask))
+                products = self._dot(queries, vectors[start:start + len(mask)])
+            else:
+                rows = start + selected
+                products = self._dot(queries, vectors[rows])
+            if scales is not None:
+                products *= scales[rows]
+            scores = products - 0.5 * norms[rows]
+            if contiguous and len(selected) < len(mask):
+                scores[:, ~mask] = -np.inf
+
+            k = min(top_k, len(selected))
+            keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            best_scores = np.concatenate([best_scores, np.take_along_axis(scores, keep, axis=1)], axis=1)
+            best_rows = np.concatenate([best_rows, rows[keep]], axis=1)
+            if best_scores.shape[1] > top_k:
+                keep = np.argpartition(-best_scores, top_k - 1, axis=1)[:, :top_k]
+                best_scores = np.take_along_axis(best_scores, keep, axis=1)
+                best_rows = np.take_along_axis(best_rows, keep, axis=1)
+
+        ranking = np.argsort(-best_scores, axis=1, kind="stable")
+        return np.take_along_axis(best_rows, ranking, axis=1)
+
+    def _rescore(
+        self, queries: np.ndarray, embeddings: np.ndarray, norms: np.ndarray, candidates: np.ndarray, top_k: int
+    ) -> np.ndarray:
+        """Re-rank candidate rows by their full-precision scores, keeping the best `top_k`."""
+        unique_rows, positions = np.unique(candidates, return_inverse=True)
+        positions = positions.reshape(candidates.shape)
+        scores = self._dot(queries, embeddings[unique_rows]) - 0.5 * norms[unique_rows]
+        candidate_scores = np.take_along_axis(scores, positions, axis=1)
+        ranking = np.argsort(-candidate_scores, axis=1, kind="stable")[:, :top_k]
+        return np.take_along_axis(candidates, ranking, axis=1)
+
+    def _remove(self, ids: Optional[List[str]] = None, category: Optional[str] = None) -> None:
+        """Free the rows of the deleted documents; deleting everything removes the arrays."""
+        with self._lock, self._conn:
+            self._refresh()
+            self._page_end = None
+            if ids is None and category is None:
+                self._conn.executescript(
+                    "DELETE FROM documents; DELETE FROM categories; DELETE FROM free_rows; DELETE FROM meta;"
+                )
+                self._embeddings = self._norms = self._categories = self._quantized = self._scales = None
+                for name in ("embeddings.npy", "norms.npy", "categories.npy", "quantized.npy", "scales.npy"):
+                    (self.directory / name).unlink(missing_ok=True)
+                self.size, self.dim = 0, None
+                return
+
+            if ids is not None:
+                rows = [row for (row,) in self._select("SELECT row FROM documents WHERE id IN ({})", list(ids))]
+                self._select("DELETE FROM documents WHERE id IN ({})", list(ids))
+            else:
+                rows = [row for (row,) in self._conn.execute(
+                    "SELECT row FROM documents WHERE category = ?", (category,)
+                ).fetchall()]
+                self._conn.execute("DELETE FROM documents WHERE category = ?", (category,))
+            if rows and self._categories is not None:
+                self._categories[rows] = FREE_ROW
+                self._categories.flush()
+            self._conn.executemany("INSERT OR IGNORE INTO free_rows VALUES (?)", [(row,) for row in rows])
+
+    def _metadata(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Return the stored metadata of those `ids` that exist, by ID."""
+        with self._lock:
+            return {
+                doc_id: {"category": name, "bytes": size}
+                for doc_id, name, size in self._select(
+                    "SELECT id, category, bytes FROM documents WHERE id IN ({})", ids
+                )
+            }
+
+    def get_by_ids(self, ids: List[str]) -> List[Dict[str, Any]]:
+        """Return documents for the given IDs, in the same shape as `query` results."""
+        if not ids:
+            return []
+        with self._lock:
+            rows = self._select("SELECT id, document, category FROM documents WHERE id IN ({})", list(ids))
+        return [{"id": doc_id, "document": document, "category": name} for doc_id, document, name in rows]
+
+    def get_documents(
+        self,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        include: Sequence[str] = ("documents", "metadatas"),
+    ) -> Dict[str, Any]:
+        """Return a page of stored documents in row order.
+
+        A page starting where the previous one ended is read from the row it
+        stopped at, so reading the whole store page by page stays linear.
+        """
+        with self._lock:
+            self._refresh()
+            if offset and self._page_end is not None and self._page_end[0] == offset:
+                rows = self._conn.execute(
+                    "SELECT id, row, category, document, bytes FROM documents WHERE row > ? ORDER BY row LIMIT ?",
+                    (self._page_end[1], -1 if limit is None else limit),
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT id, row, category, document, bytes FROM documents ORDER BY row LIMIT ? OFFSET ?",
+                    (-1 if limit is None else limit, offset),
+                ).fetchall()
+            self._page_end = (offset + len(rows), rows[-1][1]) if rows else None
+            page: Dict[str, Any] = {"ids": [doc_id for doc_id, *_ in rows]}
+            if "documents" in include:
+                page["documents"] = [document for _, _, _, document, _ in rows]
+            if "metadatas" in include:
+                page["metadatas"] = [{"category": name, "bytes": size} for _, _, name, _, size in rows]
+            if "embeddings" in include:
+                targets = [row for _, row, *_ in rows]
+                page["embeddings"] = (
+                    np.asarray(self._embeddings[targets], dtype=np.float32)
+                    if targets else np.empty((0, self.dim or 0), dtype=np.float32)
+                )
+        return page
+
+    def count(self) -> int:
+        """Return the number of stored documents."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
@@ -0,0 +1,124 @@
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from .vector_store import VectorStore
+
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_PAGE_ROWS = 5000
+DOCUMENTS_SCHEMA = pa.schema([("id", pa.string()), ("category", pa.string()), ("document", pa.string())])
+
+# (ids, categories, documents, embeddings) for one page of a snapshot.
+SnapshotPage = Tuple[List[str], List[str], List[str], np.ndarray]
+
+
+class StoreSnapshot:
+    """
+    A copy of a vector store's documents and embeddings in a directory:
+    `documents.parquet` holds ids, categories and texts, `embeddings.npy`
+    the matching float32 vectors row for row, and `snapshot.json` the row
+    count, vector width and embedding model.
+
+    Both files are written and read a page at a time, and the embeddings
+    can be memory-mapped, so neither side holds the whole store in memory.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def meta(self) -> Dict[str, Any]:
+        """Read and check the snapshot's description."""
+        meta_path = self.path / "snapshot.json"
+        if not meta_path.exists():
+            raise ValueError(f"{self.path} is not a vector store snapshot")
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"Unknown snapshot format: {meta.get('format')}")
+        return meta
+
+    def export(self, store: VectorStore, embeddings_model: str, page_size: int = SNAPSHOT_PAGE_ROWS) -> int:
+        """Write every stored document to the snapshot, reading the store page by page.
+
+        Files are written to a temporary directory that is renamed into place
+        once complete. Returns the number of documents written.
+        """
+        if self.path.exists():
+            raise ValueError(f"Snapshot {self.path} already exists")
+        total = store.count()
+        if total == 0:
+            raise ValueError("The vector store is empty; there is nothing to export")
+
+        tmp_path = self.path.with_name(f"{self.path.name}.tmp")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        tmp_path.mkdir(parents=True)
+        try:
+            written, dimensions = self._write_pages(store, tmp_path, total, page_size)
+            with open(tmp_path / "snapshot.json", "w", encoding="utf-8") as f:
+                json.dump({
+                    "format": SNAPSHOT_FORMAT,
+                    "documents": written,
+                    "dimensions": dimensions,
+                    "embeddings_model": embeddings_model,
+                    "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                }, f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+        return written
+
+    @staticmethod
+    def _write_pages(store: VectorStore, path: Path, total: int, page_size: int) -> Tuple[int, int]:
+        """Copy the store into `path`; returns the rows written and the vector width."""
+        embeddings = None
+        written = 0
+        with pq.ParquetWriter(path / "documents.parquet", DOCUMENTS_SCHEMA, compression="zstd") as writer:
+            while True:
+                page = store.get_documents(
+                    limit=page_size, offset=written, include=["embeddings", "documents", "metadatas"]
+                )
+                if not page["ids"]:
+                    break
+                end = written + len(page["ids"])
+                if end > total:
+                    raise RuntimeError("Documents were added during the export; run it again when no load is running")
+
+                vectors = np.asarray(page["embeddings"], dtype=np.float32)
+                if embeddings is None:
+                    # The size is known up front, so the vectors go straight into the final file.
+                    embeddings = np.lib.format.open_memmap(
+                        path / "embeddings.npy", mode="w+", dtype=np.float32, shape=(total, vectors.shape[1])
+                    )
+                embeddings[written:end] = vectors
+                writer.write_table(pa.table({
+                    "id": page["ids"],
+                    "category": [(metadata or {}).get("category", "") for metadata in page["metadatas"]],
+                    "document": page["documents"],
+                }, schema=DOCUMENTS_SCHEMA))
+                written = end
+
+        if written != total:
+            raise RuntimeError("Documents were deleted during the export; run it again when no load is running")
+        embeddings.flush()
+        return written, int(embeddings.shape[1])
+
+    def pages(self, page_size: int = SNAPSHOT_PAGE_ROWS) -> Iterator[SnapshotPage]:
+        """Yield the snapshot's documents in pages of at most `page_size` rows."""
+        meta = self.meta()
+        embeddings = np.load(self.path / "embeddings.npy", mmap_mode="r")
+        documents = pq.ParquetFile(self.path / "documents.parquet")
+        if not (embeddings.shape[0] == documents.metadata.num_rows == meta["documents"]):
+            raise ValueError(f"Snapshot {self.path} is incomplete: its files hold different numbers of rows")
+
+        offset = 0
+        for batch in documents.iter_batches(batch_size=page_size, columns=["id", "category", "document"]):
+            end = offset + batch.num_rows
+            columns = batch.to_pydict()
+            yield columns["id"], columns["category"], columns["document"], np.asarray(embeddings[offset:end])
+            offset = end
@@ -0,0 +1,245 @@
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from .category_stats import CategoryStats, StatsDelta
+from .category_versions import CategoryVersions
+from .lexical_index import LexicalIndex
+from ..config import Config
+from ..utils import metrics
+
+# Reciprocal-rank fusion constant; 60 is the value from the original RRF paper.
+RRF_K = 60
+
+
+class VectorStore(ABC):
+    """
+    Storage for embedded documents, shared by every vector store engine.
+
+    Engines implement the storage primitives (`_write`, `_search`, `_remove`,
+    `_metadata`) and the read methods. This class keeps the BM25 index,
+    category statistics and category versions in step with every write, and
+    builds hybrid and batched queries on top of the engine's search.
+    Results are dicts with `id`, `document` and `category`.
+    """
+
+    def __init__(self, config: Config):
+        """Open the lexical index, statistics and versions in the data directory."""
+        self.config: Config = config
+        self.persist_directory = Path(self.config.chroma_db_dir)
+        self.persist_directory.mkdir(parents=True, exist_ok=True)
+        self.versions = CategoryVersions(self.persist_directory / "category_versions.json")
+        self.lexical = LexicalIndex(self.persist_directory / "lexical_index.sqlite3")
+        self.stats = CategoryStats(self.persist_directory / "category_stats.sqlite3")
+
+    @abstractmethod
+    def _write(
+        self,
+        ids: List[str],
+        embeds: List[List[float]],
+        contents: List[str],
+        metadatas: List[Dict[str, Any]],
+        stored: Optional[Dict[str, Dict[str, Any]]] = None,
+    ) -> None:
+        """Insert or replace documents. `stored` is the metadata of those `ids` already
+        stored, as returned by `_metadata`, when the caller has read it."""
+
+    @abstractmethod
+    def _search(self, query_embeds: List[List[float]], top_k: int, category: Optional[str]) -> List[List[Dict[str, Any]]]:
+        """Return the `top_k` nearest documents for each query embedding, nearest first."""
+
+    @abstractmethod
+    def _remove(self, ids: Optional[List[str]] = None, category: Optional[str] = None) -> None:
+        """Delete by IDs or category; delete everything when neither is given."""
+
+    @abstractmethod
+    def _metadata(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Return the stored metadata of those `ids` that exist, by ID."""
+
+    @abstractmethod
+    def get_by_ids(self, ids: List[str]) -> List[Dict[str, Any]]:
+        """Return documents for the given IDs, in the same shape as `query` results."""
+
+    @abstractmethod
+    def get_documents(
+        self,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        include: Sequence[str] = ("documents", "metadatas"),
+    ) -> Dict[str, Any]:
+        """Return a page of stored documents as parallel `ids` and `include` lists, in a stable order."""
+
+    @abstractmethod
+    def count(self) -> int:
+        """Return the number of stored documents."""
+
+    def upsert(self, id: str, embed: List[float], content: str, category: str) -> None:
+        """Insert or update a document with embedding and category."""
+        self.upsert_batch(ids=[id], embeds=[embed], contents=[content], category=category)
+
+    def upsert_batch(self, ids: List[str], embeds: List[List[float]], contents: List[str], category: str) -> None:
+        """Insert or update many documents of one category in a single call."""
+        sizes = [len(content.encode("utf-8")) for content in contents]
+        stored = self._stored_metadata(ids)
+        deltas = self._removal_deltas(stored)
+        self._write(ids, embeds, contents, [{"category": category, "bytes": size} for size in sizes], stored)
+        self.lexical.add(ids, contents, category)
+        count, size = deltas.get(category, (0, 0))
+        deltas[category] = (count + len(ids), size + sum(sizes))
+        self.stats.apply(deltas)
+
+    def _stored_metadata(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Metadata of those `ids` already stored, by ID."""
+        return self._metadata(list(dict.fromkeys(ids))) if ids else {}
+
+    def _removal_deltas(self, stored: Dict[str, Dict[str, Any]]) -> StatsDelta:
+        """Statistics changes for removing the stored documents whose metadata is `stored`."""
+        deltas: StatsDelta = {}
+        for metadata in stored.values():
+            category = (metadata or {}).get("category")
+            if category is None:
+                continue
+            count, size = deltas.get(category, (0, 0))
+            deltas[category] = (count - 1, size - int(metadata.get("bytes", 0)))
+        return deltas
+
+    def query(
+        self,
+        query_embed: List[float],
+        top_k: Optional[int] = None,
+        category: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Query documents by embedding, optionally filtering by category."""
+        if top_k is None:
+            top_k = self.config.top_k
+        with metrics.vector_query("query"):
+            return self._search([query_embed], top_k, category)[0]
+
+    def query_batch(
+        self,
+        query_embeds: List[List[float]],
+        top_ks: List[int],
+        category: Optional[str] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """Query many embeddings sharing one category filter in a single call.
+        Each query gets its own number of results."""
+        with metrics.vector_query("query_batch"):
+            results = self._search(query_embeds, max(top_ks), category)
+
+        return [matches[:top_k] for matches, top_k in zip(results, top_ks)]
+
+    def lexical_query(
+        self,
+        query_text: str,
+        top_k: Optional[int] = None,
+        category: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """Query documents by BM25 over their text, optionally filtering by category.
+
+        Also returns whether the match is confident: the best document contains
+        every query term and outscores the runner-up by the configured margin.
+        """
+        if top_k is None:
+            top_k = self.config.top_k
+
+        with metrics.vector_query("lexical"):
+            hits, covers_query = self.lexical.search(query_text, top_k, category)
+        confident = covers_query and (
+            len(hits) == 1 or hits[0][1] >= self.config.lexical_confidence_margin * hits[1][1]
+        )
+
+        found = {doc["id"]: doc for doc in self.get_by_ids([doc_id for doc_id, _ in hits])}
+        return [found[doc_id] for doc_id, _ in hits if doc_id in found], confident
+
+    @staticmethod
+    def fuse(result_lists: List[List[Dict[str, Any]]], top_k: int) -> List[Dict[str, Any]]:
+        """Merge ranked result lists with reciprocal-rank fusion."""
+        scores: Dict[str, float] = {}
+        documents: Dict[str, Dict[str, Any]] = {}
+        for results in result_lists:
+            for rank, doc in enumerate(results, start=1):
+                scores[doc["id"]] = scores.get(doc["id"], 0.0) + 1.0 / (RRF_K + rank)
+                documents.setdefault(doc["id"], doc)
+
+        ranked = sorted(scores, key=scores.get, reverse=True)[:top_k]
+        return [documents[doc_id] for doc_id in ranked]
+
+    def delete_documents(self, ids: List[str] = None, category: Optional[str] = None) -> None:
+        """Delete by IDs, category, or all documents."""
+        if ids is not None:
+            deltas = self._removal_deltas(self._stored_metadata(ids))
+            self._remove(ids=ids)
+            self.lexical.remove(ids)
+            self.stats.apply(deltas)
+        elif category is not None:
+            self._remove(category=category)
+            self.lexical.clear(category)
+            self.stats.clear(category)
+        else:
+            self._remove()
+            self.lexical.clear()
+            self.stats.clear()
+
+    def rebuild_category_stats(self, page_size: int = 5000) -> None:
+        """Recount category statistics with a paged scan that reads metadata only.
+
+        Documents stored without a recorded size are read once to measure it,
+        and the size is saved back through `_backfill_sizes`.
+        """
+        totals: StatsDelta = {}
+        offset = 0
+        while True:
+            page = self.get_documents(limit=page_size, offset=offset, include=["metadatas"])
+            if not page["ids"]:
+                break
+            offset += len(page["ids"])
+
+            missing = [
+                doc_id for doc_id, metadata in zip(page["ids"], page["metadatas"])
+                if "bytes" not in (metadata or {})
+            ]
+            sizes: Dict[str, int] = {}
+            if missing:
+                sizes = {doc["id"]: len(doc["document"].encode("utf-8")) for doc in self.get_by_ids(missing)}
+                self._backfill_sizes(sizes)
+
+            for doc_id, metadata in zip(page["ids"], page["metadatas"]):
+                category = (metadata or {}).get("category")
+                if category is None:
+                    continue
+                count, size = totals.get(category, (0, 0))
+                totals[category] = (count + 1, size + int((metadata or {}).get("bytes", sizes.get(doc_id, 0))))
+
+        self.stats.replace(totals)
+
+    def _backfill_sizes(self, sizes: Dict[str, int]) -> None:
+        """Record content sizes for documents stored before sizes were kept."""
+
+    def rebuild_lexical_index(self, page_size: int = 5000) -> int:
+        """Re-index every stored document for lexical search, reading the store page by page."""
+        self.lexical.clear()
+        indexed = 0
+        while True:
+            page = self.get_documents(limit=page_size, offset=indexed)
+            if not page["ids"]:
+                return indexed
+            by_category: Dict[str, Tuple[List[str], List[str]]] = {}
+            for doc_id, document, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+                ids, contents = by_category.setdefault(metadata["category"], ([], []))
+                ids.append(doc_id)
+                contents.append(document)
+            for category, (ids, contents) in by_category.items():
+                self.lexical.add(ids, contents, category)
+            indexed += len(page["ids"])
+
+
+def get_vector_store(config: Config) -> VectorStore:
+    """Create the vector store engine selected by `VECTOR_STORE`."""
+    from .chromadb_service import ChromaDBService
+    from .numpy_store import NumpyVectorStore
+
+    store_factory = {
+        "chroma": lambda: ChromaDBService(config),
+        "numpy": lambda: NumpyVectorStore(config),
+    }.get(config.vector_store)
+
+    return store_factory()
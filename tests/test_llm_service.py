@@ -0,0 +1,105 @@
+"""Prompt layout and Anthropic cache breakpoints sent by `LLMService`, checked against the offline chat stub."""
+from pathlib import Path
+from typing import Any, List, Optional
+import pytest
+from langchain_anthropic import ChatAnthropic
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatResult
+
+from benchmarks.stubs import EchoChatModel
+from src.ai.llm.llm_service import CACHE_BREAKPOINT, LLMService
+from src.config import Config
+
+ROOT = Path(__file__).resolve().parent.parent
+PROMPT = (ROOT / "prompts" / "rag_response.txt").read_text(encoding="utf-8").strip()
+RETRIEVED = ["{id: FAQ001}", "{id: FAQ002}"]
+
+
+class RecordingChatModel(EchoChatModel):
+    """Echo model that keeps every message list it was called with."""
+
+    latency: float = 0.0
+    calls: List[List[BaseMessage]] = []
+
+    def _generate(
+        self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any
+    ) -> ChatResult:
+        self.calls.append(messages)
+        return super()._generate(messages, stop, run_manager, **kwargs)
+
+
+def conversation() -> List[BaseMessage]:
+    return [
+        HumanMessage("houses in Denver?"),
+        AIMessage("There are two."),
+        HumanMessage("which has a garage?"),
+        AIMessage("The first one."),
+        HumanMessage("how much is it?"),
+    ]
+
+
+def llm_service(monkeypatch, tmp_path, llm_model: str) -> LLMService:
+    monkeypatch.chdir(ROOT)
+    monkeypatch.delenv("SYSTEM_PROMPT", raising=False)
+    monkeypatch.setenv("LLM_MODEL", llm_model)
+    monkeypatch.setenv("EMBEDDINGS_MODEL", "voyage-3-large")
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test")
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("VOYAGE_AI_API_KEY", "test")
+    monkeypatch.setenv("CHROMA_DB_DIR", str(tmp_path))
+    service = LLMService(Config())
+    service.model = RecordingChatModel(calls=[])
+    return service
+
+
+def test_anthropic_messages_put_stable_prefix_first_with_breakpoints(monkeypatch, tmp_path):
+    service = llm_service(monkeypatch, tmp_path, "claude-haiku-4-5-20251001")
+    service.rag_response(conversation(), RETRIEVED)
+
+    [sent] = service.model.calls
+    assert [type(message) for message in sent] == [
+        SystemMessage, HumanMessage, AIMessage, HumanMessage, AIMessage, HumanMessage,
+    ]
+    assert sent[0].content == [{"type": "text", "text": PROMPT, "cache_control": CACHE_BREAKPOINT}]
+    assert [message.content for message in sent[1:4]] == [
+        "houses in Denver?", "There are two.", "which has a garage?",
+    ]
+    assert sent[4].content == [{"type": "text", "text": "The first one.", "cache_control": CACHE_BREAKPOINT}]
+    assert sent[5].content == [
+        {"type": "text", "text": "# Retrieved documents\n{id: FAQ001}\n{id: FAQ002}"},
+        {"type": "text", "text": "how much is it?"},
+    ]
+
+
+def test_anthropic_request_payload(monkeypatch, tmp_path):
+    service = llm_service(monkeypatch, tmp_path, "claude-haiku-4-5-20251001")
+    service.rag_response(conversation(), RETRIEVED)
+    [sent] = service.model.calls
+
+    payload = ChatAnthropic(model="claude-haiku-4-5-20251001", api_key="test")._get_request_payload(sent)
+
+    assert payload["system"] == [{"type": "text", "text": PROMPT, "cache_control": CACHE_BREAKPOINT}]
+    assert payload["messages"] == [
+        {"role": "user", "content": "houses in Denver?"},
+        {"role": "assistant", "content": "There are two."},
+        {"role": "user", "content": "which has a garage?"},
+        {"role": "assistant", "content": [
+            {"type": "text", "text": "The first one.", "cache_control": CACHE_BREAKPOINT},
+        ]},
+        {"role": "user", "content": [
+            {"type": "text", "text": "# Retrieved documents\n{id: FAQ001}\n{id: FAQ002}"},
+            {"type": "text", "text": "how much is it?"},
+        ]},
+    ]
+
+
+@pytest.mark.parametrize("history", [[], conversation()[:-1]])
+def test_openai_messages_have_no_breakpoints(monkeypatch, tmp_path, history):
+    service = llm_service(monkeypatch, tmp_path, "gpt-4o")
+    service.rag_response([*history, HumanMessage("how much is it?")], RETRIEVED)
+
+    [sent] = service.model.calls
+    assert isinstance(sent[0], SystemMessage) and sent[0].content == PROMPT
+    assert [message.content for message in sent[1:-1]] == [message.content for message in history]
+    assert "cache_control" not in str([message.content for message in sent])
+    assert sent[-1].content[-1] == {"type": "text", "text": "how much is it?"}